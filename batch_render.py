@@ -0,0 +1,243 @@
+"""
+无界面批量重新渲染
+对已有的原始录像 / 事件日志 / 音频重新执行后处理，按进程池并行，不依赖 Tk 和 pynput
+
+用法:
+    python batch_render.py Record_*_raw.mkv --set zoom_max=1.6 --set video_quality=high
+    python batch_render.py recordings/ --config render.json --workers 4 --output-dir out/
+    python batch_render.py --job a.mkv a_clicks.json a_audio.wav --job b.mkv b_events.bin
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.config_manager import ConfigManager
+
+RAW_SUFFIX = "_raw.mkv"
+# Current binary log first, then the legacy JSON click log
+EVENT_SUFFIXES = ("_events.bin", "_clicks.json")
+AUDIO_SUFFIX = "_audio.wav"
+# Output name for inputs that are not *_raw.mkv, so the result never overwrites its source
+RENDERED_SUFFIX = "_rendered.mp4"
+STAGING_SUFFIX = "_rendering.mp4"
+
+
+def find_sidecar(base, suffixes):
+    for suffix in suffixes:
+        path = base + suffix
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def job_for_raw(video_path, output_dir=None):
+    """Derive (video, events, audio, output) from a Record_<ts>_raw.mkv path (or any other video)."""
+    if video_path.endswith(RAW_SUFFIX):
+        base = video_path[:-len(RAW_SUFFIX)]
+        output = base + ".mp4"
+    else:
+        base = os.path.splitext(video_path)[0]
+        output = base + RENDERED_SUFFIX
+    if output_dir:
+        output = os.path.join(output_dir, os.path.basename(output))
+    return {
+        "video": video_path,
+        "events": find_sidecar(base, EVENT_SUFFIXES),
+        "audio": find_sidecar(base, (AUDIO_SUFFIX,)),
+        "output": output
+    }
+
+
+def collect_jobs(inputs, explicit_jobs, output_dir=None):
+    jobs = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(RAW_SUFFIX):
+                    jobs.append(job_for_raw(os.path.join(path, name), output_dir))
+        else:
+            jobs.append(job_for_raw(path, output_dir))
+
+    for paths in explicit_jobs or []:
+        job = job_for_raw(paths[0], output_dir)
+        job["events"] = paths[1]
+        job["audio"] = paths[2] if len(paths) > 2 else None
+        jobs.append(job)
+    return jobs
+
+
+def parse_value(text):
+    """--set values are JSON when they parse as JSON (numbers, true, null), else strings."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def build_settings(config_path=None, overrides=None):
+    """
+    DEFAULT_CONFIG, then an optional JSON config file (same keys as config.json),
+    then key=value overrides. The GUI's own config.json is not read.
+    """
+    settings = ConfigManager.DEFAULT_CONFIG.copy()
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            settings.update(json.load(f))
+    for item in overrides or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Expected key=value, got: {item}")
+        settings[key.strip()] = parse_value(value)
+    return settings
+
+
+def processor_config(settings):
+    """Settings (config.json keys) -> PostProcessor config, as FFmpegRecordEngine.post_process builds it."""
+    config = dict(settings)
+    config["quality"] = settings.get("video_quality", "medium")
+    return config
+
+
+def _same_path(a, b):
+    return bool(a) and bool(b) and os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def _render_job(job, config):
+    """Worker entry point: render one job and return its summary row."""
+    from post_processor import PostProcessor
+    from render_progress import RenderProgress, print_progress
+
+    result = dict(job, ok=False, frames=0, seconds=0.0, size=0, error=None)
+    if not job["events"]:
+        result["error"] = "event log not found"
+        return result
+    # Preview renders go next to the requested output (PostProcessor.process naming)
+    written = job["output"].replace(".mp4", "_preview.mp4") if config.get("preview") else job["output"]
+    # Render under a staging name: a failed or aborted re-render keeps the previous output
+    staging = job["output"].replace(".mp4", STAGING_SUFFIX)
+    staged = staging.replace(".mp4", "_preview.mp4") if config.get("preview") else staging
+    if any(_same_path(path, job[key]) for path in (written, job["output"], staged)
+           for key in ("video", "events", "audio")):
+        # Rendering overwrites these paths: never let that be one of the inputs
+        result["error"] = "output path is one of the inputs"
+        return result
+
+    start = time.perf_counter()
+    rendered = False
+    try:
+        processor = PostProcessor()
+        # Prefixed so interleaved output from parallel jobs stays readable
+        prefix = f"[{os.path.basename(job['output'])}] "
+        progress = RenderProgress(callback=lambda snapshot: print_progress(snapshot, prefix), interval=2.0)
+        rendered = processor.process(job["video"], job["audio"], job["events"], staging, config, progress)
+        if not rendered:
+            result["error"] = f"render aborted: {progress.reason}" if progress.cancelled else "render failed"
+        if processor.frames_rendered:
+            result["frames"] = processor.frames_rendered
+        elif processor.trajectory is not None:
+            result["frames"] = len(processor.trajectory)
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+
+    if rendered and os.path.exists(staged) and os.path.getsize(staged) > 0:
+        os.replace(staged, written)
+        # Diagnostics are named after the output too
+        for suffix in ("_render_report.json", "_profile.prof", "_profile.html"):
+            report = staging.replace(".mp4", suffix)
+            if os.path.exists(report):
+                os.replace(report, job["output"].replace(".mp4", suffix))
+        result["size"] = os.path.getsize(written)
+    elif os.path.exists(staged):
+        # Partial output (checkpointed segments are kept separately)
+        os.remove(staged)
+    result["ok"] = result["error"] is None and result["size"] > 0
+    if not result["ok"] and result["error"] is None:
+        result["error"] = "no output written"
+    return result
+
+
+def print_summary(results, wall_seconds):
+    print("\nBatch render summary")
+    print(f"{'job':<40} {'status':<7} {'frames':>8} {'time(s)':>9} {'fps':>8} {'size(MB)':>9}")
+    total_frames = 0
+    for r in results:
+        fps = r["frames"] / r["seconds"] if r["seconds"] > 0 else 0.0
+        status = "ok" if r["ok"] else "FAILED"
+        name = os.path.basename(r["output"])
+        print(f"{name:<40} {status:<7} {r['frames']:>8} {r['seconds']:>9.2f} {fps:>8.1f} {r['size'] / 1e6:>9.1f}")
+        if r["error"]:
+            print(f"    {r['error']}")
+        if r["ok"]:
+            total_frames += r["frames"]
+    ok = sum(1 for r in results if r["ok"])
+    print(f"{ok}/{len(results)} jobs succeeded, {total_frames} frames in {wall_seconds:.2f}s "
+          f"({total_frames / max(wall_seconds, 1e-6):.1f} fps aggregate)")
+
+
+def run_batch(jobs, config, workers=1):
+    results = []
+    start = time.perf_counter()
+    if workers <= 1:
+        for job in jobs:
+            results.append(_render_job(job, config))
+    else:
+        # spawn: same start method on every platform, workers import only what rendering needs
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [pool.submit(_render_job, job, config) for job in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+        order = {job["output"]: i for i, job in enumerate(jobs)}
+        results.sort(key=lambda r: order[r["output"]])
+    print_summary(results, time.perf_counter() - start)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-render OpenFocus recordings without the GUI")
+    parser.add_argument("inputs", nargs="*",
+                        help=f"*{RAW_SUFFIX} files or directories containing them; "
+                             f"event log and audio are found next to each file")
+    parser.add_argument("--job", nargs="+", action="append", metavar="PATH",
+                        help="explicit job: VIDEO EVENT_LOG [AUDIO]")
+    parser.add_argument("--config", help="JSON file with config.json keys (zoom_max, video_quality, ...)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a config key, e.g. --set zoom_max=1.6")
+    parser.add_argument("--workers", type=int, default=1, help="number of jobs rendered in parallel")
+    parser.add_argument("--output-dir", help="write outputs here instead of next to the inputs")
+    args = parser.parse_args(argv)
+
+    for paths in args.job or []:
+        if len(paths) not in (2, 3):
+            parser.error("--job takes VIDEO EVENT_LOG [AUDIO]")
+
+    try:
+        settings = build_settings(args.config, args.set)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    jobs = collect_jobs(args.inputs, args.job, args.output_dir)
+    if not jobs:
+        parser.error("no jobs: pass *_raw.mkv files, directories or --job")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    config = processor_config(settings)
+    if args.workers > 1 and config.get("parallel"):
+        # Jobs already run in parallel; nested chunk pools would oversubscribe the CPU
+        print("Disabling per-video parallel render: jobs already run in separate processes.")
+        config["parallel"] = False
+
+    print(f"Rendering {len(jobs)} job(s) with {args.workers} worker(s)")
+    results = run_batch(jobs, config, args.workers)
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+采集后端探测
+测量各屏幕采集后端（gdigrab / x11grab / mss / lavfi）在指定区域大小下可持续的采集帧率，输出 JSON
+
+用法:
+    python benchmarks/capture_backend_bench.py --size 1920x1080 --fps 60
+    xvfb-run -s "-screen 0 1920x1080x24" python benchmarks/capture_backend_bench.py --backends x11grab,mss
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_backends import BACKENDS, probe_backends
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure sustainable capture fps per backend")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"comma separated: {', '.join(BACKENDS)}")
+    parser.add_argument("--size", help="region WIDTHxHEIGHT at the top-left corner (default: full screen)")
+    parser.add_argument("--offset", default="0,0", help="region LEFT,TOP")
+    parser.add_argument("--fps", type=int, default=120, help="requested rate; the probe reports what is sustained")
+    parser.add_argument("--seconds", type=float, default=3.0, help="capture time per backend")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.backends.split(",") if n.strip()]
+    for name in names:
+        if name not in BACKENDS:
+            parser.error(f"unknown backend: {name}")
+
+    region = None
+    if args.size:
+        try:
+            width, height = (int(v) for v in args.size.lower().split("x"))
+            left, top = (int(v) for v in args.offset.split(","))
+        except ValueError:
+            parser.error("expected --size WIDTHxHEIGHT and --offset LEFT,TOP")
+        region = {"left": left, "top": top, "width": width, "height": height}
+
+    # Probe progress goes to stderr; stdout is reserved for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        results = probe_backends(region, args.fps, args.seconds, names)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "region": region,
+        "requested_fps": args.fps,
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0 if any(r["fps"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
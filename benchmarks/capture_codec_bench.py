@@ -0,0 +1,205 @@
+"""
+录制中间格式基准
+用 ffmpeg lavfi 合成画面，按各录制中间格式编码，输出 JSON 格式的编码 CPU 占用、每秒写盘字节数、
+后处理解码帧率和跳转延迟，用于为不同机器选择 capture_profile
+
+用法:
+    python benchmarks/capture_codec_bench.py --resolution 1080p --fps 30 --duration 10
+    python benchmarks/capture_codec_bench.py --profiles x264_lossless,ffv1 -o codecs.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_profiles import CAPTURE_PROFILES, capture_codec_args
+from ffmpeg_frame_reader import FFmpegFrameReader
+from utils.path_utils import get_ffmpeg_path
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160)
+}
+
+# Screen-like default: mostly static UI with a small moving region
+DEFAULT_SOURCE = ("color=c=0xf0f0f0:size={w}x{h}:rate={fps}:duration={d}[bg];"
+                  "testsrc2=size={sw}x{sh}:rate={fps}:duration={d}[fg];"
+                  "[bg][fg]overlay=x='mod(t*120,{w}-{sw})':y={h}/4,format=bgra[out0]")
+
+
+def children_cpu_seconds():
+    """CPU seconds of all finished child processes (POSIX only)."""
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _windows_process_cpu_seconds(process):
+    """User + kernel time of a finished subprocess.Popen via GetProcessTimes (no psutil needed)."""
+    import ctypes
+    from ctypes import wintypes
+
+    creation, exit_time, kernel, user = (wintypes.FILETIME() for _ in range(4))
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    get_times = kernel32.GetProcessTimes
+    get_times.argtypes = [wintypes.HANDLE] + [ctypes.POINTER(wintypes.FILETIME)] * 4
+    get_times.restype = wintypes.BOOL
+    # Popen keeps the process handle open after wait(), so the times are still readable
+    if not get_times(int(process._handle), ctypes.byref(creation), ctypes.byref(exit_time),
+                     ctypes.byref(kernel), ctypes.byref(user)):
+        raise ctypes.WinError(ctypes.get_last_error())
+    # FILETIME counts 100 ns ticks
+    ticks = sum((t.dwHighDateTime << 32) | t.dwLowDateTime for t in (kernel, user))
+    return ticks / 1e7
+
+
+def generate(source):
+    """Produce the synthetic source into -f null: the lavfi share of encode()'s CPU; returns (wall_s, cpu_s)."""
+    cmd = [get_ffmpeg_path(), '-hide_banner', '-loglevel', 'error',
+           '-f', 'lavfi', '-i', source, '-f', 'null', '-']
+    return _run(cmd)
+
+
+def encode(source, profile, fps, path):
+    """Encode the synthetic source like the recorder would; returns (wall_s, cpu_s)."""
+    cmd = [get_ffmpeg_path(), '-hide_banner', '-loglevel', 'error', '-y',
+           '-f', 'lavfi', '-i', source] + capture_codec_args(profile, fps) + [path]
+    return _run(cmd)
+
+
+def _run(cmd):
+    windows = sys.platform == "win32"
+    cpu_before = 0.0 if windows else children_cpu_seconds()
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, stderr = process.communicate()
+    wall = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(stderr.decode("utf-8", errors="replace").strip())
+    if windows:
+        # No RUSAGE_CHILDREN on Windows: ask for this process's own times
+        return wall, _windows_process_cpu_seconds(process)
+    return wall, children_cpu_seconds() - cpu_before
+
+
+def decode(path, frame_size, fps, start_time=None, max_frames=None):
+    """Decode through FFmpegFrameReader (the post-process path); returns (frames, wall_s, first_frame_s)."""
+    start = time.perf_counter()
+    reader = FFmpegFrameReader(path, frame_size, fps, start_time=start_time)
+    frames = 0
+    first = None
+    try:
+        while max_frames is None or frames < max_frames:
+            ret, _ = reader.read()
+            if not ret:
+                break
+            if first is None:
+                first = time.perf_counter() - start
+            frames += 1
+    finally:
+        reader.release()
+    return frames, time.perf_counter() - start, first
+
+
+def make_source(width, height, fps, duration):
+    return DEFAULT_SOURCE.format(w=width, h=height, sw=width // 4, sh=height // 4, fps=fps, d=duration)
+
+
+def run_profile(profile, width, height, fps, duration, workdir, keep, source_cpu=0.0):
+    """source_cpu: CPU seconds of generate() for the same source, subtracted from the encode CPU."""
+    path = os.path.join(workdir, f"capture_{profile}_{width}x{height}_{fps}fps.mkv")
+    source = make_source(width, height, fps, duration)
+    result = {"profile": profile, "ok": False}
+    try:
+        encode_wall, encode_cpu = encode(source, profile, fps, path)
+        size = os.path.getsize(path)
+        frames, decode_wall, _ = decode(path, (width, height), fps)
+        # Seek latency: time to the first frame after an input seek to the middle
+        _, _, seek_first = decode(path, (width, height), fps, start_time=duration / 2, max_frames=1)
+        result.update({
+            "ok": frames > 0,
+            # Cores kept busy by the encoder while capturing in real time (1.0 = one full core);
+            # the synthetic source's own generation cost is measured separately and removed
+            "capture_cpu_cores": round(max(0.0, encode_cpu - source_cpu) / duration, 3),
+            "total_cpu_cores": round(encode_cpu / duration, 3),
+            "encode_speed": round(duration / encode_wall, 2) if encode_wall > 0 else None,
+            "bytes_per_second": int(size / duration),
+            "file_bytes": size,
+            "decode_frames": frames,
+            "decode_fps": round(frames / decode_wall, 1) if decode_wall > 0 else None,
+            "seek_ms": round(seek_first * 1000.0, 1) if seek_first is not None else None
+        })
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        if not keep and os.path.exists(path):
+            os.remove(path)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare intermediate capture profiles")
+    parser.add_argument("--profiles", default=",".join(CAPTURE_PROFILES),
+                        help=f"comma separated: {', '.join(CAPTURE_PROFILES)}")
+    parser.add_argument("--resolution", default="1080p", choices=list(RESOLUTIONS))
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--duration", type=int, default=10, help="seconds of synthetic capture")
+    parser.add_argument("--workdir", help="where encoded files are written (default: temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the encoded files")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    for profile in profiles:
+        if profile not in CAPTURE_PROFILES:
+            parser.error(f"unknown profile: {profile}")
+
+    width, height = RESOLUTIONS[args.resolution]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="openfocus_codec_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    # Baseline: lavfi generation alone, which is in every encode's CPU time but not in a real capture
+    print(f"Baseline: source generation {args.resolution} {args.fps}fps {args.duration}s", file=sys.stderr)
+    try:
+        _, source_cpu = generate(make_source(width, height, args.fps, args.duration))
+        baseline = {"ok": True, "source_cpu_cores": round(source_cpu / args.duration, 3)}
+    except Exception as e:
+        source_cpu = 0.0
+        baseline = {"ok": False, "error": str(e)}
+
+    results = []
+    for profile in profiles:
+        print(f"Benchmark: {profile} {args.resolution} {args.fps}fps {args.duration}s", file=sys.stderr)
+        results.append(run_profile(profile, width, height, args.fps, args.duration, workdir, args.keep, source_cpu))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "resolution": args.resolution,
+        "fps": args.fps,
+        "duration": args.duration,
+        "baseline": baseline,
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+鼠标事件采集微基准
+对比旧的「加锁 + 两次 time.time() + dict」写法与无锁环形缓冲区的单事件开销
+
+用法: python benchmarks/event_capture_bench.py [--events N] [--repeat R]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_buffer import EventRingBuffer
+from event_log import EVENT_MOVE
+
+
+class LegacyCapture:
+    """The per-event path used before the ring buffer (lock, dict, list append)."""
+    def __init__(self):
+        self.start_time = time.time()
+        self.log_lock = threading.Lock()
+        self.click_log = []
+        self.record_region = {'left': 10, 'top': 20}
+
+    def on_move(self, x, y):
+        current_real_time = time.time()
+        with self.log_lock:
+            timestamp = time.time() - self.start_time
+            eff_x = int(x)
+            eff_y = int(y)
+            if self.record_region:
+                eff_x -= self.record_region.get('left', 0)
+                eff_y -= self.record_region.get('top', 0)
+            self.click_log.append({
+                "time": timestamp,
+                "x": eff_x,
+                "y": eff_y,
+                "type": "move"
+            })
+        return current_real_time
+
+
+class RingCapture:
+    """The current hook path: one monotonic_ns() and a lock-free ring write."""
+    def __init__(self, capacity):
+        self.buffer = EventRingBuffer(capacity)
+        self.origin_x = 10
+        self.origin_y = 20
+
+    def on_move(self, x, y):
+        self.buffer.write(time.monotonic_ns(), int(x) - self.origin_x, int(y) - self.origin_y, EVENT_MOVE)
+
+
+def measure(on_move, events):
+    start = time.perf_counter_ns()
+    for i in range(events):
+        on_move(i & 1023, i & 511)
+    return (time.perf_counter_ns() - start) / events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-event cost of mouse event capture")
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    capacity = 1 << max(1, (args.events - 1).bit_length())
+    legacy, ring = [], []
+    for _ in range(args.repeat):
+        legacy.append(measure(LegacyCapture().on_move, args.events))
+        ring.append(measure(RingCapture(capacity).on_move, args.events))
+
+    best_legacy, best_ring = min(legacy), min(ring)
+    print(f"events per run: {args.events}, runs: {args.repeat} (best run shown)")
+    print(f"legacy (lock + dict):  {best_legacy:8.1f} ns/event")
+    print(f"ring buffer:           {best_ring:8.1f} ns/event")
+    print(f"speedup:               {best_legacy / best_ring:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
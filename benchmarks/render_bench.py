@@ -0,0 +1,220 @@
+"""
+后处理端到端基准
+用 ffmpeg lavfi 生成合成原始录像和合成点击/移动/暂停日志，运行 PostProcessor.process 与
+VideoAudioMerger，输出 JSON 格式的帧率、各阶段耗时、峰值内存和输出大小，可在无界面 Linux 上运行
+
+用法:
+    python benchmarks/render_bench.py --resolutions 1080p,4k --fps 30,60 --durations 10,60 -o results.json
+    python benchmarks/render_bench.py --set render_engine=ffmpeg_filter --set parallel=true
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_log import write_event_log
+from event_sources import synthetic_session
+from utils.config_manager import ConfigManager
+from utils.path_utils import get_ffmpeg_path
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160)
+}
+
+
+def run_ffmpeg(args):
+    cmd = [get_ffmpeg_path(), '-hide_banner', '-loglevel', 'error', '-y'] + args
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def make_video(path, width, height, fps, duration):
+    # Encoded like the recorder's intermediate: lossless ultrafast x264 in mkv
+    run_ffmpeg(['-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+                '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '0', path])
+
+
+def make_audio(path, duration):
+    run_ffmpeg(['-f', 'lavfi', '-i', f"sine=frequency=440:sample_rate=48000:duration={duration}", path])
+
+
+def make_event_log(path, width, height, duration, move_hz, click_interval, pauses, seed=0):
+    """
+    Random-walk cursor at move_hz, a left click every click_interval seconds
+    and `pauses` evenly spaced 1 s pauses. Returns the event count.
+    """
+    records = synthetic_session(duration, width, height, move_hz, click_interval, pauses, seed=seed)
+    write_event_log(path, records)
+    return len(records)
+
+
+def file_size(path):
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+
+def peak_rss_mb():
+    """
+    Peak RSS of this process and of its largest finished child (ffmpeg), in MB.
+    Child peaks need RUSAGE_CHILDREN, so they are None on Windows.
+    """
+    from render_profiler import peak_memory_mb
+    try:
+        import resource
+    except ImportError:
+        return peak_memory_mb(), None
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / divisor, children / divisor
+
+
+def _round(value, digits=1):
+    return round(value, digits) if value is not None else None
+
+
+def run_case(case, settings, workdir, keep):
+    """Runs in a fresh process so ru_maxrss is the peak of this case only."""
+    # Render logs go to stderr; stdout is reserved for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        return _run_case(case, settings, workdir, keep)
+
+
+def _run_case(case, settings, workdir, keep):
+    from post_processor import PostProcessor
+    from video_audio_merger import VideoAudioMerger
+
+    width, height = RESOLUTIONS[case["resolution"]]
+    fps, duration = case["fps"], case["duration"]
+    name = f"bench_{case['resolution']}_{fps}fps_{duration}s"
+    base = os.path.join(workdir, name)
+    video = base + "_raw.mkv"
+    events = base + "_events.bin"
+    audio = base + "_audio.wav"
+    output = base + ".mp4"
+    merged = base + "_merged.mp4"
+
+    stages = {}
+    start = time.perf_counter()
+    make_video(video, width, height, fps, duration)
+    make_audio(audio, duration)
+    event_count = make_event_log(events, width, height, duration, case["move_hz"], case["click_interval"],
+                                 case["pauses"])
+    stages["generate"] = time.perf_counter() - start
+
+    config = dict(settings)
+    config["quality"] = settings.get("video_quality", "medium")
+    config["fps"] = fps
+    # Per-stage breakdown of "process" (decode, apply_zoom, draw_effects, write, ...)
+    config["render_report"] = True
+
+    processor = PostProcessor()
+    start = time.perf_counter()
+    # Video only, so the merge stage below measures VideoAudioMerger on its own
+    processor.process(video, None, events, output, config)
+    stages["process"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    merge_ok = VideoAudioMerger.merge_files(output, audio, merged, cleanup=False, quality=config["quality"])
+    stages["merge"] = time.perf_counter() - start
+
+    frames = processor.frames_rendered or (len(processor.trajectory) if processor.trajectory is not None else 0)
+    render_report = processor.profiler.report()
+    render_stages = {name: {"calls": s["calls"], "total_s": s["total_s"], "mean_ms": s["mean_ms"],
+                            "p99_ms": s["p99_ms"]}
+                     for name, s in render_report["stages"].items()}
+    rss_self, rss_children = peak_rss_mb()
+    result = dict(case, name=name, width=width, height=height, events=event_count, frames=frames,
+                  render_fps=frames / stages["process"] if stages["process"] > 0 else 0.0,
+                  stages=stages, render_stages=render_stages, render_counters=render_report["counters"],
+                  render_engine=render_report["info"].get("render_engine"), peak_rss_mb=_round(rss_self), peak_child_rss_mb=_round(rss_children),
+                  input_bytes=file_size(video), output_bytes=file_size(output), merged_bytes=file_size(merged),
+                  ok=file_size(output) > 0 and merge_ok)
+
+    if not keep:
+        for path in (video, events, audio, output, merged, base + "_render_report.json"):
+            if os.path.exists(path):
+                os.remove(path)
+    return result
+
+
+def int_list(text):
+    return [int(v) for v in text.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic end-to-end post-processing benchmark")
+    parser.add_argument("--resolutions", default="1080p", help=f"comma separated: {', '.join(RESOLUTIONS)}")
+    parser.add_argument("--fps", type=int_list, default=[30], help="comma separated frame rates")
+    parser.add_argument("--durations", type=int_list, default=[10], help="comma separated lengths in seconds")
+    parser.add_argument("--move-hz", type=float, default=60.0, help="synthetic mouse move rate")
+    parser.add_argument("--click-interval", type=float, default=2.0, help="seconds between clicks (0: none)")
+    parser.add_argument("--pauses", type=int, default=0, help="number of 1 s pauses per recording")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a config key (same keys as config.json)")
+    parser.add_argument("--workdir", help="where synthetic inputs are written (default: temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep generated and rendered files")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    settings = ConfigManager.DEFAULT_CONFIG.copy()
+    for item in args.set:
+        key, _, value = item.partition("=")
+        try:
+            settings[key.strip()] = json.loads(value)
+        except ValueError:
+            settings[key.strip()] = value
+
+    resolutions = [r.strip().lower() for r in args.resolutions.split(",") if r.strip()]
+    for r in resolutions:
+        if r not in RESOLUTIONS:
+            parser.error(f"unknown resolution: {r}")
+
+    cases = [{"resolution": r, "fps": fps, "duration": d, "move_hz": args.move_hz,
+              "click_interval": args.click_interval, "pauses": args.pauses}
+             for r in resolutions for fps in args.fps for d in args.durations]
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="openfocus_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for case in cases:
+        print(f"Benchmark: {case['resolution']} {case['fps']}fps {case['duration']}s", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            try:
+                results.append(pool.submit(run_case, case, settings, workdir, args.keep).result())
+            except Exception as e:
+                results.append(dict(case, ok=False, error=str(e)))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": settings,
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0 if all(r.get("ok") for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
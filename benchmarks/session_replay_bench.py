@@ -0,0 +1,209 @@
+"""
+录制会话重放基准
+在无界面环境下用合成采集源和重放事件源运行完整的 FFmpegRecordEngine 录制会话，
+输出 JSON 格式的 CPU 开销、回调延迟、采集健康指标和事件日志保真度（点击/暂停数量、时间误差、移动轨迹误差）
+
+用法:
+    python benchmarks/session_replay_bench.py --duration 30 --move-hz 250 --click-interval 1
+    python benchmarks/session_replay_bench.py --events Record_123_events.bin --backend x11grab
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from audio_recorder import AudioRecorder
+from event_log import EventLog, EVENT_MOVE, EVENT_CLICK, EVENT_PAUSE_START, EVENT_PAUSE_END
+from event_sources import ReplayEventSource, synthetic_session
+from ffmpeg_record_engine import FFmpegRecordEngine
+
+
+def children_cpu_seconds():
+    """CPU seconds of all finished child processes (POSIX only; None on Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def ffmpeg_cpu_seconds(engine, children_before):
+    """CPU seconds of the engine's capture ffmpeg, once it has exited."""
+    if children_before is not None:
+        return children_cpu_seconds() - children_before
+    # Windows: read the finished process's own times (helper shared with the codec benchmark)
+    from capture_codec_bench import _windows_process_cpu_seconds
+    try:
+        return _windows_process_cpu_seconds(engine.ffmpeg_process) if engine.ffmpeg_process else None
+    except Exception:
+        return None
+
+
+def unpaused_mask(records, times):
+    """Events the engine is expected to log: those outside the scripted pauses."""
+    pauses = records[(records["type"] == EVENT_PAUSE_START) | (records["type"] == EVENT_PAUSE_END)]
+    keep = np.ones(len(times), dtype=bool)
+    start = None
+    for record in pauses:
+        if record["type"] == EVENT_PAUSE_START:
+            start = record["time"]
+        elif start is not None:
+            keep &= ~((times >= start) & (times <= record["time"]))
+            start = None
+    if start is not None:
+        keep &= times < start
+    return keep
+
+
+def percentiles_ms(values):
+    if not len(values):
+        return None
+    p50, p99 = np.percentile(np.asarray(values) * 1000.0, [50, 99])
+    return {"p50": round(float(p50), 3), "p99": round(float(p99), 3),
+            "max": round(float(np.max(values) * 1000.0), 3)}
+
+
+def fidelity(sent, logged, speed=1.0):
+    """Compare the replayed stream with the event log the engine wrote."""
+    result = {}
+    # Replay time, which is what the engine's log is relative to
+    sent = sent.copy()
+    sent["time"] /= speed
+    sent_clicks = sent[sent["type"] == EVENT_CLICK]
+    sent_clicks = sent_clicks[unpaused_mask(sent, sent_clicks["time"])]
+    logged_clicks = logged[logged["type"] == EVENT_CLICK]
+    result["clicks_sent"] = len(sent_clicks)
+    result["clicks_logged"] = len(logged_clicks)
+    n = min(len(sent_clicks), len(logged_clicks))
+    result["click_time_error_ms"] = percentiles_ms(np.abs(logged_clicks["time"][:n] - sent_clicks["time"][:n]))
+
+    result["pauses_sent"] = int(np.sum(sent["type"] == EVENT_PAUSE_START))
+    result["pauses_logged"] = int(np.sum(logged["type"] == EVENT_PAUSE_START))
+
+    sent_moves = sent[sent["type"] == EVENT_MOVE]
+    sent_moves = sent_moves[unpaused_mask(sent, sent_moves["time"])]
+    logged_moves = logged[logged["type"] == EVENT_MOVE]
+    result["moves_sent"] = len(sent_moves)
+    result["moves_logged"] = len(logged_moves)
+    if len(sent_moves) and len(logged_moves) > 1:
+        # Position the log implies at each replayed move (what the renderer would draw)
+        order = np.argsort(logged_moves["time"], kind="stable")
+        t = logged_moves["time"][order]
+        x = np.interp(sent_moves["time"], t, logged_moves["x"][order].astype(np.float64))
+        y = np.interp(sent_moves["time"], t, logged_moves["y"][order].astype(np.float64))
+        error = np.hypot(x - sent_moves["x"], y - sent_moves["y"])
+        result["path_error_px"] = {"rms": round(float(np.sqrt(np.mean(error ** 2))), 3),
+                                   "p99": round(float(np.percentile(error, 99)), 3),
+                                   "max": round(float(error.max()), 3)}
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless recording session with replayed input events")
+    parser.add_argument("--events", help="replay this event log instead of a generated session")
+    parser.add_argument("--duration", type=float, default=20.0, help="generated session length in seconds")
+    parser.add_argument("--move-hz", type=float, default=120.0, help="generated mouse move rate")
+    parser.add_argument("--click-interval", type=float, default=2.0, help="seconds between clicks (0: none)")
+    parser.add_argument("--pauses", type=int, default=1, help="number of generated pauses")
+    parser.add_argument("--size", default="1280x720", help="capture region WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--backend", default="lavfi", help="capture backend (lavfi needs no display)")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="move_tolerance_px of the event journal")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    parser.add_argument("--render", action="store_true", help="also run the post-process after recording")
+    parser.add_argument("--workdir", help="where the recording is written (default: temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the recording files")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+    except ValueError:
+        parser.error("expected --size WIDTHxHEIGHT")
+
+    if args.events:
+        source = ReplayEventSource.from_event_log(args.events, args.speed)
+    else:
+        source = ReplayEventSource(synthetic_session(args.duration, width, height, args.move_hz,
+                                                     args.click_interval, args.pauses), args.speed)
+    session_length = float(source.records["time"][-1]) / args.speed if len(source.records) else 0.0
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="openfocus_replay_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    engine = FFmpegRecordEngine()
+    engine.save_path = workdir
+    engine.fps = args.fps
+    engine.record_region = {"left": 0, "top": 0, "width": width, "height": height}
+    engine.capture_backend = args.backend
+    engine.audio_mode = AudioRecorder.MODE_NONE
+    engine.move_tolerance_px = args.tolerance
+    engine.render_on_stop = args.render
+    engine.event_source = source
+
+    # Engine and replay logs go to stderr; stdout is reserved for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        self_cpu = time.process_time()
+        child_cpu = children_cpu_seconds()
+        start = time.perf_counter()
+        runner = threading.Thread(target=engine.run)
+        runner.start()
+        source.wait(session_length + 30.0)
+        recorded = time.perf_counter() - start
+        self_cpu = time.process_time() - self_cpu
+        engine.stop()
+        runner.join()
+        child_cpu = ffmpeg_cpu_seconds(engine, child_cpu)
+
+    if os.path.exists(engine.click_log_file):
+        logged = np.array(EventLog.load(engine.click_log_file).records)
+    else:
+        logged = EventLog.empty().records
+    capture = engine.capture_metrics.report() if engine.capture_metrics else {}
+    capture.pop("samples", None)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "backend": engine.backend.name if engine.backend else args.backend,
+        "size": [width, height],
+        "fps": args.fps,
+        "events_replayed": source.events_sent,
+        "events_dropped": engine.event_buffer.dropped if engine.event_buffer else 0,
+        "recorded_s": round(recorded, 3),
+        # Recorder process (hooks, journal, replay) vs capture ffmpeg, in busy cores
+        "python_cpu_cores": round(self_cpu / recorded, 3) if recorded > 0 else None,
+        "ffmpeg_cpu_cores": round(child_cpu / recorded, 3) if recorded > 0 and child_cpu is not None else None,
+        "callback_lateness_ms": percentiles_ms(source.lateness),
+        "fidelity": fidelity(source.records, logged, args.speed),
+        "capture": capture
+    }
+
+    if not args.keep:
+        base = engine.output_file.replace(".mp4", "")
+        for path in glob.glob(glob.escape(base) + "*"):
+            os.remove(path)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
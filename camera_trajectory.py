@@ -0,0 +1,221 @@
+"""
+相机轨迹预计算
+根据点击/移动日志，一次性向量化计算每一输出帧的缩放、镜头中心和鼠标位置
+"""
+import json
+import numpy as np
+
+
+class CameraTrajectory:
+    """
+    Per-frame camera path. All attributes are NumPy arrays of equal length,
+    one entry per rendered (non-paused) frame:
+
+        times                 frame timestamp in seconds
+        zoom                  zoom factor
+        center_x, center_y    camera center in source pixels
+        cursor_x, cursor_y    virtual cursor position in source pixels
+        click_time            time of the last applied click (-100 if none)
+        click_x, click_y      coordinates of that click
+    """
+    FIELDS = ("times", "zoom", "center_x", "center_y", "cursor_x", "cursor_y",
+              "click_time", "click_x", "click_y")
+
+    def __init__(self, params=None, **arrays):
+        self.params = params or {}
+        for name in self.FIELDS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self):
+        return len(self.times)
+
+    def frame_index(self, current_time):
+        """Index of the trajectory frame closest to current_time (O(log n))."""
+        i = int(np.searchsorted(self.times, current_time))
+        if i >= len(self.times):
+            return len(self.times) - 1
+        if i > 0 and current_time - self.times[i - 1] < self.times[i] - current_time:
+            return i - 1
+        return i
+
+    def slice(self, start, end):
+        """Sub-trajectory for frames [start, end), e.g. for a partial render."""
+        return CameraTrajectory(self.params, **{name: getattr(self, name)[start:end] for name in self.FIELDS})
+
+    def state(self, i):
+        """Easing and click state after frame i, to continue the path with compute_trajectory(state=...)."""
+        return (float(self.zoom[i]), float(self.center_x[i]), float(self.center_y[i]),
+                float(self.click_time[i]), float(self.click_x[i]), float(self.click_y[i]))
+
+    def scaled(self, factor, factor_y=None):
+        """
+        Copy with pixel coordinates multiplied by factor (x) and factor_y
+        (y, defaults to factor); zoom and times are unchanged.
+        """
+        if factor_y is None:
+            factor_y = factor
+        arrays = {name: getattr(self, name) for name in self.FIELDS}
+        for name in ("center_x", "cursor_x", "click_x"):
+            arrays[name] = arrays[name] * factor
+        for name in ("center_y", "cursor_y", "click_y"):
+            arrays[name] = arrays[name] * factor_y
+        params = dict(self.params, scale=factor, scale_y=factor_y)
+        return CameraTrajectory(params, **arrays)
+
+    def save(self, path):
+        np.savez(path, params=np.array(json.dumps(self.params)),
+                 **{name: getattr(self, name) for name in self.FIELDS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            params = json.loads(str(data["params"]))
+            return cls(params, **{name: data[name] for name in cls.FIELDS})
+
+
+def _ease(targets, initial, rate):
+    """
+    Vectorized form of the per-frame easing `v += (target - v) * speed`.
+
+    Within a run of constant target the recurrence has the closed form
+    v[a + m] = T + (v[a - 1] - T) * rate ** (m + 1), so only the (few) runs
+    between click events are iterated in Python.
+    """
+    n = len(targets)
+    out = np.empty(n, dtype=np.float64)
+    if n == 0:
+        return out
+    boundaries = np.flatnonzero(np.diff(targets)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [n]))
+    prev = float(initial)
+    for a, b in zip(starts, ends):
+        target = targets[a]
+        decay = rate ** np.arange(1, b - a + 1, dtype=np.float64)
+        out[a:b] = target + (prev - target) * decay
+        prev = out[b - 1]
+    return out
+
+
+def interpolate_cursor(times, move_times, move_x, move_y, mode="linear", smoothing=0.0):
+    """
+    Cursor position at every frame timestamp in one vectorized pass.
+
+    Args:
+        mode: "linear" interpolates between logged samples (np.interp);
+              "hold" snaps to the last sample at or before the frame
+        smoothing: optional Gaussian smoothing, sigma in seconds
+
+    Returns:
+        tuple: (cursor_x, cursor_y) float arrays
+    """
+    times = np.asarray(times, dtype=np.float64)
+    move_times = np.asarray(move_times, dtype=np.float64)
+    move_x = np.asarray(move_x, dtype=np.float64)
+    move_y = np.asarray(move_y, dtype=np.float64)
+
+    if mode == "hold":
+        # Last move at or before the frame (first move if none yet)
+        idx = np.maximum(np.searchsorted(move_times, times, side='right') - 1, 0)
+        cursor_x, cursor_y = move_x[idx], move_y[idx]
+    else:
+        # Before the first / after the last sample np.interp clamps, same as hold
+        cursor_x = np.interp(times, move_times, move_x)
+        cursor_y = np.interp(times, move_times, move_y)
+
+    if smoothing > 0 and len(times) > 1:
+        frame_dt = max(float(np.median(np.diff(times))), 1e-6)
+        sigma = smoothing / frame_dt
+        radius = int(3 * sigma)
+        if radius > 0:
+            offsets = np.arange(-radius, radius + 1, dtype=np.float64)
+            kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+            kernel /= kernel.sum()
+            cursor_x = np.convolve(np.pad(cursor_x, radius, mode='edge'), kernel, mode='valid')
+            cursor_y = np.convolve(np.pad(cursor_y, radius, mode='edge'), kernel, mode='valid')
+
+    return cursor_x, cursor_y
+
+
+def compute_trajectory(times, click_times, click_x, click_y, move_times, move_x, move_y,
+                       width, height, zoom_max=1.3, smooth_speed=0.15, zoom_duration=1.0,
+                       cursor_interpolation="linear", cursor_smoothing=0.0, state=None):
+    """
+    Compute the camera path for the given frame timestamps.
+
+    Args:
+        times: sorted timestamps (seconds) of the frames that will be rendered
+        click_*: sorted click log columns
+        move_*: sorted mouse-move log columns
+        width, height: source frame size
+        cursor_interpolation, cursor_smoothing: see interpolate_cursor()
+        state: CameraTrajectory.state() of the frame just before times[0],
+               to continue a path computed earlier; click_* must then only
+               hold the clicks after that frame
+
+    Returns:
+        CameraTrajectory
+    """
+    times = np.asarray(times, dtype=np.float64)
+    click_times = np.asarray(click_times, dtype=np.float64)
+    move_times = np.asarray(move_times, dtype=np.float64)
+    n = len(times)
+    half_w, half_h = width // 2, height // 2
+
+    # Clicks: a click is applied on the first frame at or after it, and that
+    # frame's time becomes the effect start (synced with video time)
+    applied = np.searchsorted(click_times, times, side='right')  # clicks seen so far
+    has_click = applied > 0
+    last = np.maximum(applied - 1, 0)
+    click_time = np.full(n, -100.0)
+    click_cx = np.zeros(n)
+    click_cy = np.zeros(n)
+    if len(click_times):
+        apply_frame = np.minimum(np.searchsorted(times, click_times, side='left'), max(n - 1, 0))
+        click_time = np.where(has_click, times[apply_frame[last]], -100.0)
+        click_cx = np.where(has_click, np.asarray(click_x, dtype=np.float64)[last], 0.0)
+        click_cy = np.where(has_click, np.asarray(click_y, dtype=np.float64)[last], 0.0)
+
+    initial = (1.0, half_w, half_h)
+    if state is not None:
+        initial = state[:3]
+        prior_time, prior_x, prior_y = state[3:]
+        if prior_time > -100.0:
+            # Frames before the first new click keep the click applied earlier
+            click_time = np.where(has_click, click_time, prior_time)
+            click_cx = np.where(has_click, click_cx, prior_x)
+            click_cy = np.where(has_click, click_cy, prior_y)
+            has_click = np.ones(n, dtype=bool)
+
+    active = has_click & (times - click_time < zoom_duration)
+    target_zoom = np.where(active, zoom_max, 1.0)
+    target_x = np.where(active, click_cx, half_w)
+    target_y = np.where(active, click_cy, half_h)
+
+    rate = 1.0 - smooth_speed
+    zoom = _ease(target_zoom, initial[0], rate)
+    center_x = _ease(target_x, initial[1], rate)
+    center_y = _ease(target_y, initial[2], rate)
+
+    if len(move_times):
+        cursor_x, cursor_y = interpolate_cursor(times, move_times, move_x, move_y,
+                                                cursor_interpolation, cursor_smoothing)
+    else:
+        cursor_x = np.full(n, float(half_w))
+        cursor_y = np.full(n, float(half_h))
+
+    params = {
+        "width": width,
+        "height": height,
+        "zoom_max": zoom_max,
+        "smooth_speed": smooth_speed,
+        "zoom_duration": zoom_duration,
+        "cursor_interpolation": cursor_interpolation,
+        "cursor_smoothing": cursor_smoothing
+    }
+    return CameraTrajectory(
+        params,
+        times=times, zoom=zoom, center_x=center_x, center_y=center_y,
+        cursor_x=cursor_x, cursor_y=cursor_y,
+        click_time=click_time, click_x=click_cx, click_y=click_cy
+    )
@@ -0,0 +1,306 @@
+"""
+屏幕采集后端
+为录制引擎提供可替换的视频输入：Windows gdigrab、Linux x11grab（支持 Xvfb）、基于 mss 的进程内抓屏（经 stdin 送入 ffmpeg）
+以及 lavfi 合成画面；并可测量各后端在指定区域大小下可持续的采集帧率
+"""
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from utils.path_utils import get_ffmpeg_path
+
+BACKEND_AUTO = "auto"
+BACKEND_GDIGRAB = "gdigrab"
+BACKEND_X11GRAB = "x11grab"
+BACKEND_MSS = "mss"
+BACKEND_LAVFI = "lavfi"
+
+# Size used when there is no region and the backend cannot tell the screen size
+DEFAULT_SIZE = (1920, 1080)
+
+_FRAME_RE = re.compile(r"frame=\s*(\d+)")
+
+
+def even_region(region):
+    """Region with even width/height (required by x264 4:2:0 and most lossless codecs)."""
+    if not region:
+        return None
+    w = region['width']
+    h = region['height']
+    return {
+        'left': region['left'],
+        'top': region['top'],
+        'width': w if w % 2 == 0 else w - 1,
+        'height': h if h % 2 == 0 else h - 1
+    }
+
+
+class CaptureBackend:
+    """
+    A video source for the capture ffmpeg process.
+
+    input_args() returns the ffmpeg options that go before the output
+    options. Backends with uses_stdin grab frames in this process and feed
+    them to ffmpeg's stdin as rawvideo: start() is called with the running
+    ffmpeg process and stop() ends the stream (closing stdin makes ffmpeg
+    finalize the file, instead of the usual 'q' command).
+    """
+    name = None
+    uses_stdin = False
+    # Set by stdin-fed backends when grabbing fails; the stream is then ended
+    error = None
+
+    def is_available(self):
+        return True
+
+    def input_args(self, region, fps):
+        raise NotImplementedError
+
+    def start(self, process):
+        pass
+
+    def stop(self):
+        pass
+
+    def probe(self, region, fps=120, seconds=3.0):
+        """
+        Capture for `seconds` as fast as the backend allows (up to `fps`)
+        and report the sustained rate.
+
+        Returns:
+            dict: backend, available, requested_fps, frames, fps, error
+        """
+        result = {"backend": self.name, "available": self.is_available(), "requested_fps": fps,
+                  "frames": 0, "fps": None, "error": None}
+        if not result["available"]:
+            result["error"] = "not available on this system"
+            return result
+        cmd = [get_ffmpeg_path(), '-hide_banner', '-nostdin'] + self.input_args(region, fps)
+        cmd.extend(['-t', str(seconds), '-f', 'null', '-'])
+        creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        try:
+            start = time.perf_counter()
+            proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                  creationflags=creationflags, timeout=seconds + 30)
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            result["error"] = str(e)
+            return result
+        stderr = proc.stderr.decode("utf-8", errors="replace")
+        frames = _FRAME_RE.findall(stderr)
+        if proc.returncode != 0 or not frames:
+            result["error"] = stderr.strip().splitlines()[-1] if stderr.strip() else f"exit code {proc.returncode}"
+            return result
+        result["frames"] = int(frames[-1])
+        # Wall time includes ffmpeg start-up; it is small next to `seconds`
+        result["fps"] = round(result["frames"] / max(elapsed, seconds), 1)
+        return result
+
+
+class GdigrabBackend(CaptureBackend):
+    """Windows GDI screen grab (the original capture path)."""
+    name = BACKEND_GDIGRAB
+
+    def is_available(self):
+        return os.name == 'nt'
+
+    def input_args(self, region, fps):
+        args = ['-f', 'gdigrab', '-draw_mouse', '0', '-framerate', str(int(fps))]
+        region = even_region(region)
+        if region:
+            args.extend(['-offset_x', str(region['left']), '-offset_y', str(region['top']),
+                         '-video_size', f"{region['width']}x{region['height']}"])
+        args.extend(['-i', 'desktop'])
+        return args
+
+
+class X11grabBackend(CaptureBackend):
+    """X11 screen grab on Linux; works on a real display or under Xvfb ($DISPLAY)."""
+    name = BACKEND_X11GRAB
+
+    def is_available(self):
+        return sys.platform.startswith("linux") and bool(os.environ.get("DISPLAY"))
+
+    def input_args(self, region, fps):
+        display = os.environ.get("DISPLAY", ":0")
+        args = ['-f', 'x11grab', '-draw_mouse', '0', '-framerate', str(int(fps))]
+        region = even_region(region)
+        if region:
+            args.extend(['-video_size', f"{region['width']}x{region['height']}",
+                         '-i', f"{display}+{region['left']},{region['top']}"])
+        else:
+            # Recent ffmpeg grabs the whole screen when no size is given
+            args.extend(['-i', display])
+        return args
+
+
+class MssBackend(CaptureBackend):
+    """
+    Grabs with mss in a feeder thread and pipes BGRA frames to ffmpeg.
+    Frames are timestamped by ffmpeg on arrival, so a grab that falls
+    behind shows up as a lower frame rate rather than as drift.
+    """
+    name = BACKEND_MSS
+    uses_stdin = True
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+        self._process = None
+        self._monitor = None
+        self._fps = 30.0
+        self.frames_fed = 0
+
+    def is_available(self):
+        try:
+            import mss  # noqa: F401
+        except ImportError:
+            return False
+        # mss grabs through X11 on Linux: without a display it can only fail
+        return not sys.platform.startswith("linux") or bool(os.environ.get("DISPLAY"))
+
+    def _resolve_monitor(self, region):
+        region = even_region(region)
+        if region:
+            return region
+        import mss
+        with mss.mss() as sct:
+            m = sct.monitors[1]
+        return even_region({'left': m['left'], 'top': m['top'], 'width': m['width'], 'height': m['height']})
+
+    def input_args(self, region, fps):
+        self._monitor = self._resolve_monitor(region)
+        self._fps = fps
+        return ['-f', 'rawvideo', '-pix_fmt', 'bgra',
+                '-video_size', f"{self._monitor['width']}x{self._monitor['height']}",
+                '-framerate', str(int(fps)), '-use_wallclock_as_timestamps', '1', '-i', '-']
+
+    def start(self, process):
+        self._process = process
+        self._stop.clear()
+        self.frames_fed = 0
+        self.error = None
+        self._thread = threading.Thread(target=self._feed)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _feed(self):
+        import mss
+        interval = 1.0 / self._fps
+        next_frame = time.perf_counter()
+        try:
+            with mss.mss() as sct:
+                while not self._stop.is_set():
+                    self._process.stdin.write(sct.grab(self._monitor).raw)
+                    self.frames_fed += 1
+                    next_frame += interval
+                    delay = next_frame - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        # Behind schedule: grab the next frame right away, don't try to catch up
+                        next_frame = time.perf_counter()
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+        except Exception as e:
+            self.error = f"mss capture error: {e}"
+            print(self.error)
+            # End the stream so ffmpeg exits instead of waiting for frames
+            self._close_stdin()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._close_stdin()
+
+    def _close_stdin(self):
+        if self._process and self._process.stdin:
+            try:
+                self._process.stdin.close()
+            except Exception:
+                pass
+
+    def probe(self, region, fps=120, seconds=3.0):
+        # In-process: how fast mss itself can grab this region
+        result = {"backend": self.name, "available": self.is_available(), "requested_fps": fps,
+                  "frames": 0, "fps": None, "error": None}
+        if not result["available"]:
+            result["error"] = "mss is not installed or there is no display"
+            return result
+        try:
+            import mss
+            monitor = self._resolve_monitor(region)
+            interval = 1.0 / fps
+            with mss.mss() as sct:
+                start = time.perf_counter()
+                next_frame = start
+                while time.perf_counter() - start < seconds:
+                    sct.grab(monitor)
+                    result["frames"] += 1
+                    next_frame += interval
+                    delay = next_frame - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                elapsed = time.perf_counter() - start
+            result["fps"] = round(result["frames"] / elapsed, 1)
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+
+class LavfiBackend(CaptureBackend):
+    """
+    Synthetic ffmpeg test pattern at the region size: runs anywhere without
+    a display, for headless tests and benchmarks of the capture pipeline.
+    """
+    name = BACKEND_LAVFI
+
+    def input_args(self, region, fps):
+        region = even_region(region)
+        w, h = (region['width'], region['height']) if region else DEFAULT_SIZE
+        # -re paces it like a real screen grab
+        return ['-re', '-f', 'lavfi', '-i', f"testsrc2=size={w}x{h}:rate={int(fps)}"]
+
+    def probe(self, region, fps=120, seconds=3.0):
+        result = super().probe(region, fps, seconds)
+        result["note"] = "paced to the requested rate (-re)"
+        return result
+
+
+BACKENDS = {
+    BACKEND_GDIGRAB: GdigrabBackend,
+    BACKEND_X11GRAB: X11grabBackend,
+    BACKEND_MSS: MssBackend,
+    BACKEND_LAVFI: LavfiBackend
+}
+
+
+def create_backend(name=BACKEND_AUTO):
+    """
+    Backend instance by name. "auto" picks gdigrab on Windows, x11grab when
+    an X display is available, mss where it can grab the screen and the
+    lavfi test pattern otherwise.
+    """
+    if name in (None, BACKEND_AUTO):
+        for candidate in (BACKEND_GDIGRAB, BACKEND_X11GRAB, BACKEND_MSS):
+            backend = BACKENDS[candidate]()
+            if backend.is_available():
+                return backend
+        return LavfiBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown capture backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def probe_backends(region=None, fps=120, seconds=3.0, names=None):
+    """Probe every (or the named) backend at the region size; unavailable ones are reported, not run."""
+    results = []
+    for name in names or BACKENDS:
+        backend = BACKENDS[name]()
+        print(f"Probing capture backend: {name}")
+        results.append(backend.probe(region, fps, seconds))
+    return results
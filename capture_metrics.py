@@ -0,0 +1,172 @@
+"""
+录制健康指标
+解析 ffmpeg -progress 输出的实时采集数据（已采集帧数、实际帧率、重复/丢弃帧、速度、码率、文件大小），并生成录制报告
+"""
+import json
+import threading
+import time
+
+# Warn at most this often while frames keep being duplicated or dropped
+WARN_INTERVAL = 5.0
+# Samples kept for the report; beyond this they are thinned to half and the interval doubled
+MAX_SAMPLES = 600
+
+
+def _parse_number(value):
+    """ffmpeg progress values: plain numbers, "1.00x", "1234.5kbits/s" or "N/A"."""
+    value = value.strip()
+    for suffix in ("kbits/s", "x"):
+        if value.endswith(suffix):
+            value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class CaptureMetrics:
+    """
+    Live capture statistics from ffmpeg's `-progress pipe:1` key=value blocks.
+
+    feed() is called with every stdout line from the ffmpeg reader thread;
+    a block is published when its closing `progress=continue|end` line
+    arrives. snapshot() is safe to call from any thread (the GUI polls it).
+
+    dup/drop are ffmpeg's frame duplication and drop counters: with a
+    screen grabber they grow when capture or the encoder cannot keep up with
+    the requested frame rate.
+
+    elapsed_s counts from start() (called when capture actually started),
+    or from the first progress block if start() was never called, so
+    ffmpeg's start-up time is not counted as missing frames.
+    """
+    def __init__(self, target_fps, sample_interval=1.0, max_samples=MAX_SAMPLES):
+        self.target_fps = target_fps
+        self.sample_interval = sample_interval
+        self.max_samples = max_samples
+        self.samples = []
+        self.warnings = []
+        self._lock = threading.Lock()
+        self._block = {}
+        self._latest = None
+        self._start = None
+        self._last_sample = None
+        self._min_fps = None
+        self._min_speed = None
+        self._last_warn = 0.0
+        self._warned_counts = (0, 0)
+
+    def start(self):
+        """Mark the start of capture; later calls are ignored."""
+        with self._lock:
+            if self._start is None:
+                self._start = time.perf_counter()
+
+    def feed(self, line):
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return
+        if key != "progress":
+            self._block[key] = value
+            return
+        block, self._block = self._block, {}
+        self._publish(block, final=value == "end")
+
+    def _publish(self, block, final):
+        self.start()
+        now = time.perf_counter() - self._start
+        frames = int(_parse_number(block.get("frame", "0")) or 0)
+        size = _parse_number(block.get("total_size", "N/A"))
+        out_time_us = _parse_number(block.get("out_time_us", block.get("out_time_ms", "N/A")))
+        metrics = {
+            "elapsed_s": round(now, 3),
+            "frames": frames,
+            "fps": _parse_number(block.get("fps", "N/A")),
+            "dup_frames": int(_parse_number(block.get("dup_frames", "0")) or 0),
+            "drop_frames": int(_parse_number(block.get("drop_frames", "0")) or 0),
+            "speed": _parse_number(block.get("speed", "N/A")),
+            "bitrate_kbps": _parse_number(block.get("bitrate", "N/A")),
+            "total_size": int(size) if size is not None else None,
+            "out_time_s": out_time_us / 1e6 if out_time_us is not None else None,
+            "final": final
+        }
+        with self._lock:
+            previous = self._last_sample
+            if previous is not None and now > previous["elapsed_s"]:
+                # Frames actually written per wall second since the last kept sample
+                metrics["actual_fps"] = round((frames - previous["frames"]) / (now - previous["elapsed_s"]), 2)
+            else:
+                metrics["actual_fps"] = metrics["fps"]
+            self._latest = metrics
+            if final or previous is None or now - previous["elapsed_s"] >= self.sample_interval:
+                self._add_sample(metrics, first=previous is None)
+        self._check_health(metrics, now)
+
+    def _add_sample(self, metrics, first):
+        # Called with the lock held. Minimums are tracked here so thinning does not lose them.
+        if not first and metrics["actual_fps"] is not None:
+            self._min_fps = metrics["actual_fps"] if self._min_fps is None else min(self._min_fps, metrics["actual_fps"])
+        if metrics["speed"] is not None:
+            self._min_speed = metrics["speed"] if self._min_speed is None else min(self._min_speed, metrics["speed"])
+        self.samples.append(metrics)
+        self._last_sample = metrics
+        if len(self.samples) > self.max_samples:
+            # Long recordings: keep covering the whole session at half the resolution
+            self.samples = self.samples[::2] + ([metrics] if len(self.samples) % 2 == 0 else [])
+            self.sample_interval *= 2
+
+    def _check_health(self, metrics, now):
+        counts = (metrics["dup_frames"], metrics["drop_frames"])
+        if counts == self._warned_counts or now - self._last_warn < WARN_INTERVAL:
+            return
+        dup = counts[0] - self._warned_counts[0]
+        drop = counts[1] - self._warned_counts[1]
+        self._warned_counts = counts
+        self._last_warn = now
+        message = (f"Capture falling behind at {metrics['elapsed_s']:.0f}s: "
+                   f"+{dup} duplicated, +{drop} dropped frames (speed {metrics['speed']}x)")
+        print(message)
+        with self._lock:
+            self.warnings.append(message)
+
+    def snapshot(self):
+        """Latest metrics dict, or None before ffmpeg reported anything."""
+        with self._lock:
+            return dict(self._latest) if self._latest else None
+
+    def report(self):
+        with self._lock:
+            latest = dict(self._latest) if self._latest else {}
+            samples = list(self.samples)
+            warnings = list(self.warnings)
+            min_fps, min_speed, interval = self._min_fps, self._min_speed, self.sample_interval
+        frames = latest.get("frames", 0)
+        elapsed = latest.get("elapsed_s", 0.0)
+        expected = self.target_fps * elapsed
+        return {
+            "target_fps": self.target_fps,
+            "duration_s": elapsed,
+            "frames": frames,
+            "average_fps": round(frames / elapsed, 2) if elapsed > 0 else None,
+            "min_fps": min_fps,
+            "frames_missing": max(0, int(round(expected - frames))) if elapsed > 0 else None,
+            "dup_frames": latest.get("dup_frames", 0),
+            "drop_frames": latest.get("drop_frames", 0),
+            "min_speed": min_speed,
+            "bitrate_kbps": latest.get("bitrate_kbps"),
+            "total_size": latest.get("total_size"),
+            "warnings": warnings,
+            "sample_interval_s": interval,
+            "samples": samples
+        }
+
+    def write(self, path, extra=None):
+        data = self.report()
+        if extra:
+            data.update(extra)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            print(f"Capture report saved: {path}")
+        except Exception as e:
+            print(f"Failed to write capture report: {e}")
@@ -0,0 +1,58 @@
+"""
+录制中间格式配置
+原始录像（*_raw.mkv）的无损编码方案：在录制时的 CPU 占用、磁盘写入量与后处理解码/跳转速度之间取舍
+"""
+
+PROFILE_X264_LOSSLESS = "x264_lossless"
+PROFILE_X264_SHORT_GOP = "x264_short_gop"
+PROFILE_X264_INTRA = "x264_intra"
+PROFILE_FFV1 = "ffv1"
+PROFILE_UTVIDEO = "utvideo"
+
+DEFAULT_PROFILE = PROFILE_X264_LOSSLESS
+
+# Every profile is lossless; they differ in how costly frames are to decode
+# and how far back a seek has to start decoding (the GOP length).
+CAPTURE_PROFILES = {
+    # x264 defaults: GOP up to 250 frames, smallest files, slowest seeks
+    PROFILE_X264_LOSSLESS: {
+        "args": ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '0'],
+        "gop_seconds": None
+    },
+    # A keyframe every second: seeks and chunk splits at most 1 s apart
+    PROFILE_X264_SHORT_GOP: {
+        "args": ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '0'],
+        "gop_seconds": 1.0
+    },
+    # Every frame a keyframe: frame-exact seeks, larger files
+    PROFILE_X264_INTRA: {
+        "args": ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '0', '-g', '1'],
+        "gop_seconds": None
+    },
+    # Intra-only lossless codecs built for editing: cheap to decode, largest files
+    PROFILE_FFV1: {
+        "args": ['-c:v', 'ffv1', '-level', '3', '-g', '1', '-slices', '16', '-slicecrc', '0'],
+        "gop_seconds": None
+    },
+    PROFILE_UTVIDEO: {
+        "args": ['-c:v', 'utvideo'],
+        "gop_seconds": None
+    }
+}
+
+
+def capture_codec_args(profile, fps):
+    """
+    ffmpeg encoder options for an intermediate capture profile. Unknown
+    profiles fall back to DEFAULT_PROFILE.
+    """
+    if profile not in CAPTURE_PROFILES:
+        print(f"Unknown capture profile '{profile}', using {DEFAULT_PROFILE}.")
+        profile = DEFAULT_PROFILE
+    spec = CAPTURE_PROFILES[profile]
+    args = list(spec["args"])
+    if spec["gop_seconds"]:
+        gop = max(1, int(round(fps * spec["gop_seconds"])))
+        # Fixed GOP: no scene-cut keyframes in between
+        args.extend(['-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0'])
+    return args
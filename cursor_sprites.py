@@ -0,0 +1,152 @@
+"""
+鼠标与点击波纹精灵缓存
+按输出分辨率和样式预渲染 BGRA 精灵，逐帧只在受影响的 ROI 内做向量化 alpha 混合
+"""
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+RIPPLE_DURATION = 0.5
+RIPPLE_MAX_RADIUS = 50
+
+CURSOR_STYLE_ARROW = "arrow"
+CURSOR_STYLE_ARROW_AA = "arrow_aa"
+CURSOR_STYLE_IMAGE = "image"
+
+
+class Sprite:
+    """Premultiplied BGRA patch with a hotspot, blended into BGR frames."""
+    def __init__(self, bgra, anchor=(0, 0)):
+        self.bgra = bgra
+        self.h, self.w = bgra.shape[:2]
+        self.anchor_x, self.anchor_y = anchor
+        alpha = bgra[..., 3:4].astype(np.uint16)
+        self.color = bgra[..., :3].astype(np.uint16) * alpha
+        self.inv_alpha = 255 - alpha
+
+    def blend(self, img, x, y):
+        """Alpha-blend onto img with the hotspot at (x, y); only the overlapping ROI is touched."""
+        x0 = x - self.anchor_x
+        y0 = y - self.anchor_y
+        img_h, img_w = img.shape[:2]
+        sx, sy = max(0, -x0), max(0, -y0)
+        dx, dy = max(0, x0), max(0, y0)
+        w = min(self.w - sx, img_w - dx)
+        h = min(self.h - sy, img_h - dy)
+        if w <= 0 or h <= 0:
+            return
+        roi = img[dy:dy + h, dx:dx + w]
+        blended = roi * self.inv_alpha[sy:sy + h, sx:sx + w]
+        blended += self.color[sy:sy + h, sx:sx + w]
+        blended += 127
+        blended //= 255
+        roi[:] = blended
+
+
+class SpriteSet:
+    """Cursor sprite plus one ripple sprite per radius step of the click animation."""
+    def __init__(self, cursor, ripples):
+        self.cursor = cursor
+        self.ripples = ripples
+
+    def ripple(self, progress):
+        # One ripple per pixel of radius: RIPPLE_MAX_RADIUS steps at scale 1
+        radius = int(progress * len(self.ripples))
+        return self.ripples[max(0, min(radius, len(self.ripples) - 1))]
+
+
+def _render_arrow(antialiased):
+    # Same arrow as the original fillPoly/polylines cursor: green fill, white outline
+    pad = 2 if antialiased else 0
+    pts = np.array([[0, 0], [0, 15], [10, 10]], np.int32) + pad
+    canvas = np.zeros((16 + 2 * pad, 11 + 2 * pad, 4), dtype=np.uint8)
+    line_type = cv2.LINE_AA if antialiased else cv2.LINE_8
+    cv2.fillPoly(canvas, [pts], (0, 255, 0, 255), lineType=line_type)
+    cv2.polylines(canvas, [pts], True, (255, 255, 255, 255), 1, lineType=line_type)
+    return Sprite(canvas, (pad, pad))
+
+
+def _render_ripple(radius, thickness=2):
+    # Red ring, thickness 2 at full size, centered on the hotspot
+    half = radius + thickness
+    canvas = np.zeros((2 * half + 1, 2 * half + 1, 4), dtype=np.uint8)
+    cv2.circle(canvas, (half, half), radius, (0, 0, 255, 255), thickness)
+    return Sprite(canvas, (half, half))
+
+
+def _scale_sprite(sprite, scale):
+    """Resized copy (e.g. for previews); the hotspot scales with it."""
+    w = max(1, int(round(sprite.w * scale)))
+    h = max(1, int(round(sprite.h * scale)))
+    bgra = cv2.resize(sprite.bgra, (w, h), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+    return Sprite(bgra, (int(round(sprite.anchor_x * scale)), int(round(sprite.anchor_y * scale))))
+
+
+def _to_bgra8(img):
+    """Any image IMREAD_UNCHANGED returns (gray, gray+alpha, BGR, BGRA; 8/16-bit or float) -> uint8 BGRA."""
+    if img.dtype == np.uint16:
+        img = (img >> 8).astype(np.uint8)
+    elif img.dtype != np.uint8:
+        img = np.clip(img.astype(np.float32) * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    if img.ndim == 2:
+        img = img[..., np.newaxis]
+    channels = img.shape[2]
+    if channels == 1:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+    if channels == 2:
+        bgra = cv2.cvtColor(img[..., :1], cv2.COLOR_GRAY2BGRA)
+        bgra[..., 3] = img[..., 1]
+        return bgra
+    if channels == 3:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    return np.ascontiguousarray(img[..., :4])
+
+
+def _load_image_cursor(path):
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        print(f"Cursor image not found: {path}, using default arrow")
+        return _render_arrow(False)
+    return Sprite(_to_bgra8(img), (0, 0))
+
+
+class CursorSpriteCache:
+    """
+    LRU cache of SpriteSets keyed by (output resolution, style, scale).
+    Switching resolution or style renders a new set once; the least recently
+    used set is evicted when the cache is full. scale shrinks the cursor and
+    ripples along with the frame, for reduced-size previews.
+    """
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, width, height, style=CURSOR_STYLE_ARROW, image_path=None, scale=1.0):
+        key = (width, height, style, image_path, scale)
+        with self._lock:
+            sprites = self._entries.get(key)
+            if sprites is not None:
+                self._entries.move_to_end(key)
+                return sprites
+
+            if style == CURSOR_STYLE_IMAGE and image_path:
+                cursor = _load_image_cursor(image_path)
+            else:
+                cursor = _render_arrow(style == CURSOR_STYLE_ARROW_AA)
+            if scale != 1.0:
+                cursor = _scale_sprite(cursor, scale)
+            thickness = max(1, int(round(2 * scale)))
+            steps = max(1, int(round(RIPPLE_MAX_RADIUS * scale)))
+            ripples = [_render_ripple(r, thickness) for r in range(steps)]
+            sprites = SpriteSet(cursor, ripples)
+
+            self._entries[key] = sprites
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return sprites
+
+
+# Global instance
+sprite_cache = CursorSpriteCache()
@@ -0,0 +1,88 @@
+"""
+暂停区间编辑列表
+将暂停事件转换为有序的保留/剔除区间，支持 O(log n) 查询，并驱动解码器跳过暂停片段
+"""
+from bisect import bisect_right
+import numpy as np
+
+
+class EditList:
+    """
+    Sorted, non-overlapping pause intervals [start, end] (both inclusive, as
+    logged by the recording engine). An open pause runs to the end of the
+    video.
+    """
+    OPEN_END = float("inf")
+
+    def __init__(self, pause_intervals=None):
+        merged = []
+        for start, end in sorted(pause_intervals or []):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.intervals = merged
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    @classmethod
+    def from_pause_events(cls, times, is_start):
+        """Build from time-sorted pause events (is_start False means pause_end)."""
+        intervals = []
+        current_pause_start = None
+        for t, start in zip(times, is_start):
+            if start:
+                current_pause_start = float(t)
+            elif current_pause_start is not None:
+                intervals.append((current_pause_start, float(t)))
+                current_pause_start = None
+
+        if current_pause_start is not None:
+            # Assume pause until end of video
+            intervals.append((current_pause_start, cls.OPEN_END))
+        return cls(intervals)
+
+    @classmethod
+    def from_event_log(cls, event_log):
+        return cls.from_pause_events(*event_log.pause_events())
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def is_paused(self, t):
+        i = bisect_right(self.starts, t) - 1
+        return i >= 0 and t <= self.ends[i]
+
+    def keep_mask(self, times):
+        """Vectorized is_paused() negation for an array of timestamps."""
+        times = np.asarray(times, dtype=np.float64)
+        if not self.intervals:
+            return np.ones(len(times), dtype=bool)
+        i = np.searchsorted(np.asarray(self.starts), times, side='right') - 1
+        ends = np.asarray(self.ends)
+        return ~((i >= 0) & (times <= ends[np.maximum(i, 0)]))
+
+    def keep_segments(self, start=0.0, end=None):
+        """
+        Spans of the timeline that are not paused, clipped to [start, end).
+
+        Returns:
+            list: (seg_start, seg_end) pairs; seg_end is None for "until EOF".
+            A segment that begins right after a pause excludes the pause end
+            itself, which callers enforce with is_paused().
+        """
+        start = start or 0.0
+        limit = self.OPEN_END if end is None else end
+        segments = []
+        cursor = start
+        for p_start, p_end in self.intervals:
+            if p_end < cursor:
+                continue
+            if p_start >= limit:
+                break
+            if p_start > cursor:
+                segments.append((cursor, p_start))
+            cursor = max(cursor, p_end)
+        if cursor < limit:
+            segments.append((cursor, end))
+        return segments
@@ -0,0 +1,82 @@
+"""
+鼠标事件环形缓冲区
+钩子线程无锁写入原始 (monotonic_ns, x, y, 类型, 按键)，由日志线程批量取出
+"""
+from array import array
+import numpy as np
+
+
+class EventRingBuffer:
+    """
+    Preallocated single-producer / single-consumer ring of raw input events.
+
+    write() runs on the pynput hook thread and only stores into array slots
+    and bumps the write counter: no lock, no dict, no allocation. The
+    consumer (EventJournal's writer thread) calls drain() to copy everything
+    written so far into NumPy columns.
+
+    Correctness relies on exactly one writer and one reader: the writer
+    publishes a slot by advancing _head only after filling it, the reader
+    frees slots by advancing _tail only after copying them, and each counter
+    is assigned by a single thread (an atomic store under the GIL). When the
+    ring is full new events are dropped and counted rather than overwriting
+    unread ones.
+    """
+    def __init__(self, capacity=65536):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._time_ns = array('q', bytes(8 * capacity))
+        self._x = array('i', bytes(4 * capacity))
+        self._y = array('i', bytes(4 * capacity))
+        self._kind = array('B', bytes(capacity))
+        self._button = array('B', bytes(capacity))
+        self._head = 0  # written by the producer only
+        self._tail = 0  # written by the consumer only
+        self.dropped = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def write(self, time_ns, x, y, kind, button=0):
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self.dropped += 1
+            return False
+        i = head & self._mask
+        self._time_ns[i] = time_ns
+        self._x[i] = x
+        self._y[i] = y
+        self._kind[i] = kind
+        self._button[i] = button
+        self._head = head + 1
+        return True
+
+    def _columns(self, start, stop):
+        return (np.frombuffer(self._time_ns, dtype=np.int64)[start:stop],
+                np.frombuffer(self._x, dtype=np.int32)[start:stop],
+                np.frombuffer(self._y, dtype=np.int32)[start:stop],
+                np.frombuffer(self._kind, dtype=np.uint8)[start:stop],
+                np.frombuffer(self._button, dtype=np.uint8)[start:stop])
+
+    def drain(self):
+        """
+        Copy out all published events in write order.
+
+        Returns:
+            tuple: (time_ns, x, y, kind, button) NumPy arrays (copies)
+        """
+        tail = self._tail
+        head = self._head
+        count = head - tail
+        start = tail & self._mask
+        stop = start + count
+        if stop <= self.capacity:
+            columns = [c.copy() for c in self._columns(start, stop)]
+        else:
+            first = self._columns(start, self.capacity)
+            second = self._columns(0, stop - self.capacity)
+            columns = [np.concatenate(pair) for pair in zip(first, second)]
+        self._tail = head
+        return tuple(columns)
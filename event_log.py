@@ -0,0 +1,261 @@
+"""
+二进制事件日志
+定长记录的紧凑列式格式（时间/x/y/类型/按键），通过内存映射直接读取为 NumPy 数组；
+仍兼容旧版 JSON 点击日志
+"""
+import json
+import os
+import struct
+import threading
+import numpy as np
+from path_simplify import simplify_path
+
+MAGIC = b"OFEVLOG\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sII")  # magic, version, record size
+
+EVENT_MOVE = 0
+EVENT_CLICK = 1
+EVENT_PAUSE_START = 2
+EVENT_PAUSE_END = 3
+
+BUTTON_UNKNOWN = 0
+BUTTON_LEFT = 1
+BUTTON_RIGHT = 2
+BUTTON_MIDDLE = 3
+
+EVENT_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("x", "<i4"),
+    ("y", "<i4"),
+    ("type", "u1"),
+    ("button", "u1"),
+    ("reserved", "u1", (6,))
+])
+
+_TYPE_CODES = {
+    "move": EVENT_MOVE,
+    "click": EVENT_CLICK,
+    "pause_start": EVENT_PAUSE_START,
+    "pause_end": EVENT_PAUSE_END
+}
+
+_BUTTON_CODES = {
+    "left": BUTTON_LEFT,
+    "right": BUTTON_RIGHT,
+    "middle": BUTTON_MIDDLE
+}
+
+
+def button_code(button):
+    """Map a pynput button (or its str(), e.g. 'Button.left') to a button code."""
+    name = str(button).rsplit(".", 1)[-1]
+    return _BUTTON_CODES.get(name, BUTTON_UNKNOWN)
+
+
+def events_to_records(events):
+    """Convert legacy dict events into a structured record array."""
+    records = np.zeros(len(events), dtype=EVENT_DTYPE)
+    if not events:
+        return records
+    # Fallback for old logs: events with a button but no type are clicks
+    kinds = [e.get("type", "click" if "button" in e else "move") for e in events]
+    records["time"] = [e.get("time", 0.0) for e in events]
+    records["x"] = [e.get("x", 0) for e in events]
+    records["y"] = [e.get("y", 0) for e in events]
+    records["type"] = [_TYPE_CODES.get(kind, EVENT_MOVE) for kind in kinds]
+    records["button"] = [button_code(e["button"]) if "button" in e else BUTTON_UNKNOWN for e in events]
+    return records
+
+
+def write_header(f):
+    f.write(HEADER.pack(MAGIC, VERSION, EVENT_DTYPE.itemsize))
+
+
+def write_event_log(path, records):
+    """Write a complete binary event log (records: EVENT_DTYPE array or list of dict events)."""
+    if not isinstance(records, np.ndarray):
+        records = events_to_records(records)
+    with open(path, "wb") as f:
+        write_header(f)
+        f.write(records.astype(EVENT_DTYPE, copy=False).tobytes())
+
+
+class EventLog:
+    """
+    Read-only view of an event log as NumPy columns. Binary logs are
+    memory-mapped, so loading is O(1) regardless of session length.
+    """
+    def __init__(self, records):
+        self.records = records
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, dtype=EVENT_DTYPE))
+
+    @classmethod
+    def from_events(cls, events):
+        return cls(events_to_records(events))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            head = f.read(HEADER.size)
+
+        if len(head) == HEADER.size and head[:len(MAGIC)] == MAGIC:
+            _, version, record_size = HEADER.unpack(head)
+            if record_size != EVENT_DTYPE.itemsize:
+                raise ValueError(f"Unsupported event log record size {record_size} (version {version})")
+            # A trailing partial record (e.g. after a crash mid-write) is ignored
+            count = (os.path.getsize(path) - HEADER.size) // record_size
+            if count == 0:
+                return cls.empty()
+            return cls(np.memmap(path, dtype=EVENT_DTYPE, mode="r", offset=HEADER.size, shape=(count,)))
+
+        # Legacy indented JSON list of dicts
+        with open(path, "r") as f:
+            return cls.from_events(json.load(f))
+
+    def __len__(self):
+        return len(self.records)
+
+    def _select(self, event_type):
+        selected = self.records[self.records["type"] == event_type]
+        order = np.argsort(selected["time"], kind="stable")
+        return selected[order]
+
+    def clicks(self):
+        """Returns: (times, x, y) float arrays sorted by time"""
+        c = self._select(EVENT_CLICK)
+        return c["time"].astype(np.float64), c["x"].astype(np.float64), c["y"].astype(np.float64)
+
+    def moves(self):
+        """Returns: (times, x, y) float arrays sorted by time"""
+        m = self._select(EVENT_MOVE)
+        return m["time"].astype(np.float64), m["x"].astype(np.float64), m["y"].astype(np.float64)
+
+    def pause_events(self):
+        """Returns: (times, is_start) arrays sorted by time"""
+        mask = (self.records["type"] == EVENT_PAUSE_START) | (self.records["type"] == EVENT_PAUSE_END)
+        p = self.records[mask]
+        order = np.argsort(p["time"], kind="stable")
+        p = p[order]
+        return p["time"].astype(np.float64), p["type"] == EVENT_PAUSE_START
+
+
+class EventJournal:
+    """
+    Append-only event log written during recording.
+
+    append() only buffers a small tuple; a background thread converts the
+    batch to fixed-width records and appends it to disk every
+    flush_interval seconds (or sooner once max_pending events are waiting).
+    Memory stays bounded, and if the process dies the file is readable by
+    EventLog.load() up to the last flush.
+
+    High-rate input can bypass append() entirely: events written to an
+    EventRingBuffer are drained on the same thread, with their monotonic_ns
+    stamps converted to seconds relative to time_base_ns. With
+    move_tolerance > 0, the moves of each drained batch are simplified to
+    the points needed to rebuild the path within that many pixels (batch
+    endpoints are always kept, so batches join exactly).
+    """
+    def __init__(self, path, flush_interval=0.5, max_pending=4096, buffer=None, move_tolerance=0.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.buffer = buffer
+        self.move_tolerance = move_tolerance
+        self.time_base_ns = 0
+        self.moves_captured = 0
+        self.moves_kept = 0
+        self.events_written = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._file = None
+        self._thread = None
+
+    def start(self):
+        self._file = open(self.path, "wb")
+        write_header(self._file)
+        self._file.flush()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def append(self, time_s, x=0, y=0, kind=EVENT_MOVE, button=BUTTON_UNKNOWN):
+        with self._lock:
+            self._pending.append((time_s, x, y, kind, button))
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _drain_buffer(self):
+        time_ns, x, y, kind, button = self.buffer.drain()
+        records = np.zeros(len(time_ns), dtype=EVENT_DTYPE)
+        records["time"] = (time_ns - self.time_base_ns) / 1e9
+        records["x"] = x
+        records["y"] = y
+        records["type"] = kind
+        records["button"] = button
+
+        moves = np.flatnonzero(records["type"] == EVENT_MOVE)
+        self.moves_captured += len(moves)
+        if self.move_tolerance > 0 and len(moves) > 2:
+            m = records[moves]
+            kept = simplify_path(m["time"], m["x"], m["y"], self.move_tolerance)
+            drop = np.ones(len(moves), dtype=bool)
+            drop[kept] = False
+            records = np.delete(records, moves[drop])
+            self.moves_kept += len(kept)
+        else:
+            self.moves_kept += len(moves)
+        return records
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        records = np.zeros(len(batch), dtype=EVENT_DTYPE)
+        if batch:
+            columns = list(zip(*batch))
+            records["time"] = columns[0]
+            records["x"] = columns[1]
+            records["y"] = columns[2]
+            records["type"] = columns[3]
+            records["button"] = columns[4]
+        if self.buffer is not None:
+            records = np.concatenate([records, self._drain_buffer()])
+        if len(records) == 0 or self._file is None:
+            return
+        try:
+            self._file.write(records.tobytes())
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.events_written += len(records)
+        except Exception as e:
+            print(f"Event journal write error: {e}")
+
+    def close(self):
+        """Stop the writer thread and flush everything still buffered."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            if self._thread.is_alive():
+                # Still inside a slow write/fsync. It exits after that flush; it must be gone
+                # before the final flush below, since the ring buffer allows only one consumer.
+                print("Event journal: waiting for the writer thread to finish its flush...")
+                self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,177 @@
+"""
+输入事件源
+录制引擎的鼠标事件来源：实时 pynput 监听，或按原始时间重放已录制 / 合成的事件流（点击、移动、暂停/继续），
+用于无界面下可重复地测试录制与事件记录
+"""
+import threading
+import time
+import numpy as np
+from event_log import (EVENT_DTYPE, EVENT_MOVE, EVENT_CLICK, EVENT_PAUSE_START, EVENT_PAUSE_END,
+                       BUTTON_LEFT, BUTTON_RIGHT, BUTTON_MIDDLE, EventLog)
+
+_BUTTON_NAMES = {BUTTON_LEFT: "left", BUTTON_RIGHT: "right", BUTTON_MIDDLE: "middle"}
+
+
+class EventSource:
+    """
+    Delivers mouse input to the recording engine.
+
+    start() registers the engine callbacks: on_click(x, y, button, pressed)
+    and on_move(x, y) with absolute screen coordinates, as pynput calls them,
+    plus on_pause() / on_resume() for sources that script pauses. sync() is
+    called once capture has started, with the monotonic_ns time base of the
+    event log and the recorded region's origin.
+    """
+    def start(self, on_click, on_move, on_pause=None, on_resume=None):
+        raise NotImplementedError
+
+    def sync(self, time_base_ns, origin=(0, 0)):
+        pass
+
+    def position(self):
+        """Current absolute cursor position, or None if unknown."""
+        return None
+
+    def stop(self):
+        pass
+
+
+class PynputEventSource(EventSource):
+    """Live global mouse hooks (pynput is imported on first use, so headless runs never load it)."""
+    def __init__(self):
+        self.listener = None
+
+    def start(self, on_click, on_move, on_pause=None, on_resume=None):
+        from pynput import mouse
+        self.listener = mouse.Listener(on_click=on_click, on_move=on_move)
+        self.listener.start()
+
+    def position(self):
+        import pyautogui
+        x, y = pyautogui.position()
+        return int(x), int(y)
+
+    def stop(self):
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+
+
+class ReplayEventSource(EventSource):
+    """
+    Replays an event stream (EVENT_DTYPE records, times in seconds from the
+    start of the recording, coordinates relative to the recorded region)
+    with its original timing, scaled by `speed`.
+
+    Playback starts at sync(), i.e. when capture has started, so record
+    times line up with the recording the engine produces. Pause/resume
+    records call the engine's pause()/resume(). The callbacks run on the
+    replay thread, just as pynput callbacks run on its hook thread.
+    """
+    def __init__(self, records, speed=1.0):
+        records = np.asarray(records, dtype=EVENT_DTYPE)
+        self.records = records[np.argsort(records["time"], kind="stable")]
+        self.speed = speed
+        self.events_sent = 0
+        self.lateness = []
+        self.finished = threading.Event()
+        self._callbacks = None
+        self._time_base_ns = None
+        self._origin = (0, 0)
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_event_log(cls, path, speed=1.0):
+        """Replay a recorded session's event log (binary or legacy JSON)."""
+        return cls(np.array(EventLog.load(path).records), speed)
+
+    def start(self, on_click, on_move, on_pause=None, on_resume=None):
+        self._callbacks = (on_click, on_move, on_pause, on_resume)
+        self._stop.clear()
+        self.finished.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def sync(self, time_base_ns, origin=(0, 0)):
+        self._time_base_ns = time_base_ns
+        self._origin = origin
+        self._synced.set()
+
+    def position(self):
+        moves = self.records[self.records["type"] == EVENT_MOVE]
+        if not len(moves):
+            return None
+        return int(moves["x"][0]) + self._origin[0], int(moves["y"][0]) + self._origin[1]
+
+    def _run(self):
+        try:
+            while not self._synced.wait(0.1):
+                if self._stop.is_set():
+                    return
+            on_click, on_move, on_pause, on_resume = self._callbacks
+            ox, oy = self._origin
+            times = self.records["time"]
+            for i in range(len(self.records)):
+                due_ns = self._time_base_ns + int(times[i] / self.speed * 1e9)
+                delay = (due_ns - time.monotonic_ns()) / 1e9
+                if delay > 0 and self._stop.wait(delay):
+                    return
+                if self._stop.is_set():
+                    return
+                record = self.records[i]
+                kind = record["type"]
+                if kind == EVENT_MOVE:
+                    on_move(int(record["x"]) + ox, int(record["y"]) + oy)
+                elif kind == EVENT_CLICK:
+                    on_click(int(record["x"]) + ox, int(record["y"]) + oy,
+                             _BUTTON_NAMES.get(int(record["button"]), "left"), True)
+                elif kind == EVENT_PAUSE_START and on_pause:
+                    on_pause()
+                elif kind == EVENT_PAUSE_END and on_resume:
+                    on_resume()
+                self.events_sent += 1
+                self.lateness.append((time.monotonic_ns() - due_ns) / 1e9)
+        finally:
+            self.finished.set()
+
+    def wait(self, timeout=None):
+        """Block until every event was replayed (or the source was stopped)."""
+        return self.finished.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+
+def synthetic_session(duration, width, height, move_hz=60.0, click_interval=2.0, pauses=0,
+                      pause_length=1.0, seed=0):
+    """
+    Generated session: a random-walk cursor at move_hz, a left click every
+    click_interval seconds and `pauses` evenly spaced pauses of pause_length
+    seconds. Returns EVENT_DTYPE records sorted by time.
+    """
+    rng = np.random.default_rng(seed)
+    move_t = np.arange(0.0, duration, 1.0 / move_hz) if move_hz > 0 else np.zeros(1)
+    steps = rng.normal(0.0, 8.0, size=(len(move_t), 2))
+    move_x = np.clip(width / 2 + np.cumsum(steps[:, 0]), 0, width - 1)
+    move_y = np.clip(height / 2 + np.cumsum(steps[:, 1]), 0, height - 1)
+
+    click_t = np.arange(click_interval, duration, click_interval) if click_interval > 0 else np.zeros(0)
+    click_i = np.minimum(np.searchsorted(move_t, click_t), len(move_t) - 1)
+
+    pause_start = (np.arange(1, pauses + 1) * duration / (pauses + 1)) if pauses > 0 else np.zeros(0)
+
+    n_moves, n_clicks, n_pauses = len(move_t), len(click_t), len(pause_start)
+    records = np.zeros(n_moves + n_clicks + 2 * n_pauses, dtype=EVENT_DTYPE)
+    records["time"] = np.concatenate([move_t, click_t, pause_start, pause_start + pause_length])
+    records["x"] = np.concatenate([move_x, move_x[click_i], np.zeros(2 * n_pauses)]).astype(np.int32)
+    records["y"] = np.concatenate([move_y, move_y[click_i], np.zeros(2 * n_pauses)]).astype(np.int32)
+    records["type"] = np.concatenate([np.full(n_moves, EVENT_MOVE), np.full(n_clicks, EVENT_CLICK),
+                                      np.full(n_pauses, EVENT_PAUSE_START), np.full(n_pauses, EVENT_PAUSE_END)])
+    records["button"][n_moves:n_moves + n_clicks] = BUTTON_LEFT
+    return records[np.argsort(records["time"], kind="stable")]
@@ -0,0 +1,256 @@
+"""
+FFmpeg 滤镜图渲染引擎
+将预计算的相机轨迹转换为 sendcmd 命令脚本，由单个 ffmpeg 进程完成裁剪、缩放和鼠标叠加
+"""
+import os
+import subprocess
+import time
+import cv2
+import numpy as np
+from cursor_sprites import RIPPLE_DURATION
+from video_audio_merger import VideoAudioMerger
+from utils.path_utils import get_ffmpeg_path
+
+
+class FFmpegFilterRenderer:
+    """
+    Alternative to the per-frame OpenCV loop: the whole render runs natively
+    in one ffmpeg process with no Python work per frame.
+
+    Camera crop and cursor position are driven by a sendcmd script keyed on
+    output frame time; the cursor is a PNG overlay input. The click ripple
+    is a sprite sheet (one cell per radius step) whose cell is picked by a
+    second crop; it is moved off-screen while no ripple is visible. Paused
+    spans are cut at the input level (one seeked input per kept span,
+    concatenated).
+    """
+    def __init__(self, processor, fps):
+        self.processor = processor
+        self.fps = fps
+
+    def _crop_rect(self, zoom, center):
+        # Must match PostProcessor.apply_zoom exactly
+        width, height = self.processor.width, self.processor.height
+        zoom = max(1.0, zoom)
+        cw = max(1, int(width / zoom))
+        ch = max(1, int(height / zoom))
+        x, y = center
+        x1 = int(max(0, min(x - cw // 2, width - cw)))
+        y1 = int(max(0, min(y - ch // 2, height - ch)))
+        return x1, y1, cw, ch
+
+    def write_commands(self, path, anchor=(0, 0), ripple_cell=None):
+        """
+        Write the sendcmd script for the precomputed trajectory.
+
+        Args:
+            ripple_cell: (cell_size, steps) of the ripple sheet from write_ripples()
+
+        Returns:
+            tuple: initial (crop_x, crop_y, crop_w, crop_h, cursor_x, cursor_y,
+            ripple_y, ripple_x, ripple_draw_y)
+        """
+        tr = self.processor.trajectory
+        width, height = self.processor.width, self.processor.height
+        cell, steps = ripple_cell or (1, 1)
+        half = cell // 2
+        # Fully outside the frame: overlay draws nothing
+        hidden = -cell - 1
+        last = None
+        initial = None
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(len(tr)):
+                x1, y1, cw, ch = self._crop_rect(tr.zoom[i], (tr.center_x[i], tr.center_y[i]))
+                draw_x = int((tr.cursor_x[i] - x1) * (width / cw)) - anchor[0]
+                draw_y = int((tr.cursor_y[i] - y1) * (height / ch)) - anchor[1]
+                # Same visibility and radius step as PostProcessor.draw_effects / SpriteSet.ripple
+                since_click = tr.times[i] - tr.click_time[i]
+                if ripple_cell and tr.click_time[i] > 0 and since_click < RIPPLE_DURATION:
+                    step = max(0, min(int(since_click / RIPPLE_DURATION * steps), steps - 1))
+                    ripple = (step * cell,
+                              int((tr.click_x[i] - x1) * (width / cw)) - half,
+                              int((tr.click_y[i] - y1) * (height / ch)) - half)
+                else:
+                    ripple = (0, hidden, hidden)
+                values = (x1, y1, cw, ch, draw_x, draw_y) + ripple
+                if initial is None:
+                    initial = values
+                if values == last:
+                    continue
+                # Output frame i is at i / fps; keying on the midpoint before it keeps
+                # float rounding from applying a command one frame late (or early)
+                t = max(0.0, (i - 0.5) / self.fps)
+                f.write(f"{t:.6f} crop@cam w {cw}, crop@cam h {ch}, "
+                        f"crop@cam x {x1}, crop@cam y {y1}, "
+                        f"overlay@cursor x {draw_x}, overlay@cursor y {draw_y}")
+                if ripple_cell:
+                    f.write(f", crop@ripple y {ripple[0]}, overlay@ripple x {ripple[1]}, overlay@ripple y {ripple[2]}")
+                f.write(";\n")
+                last = values
+        return initial
+
+    def write_cursor(self, path):
+        """
+        Write the cursor sprite used by draw_effects as a PNG.
+
+        Returns:
+            tuple: hotspot (x, y) inside the image
+        """
+        cursor = self.processor.sprites.cursor
+        cv2.imwrite(path, cursor.bgra)
+        return cursor.anchor_x, cursor.anchor_y
+
+    def write_ripples(self, path):
+        """
+        Write the ripple sprites as a vertical sheet of equal square cells,
+        each ring centered in its cell.
+
+        Returns:
+            tuple: (cell_size, steps)
+        """
+        ripples = self.processor.sprites.ripples
+        half = max(max(r.anchor_x, r.w - 1 - r.anchor_x, r.anchor_y, r.h - 1 - r.anchor_y) for r in ripples)
+        cell = 2 * half + 1
+        sheet = np.zeros((cell * len(ripples), cell, 4), dtype=np.uint8)
+        for k, ripple in enumerate(ripples):
+            x0 = half - ripple.anchor_x
+            y0 = k * cell + half - ripple.anchor_y
+            sheet[y0:y0 + ripple.h, x0:x0 + ripple.w] = ripple.bgra
+        cv2.imwrite(path, sheet)
+        return cell, len(ripples)
+
+    def input_spans(self):
+        """
+        Input seek points for the kept spans of the edit list.
+
+        A span after a pause starts right after the pause end, which is
+        itself paused: seek between the pause end and the first kept frame
+        of the trajectory, so exactly the trajectory's frames reach the
+        concat and the sendcmd script stays aligned. Spans without a kept
+        frame are left out.
+
+        Returns:
+            list: (seek, duration) pairs; duration is None for "until EOF"
+        """
+        times = self.processor.trajectory.times
+        half_frame = 0.5 / self.fps
+        spans = []
+        for seg_start, seg_end in self.processor.edit_list.keep_segments():
+            # Only the recording start is kept itself; a pause end is paused
+            first = int(np.searchsorted(times, seg_start, side='right' if seg_start > 0 else 'left'))
+            if first >= len(times) or (seg_end is not None and times[first] >= seg_end):
+                continue
+            seek = 0.0
+            if seg_start > 0:
+                first_kept = float(times[first])
+                seek = max(first_kept - half_frame, (seg_start + first_kept) / 2)
+            spans.append((seek, None if seg_end is None else seg_end - seek))
+        return spans
+
+    def build_command(self, video_path, audio_path, output_path, cmd_path, cursor_path, ripple_path, ripple_cell,
+                      initial, quality):
+        processor = self.processor
+        cmd = [get_ffmpeg_path(), '-hide_banner', '-loglevel', 'error']
+
+        segments = self.input_spans()
+        for seek, duration in segments:
+            if seek > 0:
+                cmd.extend(['-ss', f"{seek:.6f}"])
+            if duration is not None:
+                cmd.extend(['-t', f"{duration:.6f}"])
+            cmd.extend(['-i', video_path])
+
+        cursor_input = len(segments)
+        cmd.extend(['-loop', '1', '-framerate', repr(float(self.fps)), '-i', cursor_path])
+        ripple_input = cursor_input + 1
+        # Decoded once and repeated by the loop filter; -loop 1 would decode the sheet every frame
+        cmd.extend(['-i', ripple_path])
+
+        audio_input = None
+        if audio_path and os.path.exists(audio_path):
+            audio_input = ripple_input + 1
+            cmd.extend(['-itsoffset', VideoAudioMerger.AUDIO_OFFSET, '-i', audio_path])
+
+        x1, y1, cw, ch, draw_x, draw_y, ripple_y, ripple_x, ripple_draw_y = initial
+        cell = ripple_cell[0]
+        inputs = ''.join(f"[{n}:v]" for n in range(len(segments)))
+        # sendcmd path must survive filtergraph escaping (Windows drive colons)
+        escaped_cmd = cmd_path.replace('\\', '/').replace(':', '\\:')
+        graph = (
+            f"{inputs}concat=n={len(segments)}:v=1:a=0,"
+            f"setpts=N/({self.fps}*TB),"
+            f"sendcmd=f='{escaped_cmd}',"
+            f"crop@cam=w={cw}:h={ch}:x={x1}:y={y1},"
+            f"scale={processor.width}:{processor.height}:flags=bilinear[base];"
+            f"[{ripple_input}:v]loop=loop=-1:size=1,setpts=N/({self.fps}*TB),crop@ripple=w={cell}:h={cell}:x=0:y={ripple_y}[ripple];"
+            f"[base][ripple]overlay@ripple=x={ripple_x}:y={ripple_draw_y}:shortest=1[rippled];"
+            f"[rippled][{cursor_input}:v]overlay@cursor=x={draw_x}:y={draw_y}:shortest=1,"
+            f"format=yuv420p[v]"
+        )
+        cmd.extend(['-filter_complex', graph, '-map', '[v]'])
+        if audio_input is not None:
+            cmd.extend(['-map', f"{audio_input}:a:0", '-c:a', 'aac'])
+
+        crf = VideoAudioMerger.CRF_MAP.get(quality, "23")
+        cmd.extend(['-c:v', 'libx264', '-crf', crf, '-preset', 'veryfast', '-y', output_path])
+        return cmd
+
+    def render(self, video_path, audio_path, output_path, config, progress=None):
+        """
+        Args:
+            progress: optional RenderProgress; ffmpeg is killed when it is cancelled
+
+        Returns:
+            bool: 渲染是否成功；False 时调用方应回退到 OpenCV 渲染
+        """
+        tr = self.processor.trajectory
+        if tr is None or len(tr) == 0 or not VideoAudioMerger.check_ffmpeg():
+            return False
+
+        cmd_path = output_path.replace(".mp4", "_camera.cmd")
+        cursor_path = output_path.replace(".mp4", "_cursor.png")
+        ripple_path = output_path.replace(".mp4", "_ripple.png")
+        try:
+            anchor = self.write_cursor(cursor_path)
+            ripple_cell = self.write_ripples(ripple_path)
+            initial = self.write_commands(cmd_path, anchor, ripple_cell)
+            cmd = self.build_command(video_path, audio_path, output_path, cmd_path, cursor_path, ripple_path,
+                                     ripple_cell, initial, config.get("quality", "medium"))
+            print(f"Starting FFmpeg filter render: {' '.join(cmd)}")
+
+            # Hide console on Windows
+            creationflags = 0
+            if os.name == 'nt':
+                creationflags = subprocess.CREATE_NO_WINDOW
+
+            start = time.perf_counter()
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                                       creationflags=creationflags)
+            while True:
+                try:
+                    _, stderr = process.communicate(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    if progress is None:
+                        continue
+                    if progress.cancelled:
+                        process.kill()
+                        process.communicate()
+                        return False
+                    # One native process: no per-frame progress, only liveness
+                    progress.heartbeat()
+            elapsed = time.perf_counter() - start
+            if process.returncode != 0:
+                print(f"FFmpeg filter render error: {stderr}")
+                return False
+            if progress is not None:
+                progress.advance(len(tr))
+
+            print(f"Render throughput [ffmpeg_filter]: {len(tr)} frames in {elapsed:.2f}s "
+                  f"({len(tr) / max(elapsed, 1e-6):.1f} fps)")
+            return True
+        except Exception as e:
+            print(f"FFmpeg filter render failed: {e}")
+            return False
+        finally:
+            VideoAudioMerger.cleanup_temp_files(cmd_path, cursor_path, ripple_path)
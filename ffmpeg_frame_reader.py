@@ -0,0 +1,179 @@
+"""
+FFmpeg 原始帧解码器
+通过 ffmpeg 输出 rawvideo，并 readinto() 到预分配、可复用的 numpy 缓冲区中
+"""
+import os
+import re
+import queue
+import subprocess
+import threading
+from fractions import Fraction
+import numpy as np
+from utils.path_utils import get_ffmpeg_path
+from utils.video_probe import pts_to_seconds
+
+
+class FFmpegFrameReader:
+    """
+    Decodes a video with a separate ffmpeg process (using ffmpeg's own decode
+    threads) and exposes a cv2.VideoCapture-like read() API.
+
+    Frames are read into a small ring of preallocated buffers, so steady-state
+    decoding allocates nothing. A frame returned by read() stays valid until
+    pool_size further frames have been read; callers that keep frames longer
+    must copy them.
+
+    Per-frame presentation timestamps come from the stream itself (showinfo
+    filter with -copyts), not from polling decoder properties. The integer pts
+    and time base are parsed so the value matches utils.video_probe exactly.
+
+    filters (e.g. "scale=480:270") run inside ffmpeg before showinfo, so
+    frame_size must be the filtered size. skip_frame="nokey" decodes
+    keyframes only.
+    """
+    _PTS_RE = re.compile(r"\bpts:\s*(-?\d+|NOPTS)")
+    _TIME_BASE_RE = re.compile(r"time_base:\s*(\d+)/(\d+)")
+
+    def __init__(self, video_path, frame_size, fps=30.0, pool_size=4,
+                 start_time=None, duration=None, filters=None, skip_frame=None):
+        self.video_path = video_path
+        self.width, self.height = frame_size
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.start_time = start_time
+        self.duration = duration
+        self.filters = filters
+        self.skip_frame = skip_frame
+        self.frame_bytes = self.width * self.height * 3
+        self.pool = [np.empty((self.height, self.width, 3), dtype=np.uint8) for _ in range(max(1, pool_size))]
+        self.pool_idx = 0
+        self.frame_idx = 0
+        self.pts = 0.0
+        self.process = None
+        self._pts_queue = queue.Queue()
+        self._stderr_thread = None
+        self._open()
+
+    def _build_command(self):
+        cmd = [get_ffmpeg_path(), '-hide_banner', '-nostats', '-loglevel', 'info']
+        # Input seeking: jumps to the nearest keyframe, -copyts keeps original timestamps
+        if self.start_time is not None:
+            cmd.extend(['-ss', f"{self.start_time:.6f}"])
+        if self.duration is not None:
+            cmd.extend(['-t', f"{self.duration:.6f}"])
+        if self.skip_frame:
+            cmd.extend(['-skip_frame', self.skip_frame])
+        vf = f"{self.filters},showinfo" if self.filters else 'showinfo'
+        cmd.extend([
+            '-copyts',
+            '-i', self.video_path,
+            '-map', '0:v:0',
+            '-vf', vf,
+            '-vsync', '0',
+            '-f', 'rawvideo',
+            '-pix_fmt', 'bgr24',
+            '-'
+        ])
+        return cmd
+
+    def _open(self):
+        creationflags = 0
+        if os.name == 'nt':
+            creationflags = subprocess.CREATE_NO_WINDOW
+
+        try:
+            self.process = subprocess.Popen(
+                self._build_command(),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=self.frame_bytes,
+                creationflags=creationflags
+            )
+        except Exception as e:
+            print(f"Failed to start FFmpeg decoder: {e}")
+            self.process = None
+            return
+
+        self._stderr_thread = threading.Thread(target=self._parse_stderr)
+        self._stderr_thread.daemon = True
+        self._stderr_thread.start()
+
+    def _parse_stderr(self):
+        """Collect per-frame pts_time values printed by the showinfo filter"""
+        try:
+            time_base = None
+            for line in iter(self.process.stderr.readline, b''):
+                if b'Parsed_showinfo' not in line:
+                    continue
+                text = line.decode('utf-8', errors='replace')
+                if time_base is None:
+                    tb_match = self._TIME_BASE_RE.search(text)
+                    if tb_match:
+                        time_base = Fraction(int(tb_match.group(1)), int(tb_match.group(2)))
+                        continue
+                if 'pts_time:' not in text:
+                    continue
+                match = self._PTS_RE.search(text)
+                if match and match.group(1) != 'NOPTS' and time_base is not None:
+                    self._pts_queue.put(pts_to_seconds(int(match.group(1)), time_base))
+                else:
+                    self._pts_queue.put(None)
+        except Exception:
+            pass
+        finally:
+            self._pts_queue.put(None)
+
+    def isOpened(self):
+        return self.process is not None
+
+    def read(self):
+        """
+        Returns:
+            tuple: (ret, frame) like cv2.VideoCapture.read(); the frame's
+            timestamp in seconds is available as self.pts afterwards
+        """
+        if self.process is None:
+            return False, None
+
+        frame = self.pool[self.pool_idx]
+        view = memoryview(frame).cast('B')
+        filled = 0
+        while filled < self.frame_bytes:
+            n = self.process.stdout.readinto(view[filled:])
+            if not n:
+                return False, None
+            filled += n
+
+        self.pool_idx = (self.pool_idx + 1) % len(self.pool)
+
+        try:
+            pts = self._pts_queue.get(timeout=5.0)
+        except queue.Empty:
+            pts = None
+        if pts is None:
+            # Fallback to frame count
+            pts = (self.start_time or 0.0) + self.frame_idx / self.fps
+        self.pts = pts
+        self.frame_idx += 1
+        return True, frame
+
+    def abort(self):
+        """Kill ffmpeg from another thread; a blocked read() then returns (False, None)."""
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def release(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdout.close()
+        except Exception:
+            pass
+        if self.process.poll() is None:
+            try:
+                self.process.terminate()
+                self.process.wait(timeout=2)
+            except Exception:
+                self.process.kill()
+        self.process = None
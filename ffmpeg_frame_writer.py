@@ -0,0 +1,132 @@
+"""
+FFmpeg 管道编码器
+将处理后的帧通过 stdin 直接送入 ffmpeg 进行 H.264 编码，并在同一进程中合并音频
+"""
+import os
+import subprocess
+import threading
+from collections import deque
+from video_audio_merger import VideoAudioMerger
+from utils.path_utils import get_ffmpeg_path
+
+
+class FFmpegFrameWriter:
+    """
+    Drop-in replacement for cv2.VideoWriter that streams raw BGR frames into a
+    single long-lived ffmpeg process. The audio track (if any) is muxed in the
+    same run, so every recording is encoded exactly once.
+    """
+    def __init__(self, output_path, fps, frame_size, audio_path=None, quality="medium",
+                 preset="veryfast", pix_fmt="bgr24"):
+        self.output_path = output_path
+        self.fps = fps
+        self.width, self.height = frame_size
+        self.audio_path = audio_path if audio_path and os.path.exists(audio_path) else None
+        self.quality = quality
+        self.preset = preset
+        self.pix_fmt = pix_fmt
+        self.process = None
+        self.frames_written = 0
+        self._stderr_tail = deque(maxlen=20)
+        self._stderr_thread = None
+        self._open()
+
+    def _build_command(self):
+        crf = VideoAudioMerger.CRF_MAP.get(self.quality, "23")
+        cmd = [
+            get_ffmpeg_path(),
+            '-loglevel', 'error',
+            '-f', 'rawvideo',
+            '-pix_fmt', self.pix_fmt,
+            '-s', f"{self.width}x{self.height}",
+            '-r', repr(float(self.fps)),
+            '-i', '-'
+        ]
+        if self.audio_path:
+            cmd.extend(['-itsoffset', VideoAudioMerger.AUDIO_OFFSET, '-i', self.audio_path])
+            cmd.extend(['-map', '0:v:0', '-map', '1:a:0'])
+        cmd.extend([
+            '-c:v', 'libx264',
+            '-crf', crf,
+            '-preset', self.preset,
+            '-pix_fmt', 'yuv420p'
+        ])
+        if self.audio_path:
+            cmd.extend(['-c:a', 'aac'])
+        cmd.extend(['-y', self.output_path])
+        return cmd
+
+    def _open(self):
+        if not VideoAudioMerger.check_ffmpeg():
+            return
+
+        cmd = self._build_command()
+        print(f"Starting FFmpeg encoder: {' '.join(cmd)}")
+
+        # Hide console on Windows
+        creationflags = 0
+        if os.name == 'nt':
+            creationflags = subprocess.CREATE_NO_WINDOW
+
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                creationflags=creationflags
+            )
+        except Exception as e:
+            print(f"Failed to start FFmpeg encoder: {e}")
+            self.process = None
+            return
+
+        # Drain stderr so ffmpeg never blocks on a full pipe
+        self._stderr_thread = threading.Thread(target=self._drain_stderr)
+        self._stderr_thread.daemon = True
+        self._stderr_thread.start()
+
+    def _drain_stderr(self):
+        try:
+            for line in iter(self.process.stderr.readline, b''):
+                self._stderr_tail.append(line.decode('utf-8', errors='replace').rstrip())
+        except Exception:
+            pass
+
+    def isOpened(self):
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, frame):
+        """Write one BGR frame. Raises BrokenPipeError if ffmpeg has exited."""
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = frame.copy()
+        self.process.stdin.write(memoryview(frame).cast('B'))
+        self.frames_written += 1
+
+    def abort(self):
+        """Kill ffmpeg from another thread; a blocked write() then fails with BrokenPipeError."""
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def release(self):
+        """
+        Close stdin and wait for ffmpeg to finalize the file.
+
+        Returns:
+            bool: 编码是否成功
+        """
+        if self.process is None:
+            return False
+        try:
+            self.process.stdin.close()
+        except Exception:
+            pass
+        returncode = self.process.wait()
+        if self._stderr_thread:
+            self._stderr_thread.join(timeout=1.0)
+        self.process = None
+        if returncode != 0:
+            print(f"FFmpeg encoder error: {' | '.join(self._stderr_tail)}")
+            return False
+        return True
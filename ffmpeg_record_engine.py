@@ -1,13 +1,18 @@
-
 import os
+import re
 import time
-import json
 import subprocess
 import threading
-from pynput import mouse
 from audio_recorder import AudioRecorder
 from utils.locale_manager import locale_manager
 from utils.path_utils import get_ffmpeg_path
+from event_buffer import EventRingBuffer
+from capture_profiles import DEFAULT_PROFILE, capture_codec_args
+from capture_metrics import CaptureMetrics
+from capture_backends import BACKEND_AUTO, create_backend
+from event_sources import PynputEventSource
+from render_progress import RenderProgress, print_progress, STAGE_FAILED
+from event_log import EventJournal, EVENT_MOVE, EVENT_CLICK, EVENT_PAUSE_START, EVENT_PAUSE_END, button_code
 
 class FFmpegRecordEngine:
     """
@@ -25,6 +30,27 @@ class FFmpegRecordEngine:
         self.output_file = ""
         self.save_path = ""
         self.video_quality = "medium"
+        self.render_mode = "single_pass"
+        self.decoder = "ffmpeg"
+        self.render_engine = "opencv"
+        self.render_threads = min(4, os.cpu_count() or 1)
+        self.cursor_style = "arrow"
+        self.cursor_interpolation = "linear"
+        self.cursor_smoothing = 0.0
+        self.cursor_image = None
+        self.parallel = False
+        self.parallel_workers = None
+        self.move_tolerance_px = 1.0
+        self.render_report = False
+        self.profiler = None
+        self.render_stall_timeout = 120
+        self.resumable = True
+        self.checkpoint_seconds = 30
+        self.checkpoint_min_seconds = 120
+        self.incremental_render = False
+        self.segment_seconds = 30
+        self.capture_profile = DEFAULT_PROFILE
+        self.capture_backend = BACKEND_AUTO
         self.audio_mode = AudioRecorder.MODE_NONE
         
         self.system_volume = 1.0
@@ -37,59 +63,49 @@ class FFmpegRecordEngine:
         
         # Internal state
         self.start_time = None
-        self.click_log = []
+        self.start_time_ns = None  # time.monotonic_ns() at start_time; event timestamps are relative to it
+        self.event_buffer = None
+        self.event_journal = None
+        self.origin_x = 0
+        self.origin_y = 0
         self.click_log_file = ""
         self.video_temp = ""
         self.ffmpeg_process = None
         self.mouse_listener = None
-        self.log_lock = threading.Lock()
-        self.mouse_log_interval = 0.05  # 20 FPS limiting
-        self.last_mouse_log_time = 0
-        
+        self.render_progress = None
+        self.incremental_renderer = None
+        self.capture_metrics = None
+        self.progress_thread = None
+        self.backend = None
+        # Input events: None uses the live mouse (pynput); set an EventSource
+        # such as ReplayEventSource to drive a session headless
+        self.event_source = None
+        self.render_on_stop = True
+
+    # on_click / on_move run on the pynput hook thread (the ring buffer's only
+    # writer): one clock read and a few array stores, no lock or allocation.
     def on_click(self, x, y, button, pressed):
         if pressed and self.is_running and not self.is_paused and self.start_time is not None:
-            with self.log_lock:
-                timestamp = time.time() - self.start_time
-                
-                # Normalize coordinates if recording a region
-                eff_x = int(x)
-                eff_y = int(y)
-                if self.record_region:
-                    eff_x -= self.record_region.get('left', 0)
-                    eff_y -= self.record_region.get('top', 0)
-                
-                self.click_log.append({
-                    "time": timestamp,
-                    "x": eff_x,
-                    "y": eff_y,
-                    "button": str(button),
-                    "type": "click"
-                })
+            # Coordinates are normalized to the recorded region
+            self.event_buffer.write(time.monotonic_ns(), int(x) - self.origin_x, int(y) - self.origin_y,
+                                    EVENT_CLICK, button_code(button))
 
     def on_move(self, x, y):
         if self.is_running and not self.is_paused and self.start_time is not None:
-            # Rate limiting: 10 FPS
-            current_real_time = time.time()
-            if current_real_time - self.last_mouse_log_time < self.mouse_log_interval:
-                return
-            self.last_mouse_log_time = current_real_time
+            # Full input rate; the journal compresses the path (move_tolerance_px) when it drains
+            self.event_buffer.write(time.monotonic_ns(), int(x) - self.origin_x, int(y) - self.origin_y, EVENT_MOVE)
 
-            with self.log_lock:
-                timestamp = time.time() - self.start_time
-                
-                # Normalize coordinates if recording a region
-                eff_x = int(x)
-                eff_y = int(y)
-                if self.record_region:
-                    eff_x -= self.record_region.get('left', 0)
-                    eff_y -= self.record_region.get('top', 0)
+    def _event_time(self):
+        return (time.monotonic_ns() - self.start_time_ns) / 1e9
 
-                self.click_log.append({
-                    "time": timestamp,
-                    "x": eff_x,
-                    "y": eff_y,
-                    "type": "move"
-                })
+    def _mark_started(self):
+        # start_time_ns must be valid before start_time enables the hooks
+        self.start_time_ns = time.monotonic_ns()
+        if self.event_journal:
+            self.event_journal.time_base_ns = self.start_time_ns
+        if self.capture_metrics:
+            self.capture_metrics.start()
+        self.start_time = time.time()
 
 
     def pause(self):
@@ -98,13 +114,8 @@ class FFmpegRecordEngine:
             return
         
         self.is_paused = True
-        if self.start_time:
-            timestamp = time.time() - self.start_time
-            with self.log_lock:
-                self.click_log.append({
-                    "time": timestamp,
-                    "type": "pause_start"
-                })
+        if self.start_time and self.event_journal:
+            self.event_journal.append(self._event_time(), kind=EVENT_PAUSE_START)
         print("Engine paused")
 
     def resume(self):
@@ -112,21 +123,24 @@ class FFmpegRecordEngine:
         if not self.is_running or not self.is_paused:
             return
             
-        if self.start_time:
-            timestamp = time.time() - self.start_time
-            with self.log_lock:
-                self.click_log.append({
-                    "time": timestamp,
-                    "type": "pause_end"
-                })
+        if self.start_time and self.event_journal:
+            self.event_journal.append(self._event_time(), kind=EVENT_PAUSE_END)
         self.is_paused = False
         print("Engine resumed")
 
     def reset(self):
         """重置录制引擎状态，清空所有缓冲区和日志"""
-        with self.log_lock:
-            self.click_log = []
+        if self.event_journal:
+            self.event_journal.close()
+        self.event_journal = None
+        self.event_buffer = None
+        self.render_progress = None
+        self.incremental_renderer = None
+        self.capture_metrics = None
+        self.progress_thread = None
+        self.backend = None
         self.start_time = None
+        self.start_time_ns = None
         self.is_running = False
         self.is_paused = False
         self.output_file = ""
@@ -136,7 +150,6 @@ class FFmpegRecordEngine:
         self.ffmpeg_process = None
         self.ffmpeg_process = None
         self.mouse_listener = None
-        self.last_mouse_log_time = 0
         print("FFmpeg engine reset: all buffers and logs cleared")
 
     def run(self):
@@ -156,7 +169,19 @@ class FFmpegRecordEngine:
             self.output_file = filename
             
         self.video_temp = self.output_file.replace(".mp4", "_raw.mkv")
-        self.click_log_file = self.output_file.replace(".mp4", "_clicks.json")
+        if self.incremental_render:
+            from incremental_renderer import IncrementalRenderer
+            # Rolling raw segments, rendered in the background while recording continues
+            self.incremental_renderer = IncrementalRenderer(
+                self.output_file.replace(".mp4", "_raw_%04d.mkv"),
+                self.output_file.replace(".mp4", "_segments.csv"),
+                self.output_file.replace(".mp4", "_events.bin"),
+                self.output_file,
+                self._render_config(),
+                clock=lambda: time.time() - self.start_time if self.start_time else 0.0,
+                segment_seconds=self.segment_seconds
+            )
+        self.click_log_file = self.output_file.replace(".mp4", "_events.bin")
         
         # Audio Setup
         if self.audio_mode != AudioRecorder.MODE_NONE:
@@ -174,11 +199,29 @@ class FFmpegRecordEngine:
             # 如果没有音频录制，确保 audio_recorder 为 None
             self.audio_recorder = None
 
+        # Event journal: flushed to disk in batches by a background thread while recording;
+        # mouse hooks write to a lock-free ring buffer that the journal thread drains
+        if self.record_region:
+            self.origin_x = self.record_region.get('left', 0)
+            self.origin_y = self.record_region.get('top', 0)
+        else:
+            self.origin_x = self.origin_y = 0
+        self.event_buffer = EventRingBuffer()
+        self.event_journal = EventJournal(self.click_log_file, buffer=self.event_buffer,
+                                          move_tolerance=self.move_tolerance_px)
+        self.event_journal.start()
+
         # Start mouse listener (monitor both click and move)
-        self.mouse_listener = mouse.Listener(on_click=self.on_click, on_move=self.on_move)
-        self.mouse_listener.start()
+        self.mouse_listener = self.event_source or PynputEventSource()
+        self.mouse_listener.start(self.on_click, self.on_move, self.pause, self.resume)
         
         # Start FFmpeg
+        try:
+            self.backend = create_backend(self.capture_backend)
+        except ValueError as e:
+            print(f"{e}; using automatic backend selection.")
+            self.backend = create_backend(BACKEND_AUTO)
+        print(f"Capture backend: {self.backend.name}")
         ffmpeg_cmd = self._build_ffmpeg_command()
         print(f"Starting FFmpeg: {' '.join(ffmpeg_cmd)}")
         
@@ -194,9 +237,16 @@ class FFmpegRecordEngine:
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.PIPE,
                 creationflags=creationflags,
-                universal_newlines=True # Text mode for easier parsing
             )
+            # In-process grabbers start feeding frames to stdin now
+            self.backend.start(self.ffmpeg_process)
             
+            # Live capture health from -progress (stdout); also keeps the pipe drained
+            self.capture_metrics = CaptureMetrics(self.fps)
+            self.progress_thread = threading.Thread(target=self._monitor_progress)
+            self.progress_thread.daemon = True
+            self.progress_thread.start()
+
             # Start a thread to monitor stderr for start signal and prevent blocking
             self.start_event = threading.Event()
             self.stderr_thread = threading.Thread(target=self._monitor_stderr)
@@ -208,35 +258,32 @@ class FFmpegRecordEngine:
                 print("FFmpeg started successfully (synced).")
             else:
                  print("Warning: Timed out waiting for FFmpeg start signal. Using fallback timing.")
-                 self.start_time = time.time()
+                 self._mark_started()
             
             # Record initial mouse position at time 0
             try:
-                import pyautogui
-                init_x, init_y = pyautogui.position()
-                eff_x = int(init_x)
-                eff_y = int(init_y)
-                if self.record_region:
-                    eff_x -= self.record_region.get('left', 0)
-                    eff_y -= self.record_region.get('top', 0)
-                
-                with self.log_lock:
-                    self.click_log.append({
-                        "time": 0.0,
-                        "x": eff_x,
-                        "y": eff_y,
-                        "type": "move"
-                    })
+                position = self.mouse_listener.position()
+                if position:
+                    init_x, init_y = position
+                    eff_x = int(init_x) - self.origin_x
+                    eff_y = int(init_y) - self.origin_y
+                    self.event_journal.append(0.0, eff_x, eff_y, EVENT_MOVE)
             except Exception as e:
                 print(f"Failed to record initial mouse position: {e}")
+            self.mouse_listener.sync(self.start_time_ns, (self.origin_x, self.origin_y))
 
             if self.audio_recorder:
                 self.audio_recorder.set_start_time()
+
+            if self.incremental_renderer:
+                self.incremental_renderer.start()
             
             # Main loop to monitor process and handle pause
             while self.is_running:
                 if self.ffmpeg_process.poll() is not None:
                     print("FFmpeg process exited unexpectedly")
+                    if self.backend.error:
+                        print(f"Capture backend failed: {self.backend.error}")
                     self.is_running = False
                     break
                 
@@ -254,55 +301,79 @@ class FFmpegRecordEngine:
     def _monitor_stderr(self):
         """Monitor FFmpeg stderr for start signal and consume output"""
         try:
+            pending = b''
             while self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-                line = self.ffmpeg_process.stderr.readline()
-                if not line:
+                # Chunked reads split on both '\r' and '\n': the stats line ("frame= ...")
+                # ends with '\r' only, and a binary readline() would hold it back
+                chunk = self.ffmpeg_process.stderr.read1(4096)
+                if not chunk:
                     break
+                *lines, pending = re.split(rb'[\r\n]', pending + chunk)
+                for raw in lines:
+                    line = raw.decode('utf-8', errors='replace')
                     
-                # print(f"FFmpeg Log: {line.strip()}") # Optional: debug logging
-                
-                # Check for start signal
-                if not self.start_time:
-                    # Look for "Press [q]" or "frame=" which indicates main loop started
-                    if "Press [q]" in line or "frame=" in line or "fps=" in line:
-                         self.start_time = time.time()
-                         self.start_event.set()
+                    # print(f"FFmpeg Log: {line.strip()}") # Optional: debug logging
+                    
+                    # Check for start signal
+                    if not self.start_time:
+                        # Look for "Press [q]" or "frame=" which indicates main loop started
+                        if "Press [q]" in line or "frame=" in line or "fps=" in line:
+                             self._mark_started()
+                             self.start_event.set()
         except Exception as e:
             print(f"Error reading stderr: {e}")
 
+    def _monitor_progress(self):
+        """Feed ffmpeg's -progress key=value lines into the capture metrics"""
+        try:
+            for line in iter(self.ffmpeg_process.stdout.readline, b''):
+                self.capture_metrics.feed(line.decode('utf-8', errors='replace'))
+        except Exception as e:
+            print(f"Error reading capture progress: {e}")
+
+    def get_capture_metrics(self):
+        """
+        Latest live capture metrics (frames, fps, actual_fps, dup_frames,
+        drop_frames, speed, bitrate_kbps, total_size), or None when not
+        recording or before ffmpeg's first progress report.
+        """
+        if self.capture_metrics is None:
+            return None
+        return self.capture_metrics.snapshot()
+
+    def _write_capture_report(self):
+        if self.capture_metrics is None:
+            return
+        if self.progress_thread:
+            # ffmpeg has exited: the final progress block is on its way
+            self.progress_thread.join(timeout=2.0)
+        self.capture_metrics.write(self.output_file.replace(".mp4", "_capture_report.json"), {
+            "capture_profile": self.capture_profile,
+            "capture_backend": self.backend.name if self.backend else None,
+            "capture_backend_error": self.backend.error if self.backend else None,
+            "record_region": self.record_region,
+            "incremental_render": self.incremental_render,
+            "events_dropped": self.event_buffer.dropped if self.event_buffer else 0,
+            "moves_captured": self.event_journal.moves_captured if self.event_journal else 0,
+            "moves_kept": self.event_journal.moves_kept if self.event_journal else 0
+        })
+
     def _build_ffmpeg_command(self):
         ffmpeg_path = get_ffmpeg_path()
-        cmd = [ffmpeg_path]
+        # Machine-readable progress on stdout (every 0.5 s); the stderr stats line still signals the start
+        cmd = [ffmpeg_path, '-progress', 'pipe:1']
         
-        # Input: GDI Grab
-        cmd.extend(['-f', 'gdigrab'])
-        cmd.extend(['-draw_mouse', '0'])
-        cmd.extend(['-framerate', str(int(self.fps))])
+        # Input: screen grab (gdigrab, x11grab, mss via stdin) or synthetic source
+        cmd.extend(self.backend.input_args(self.record_region, self.fps))
         
-        if self.record_region:
-            # Region recording
-            # Ensure width/height are even for x264
-            w = self.record_region['width']
-            h = self.record_region['height']
-            x = self.record_region['left']
-            y = self.record_region['top']
-            
-            w = w if w % 2 == 0 else w - 1
-            h = h if h % 2 == 0 else h - 1
-            
-            cmd.extend(['-offset_x', str(x)])
-            cmd.extend(['-offset_y', str(y)])
-            cmd.extend(['-video_size', f"{w}x{h}"])
-        
-        cmd.extend(['-i', 'desktop'])
-        
-        # Encoding
-        cmd.extend(['-c:v', 'libx264'])
-        cmd.extend(['-preset', 'ultrafast'])
-        cmd.extend(['-crf', '0']) # Lossless for intermediate
+        # Encoding: lossless intermediate, codec and GOP per capture profile
+        cmd.extend(capture_codec_args(self.capture_profile, self.fps))
         
         # Output
-        cmd.extend(['-y', self.video_temp])
+        if self.incremental_renderer:
+            cmd.extend(self.incremental_renderer.ffmpeg_output_args())
+        else:
+            cmd.extend(['-y', self.video_temp])
         
         return cmd
 
@@ -319,10 +390,13 @@ class FFmpegRecordEngine:
             
         if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
             # Terminate FFmpeg gracefully to finalize file
-            # Send 'q' to stdin
+            # Send 'q' to stdin (or end the frame stream for stdin-fed backends)
             try:
-                self.ffmpeg_process.stdin.write('q')
-                self.ffmpeg_process.stdin.flush()
+                if self.backend.uses_stdin:
+                    self.backend.stop()
+                else:
+                    self.ffmpeg_process.stdin.write(b'q')
+                    self.ffmpeg_process.stdin.flush()
                 # Give it more time to finalize (especially for larger files or slower systems)
                 self.ffmpeg_process.wait(timeout=5)
             except Exception as e:
@@ -337,44 +411,137 @@ class FFmpegRecordEngine:
                 # Also try taskkill for Windows to be sure, but only if still running
                 if os.name == 'nt' and self.ffmpeg_process.poll() is None:
                      os.system(f"taskkill /F /PID {self.ffmpeg_process.pid} >nul 2>&1")
+        if self.backend:
+            # Also ends an in-process grabber whose ffmpeg exited on its own
+            self.backend.stop()
         
         # 2. Now that FFmpeg is done, we can finish saving the audio file
         if self.audio_recorder:
             self.audio_recorder.stop_recording()
             
-        # Save click logs
-        with open(self.click_log_file, 'w') as f:
-            json.dump(self.click_log, f, indent=2)
+        # Flush the rest of the event journal (already streamed to disk during recording)
+        if self.event_journal:
+            self.event_journal.close()
+        if self.event_buffer and self.event_buffer.dropped:
+            print(f"Warning: event buffer overflowed, {self.event_buffer.dropped} mouse events dropped")
+        if self.event_journal and self.event_journal.moves_captured:
+            print(f"Mouse moves: {self.event_journal.moves_captured} captured, "
+                  f"{self.event_journal.moves_kept} kept (tolerance {self.move_tolerance_px}px)")
             
-        print(f"Raw recording saved: {self.video_temp}")
+        self._write_capture_report()
+
+        if self.incremental_renderer:
+            print(f"Raw recording segments: {self.incremental_renderer.segment_list}")
+        else:
+            print(f"Raw recording saved: {self.video_temp}")
         print(f"Click logs saved: {self.click_log_file}")
         
         # Trigger Post Processing
-        self.post_process()
+        if self.render_on_stop:
+            self.post_process()
 
-    def post_process(self):
-        from post_processor import PostProcessor
-        
-        print("Starting post-processing...")
-        processor = PostProcessor()
-        
-        # Configure processor with current settings
-        config = {
+    def cancel_render(self):
+        """Cooperatively cancel the running post-process render (safe from any thread)."""
+        if self.render_progress:
+            self.render_progress.cancel()
+
+    def _render_config(self):
+        """PostProcessor config from the current settings."""
+        return {
             "zoom_max": self.zoom_max,
             "smooth_speed": self.smooth_speed,
             "zoom_duration": self.zoom_duration,
             "fps": self.fps,
-            "quality": self.video_quality
+            "quality": self.video_quality,
+            "render_mode": self.render_mode,
+            "decoder": self.decoder,
+            "render_engine": self.render_engine,
+            "render_threads": self.render_threads,
+            "cursor_style": self.cursor_style,
+            "cursor_interpolation": self.cursor_interpolation,
+            "cursor_smoothing": self.cursor_smoothing,
+            "cursor_image": self.cursor_image,
+            "parallel": self.parallel,
+            "parallel_workers": self.parallel_workers,
+            "render_report": self.render_report,
+            "profiler": self.profiler,
+            "render_stall_timeout": self.render_stall_timeout,
+            "resumable": self.resumable,
+            "checkpoint_seconds": self.checkpoint_seconds,
+            "checkpoint_min_seconds": self.checkpoint_min_seconds
         }
+
+    def resume_render(self, output_file):
+        """
+        Re-run the post-process of an earlier recording whose render was
+        interrupted (see render_checkpoint.find_interrupted_renders); finished
+        segments in its checkpoint are reused when the settings still match.
+        """
+        self.output_file = output_file
+        self.video_temp = output_file.replace(".mp4", "_raw.mkv")
+        self.click_log_file = output_file.replace(".mp4", "_events.bin")
+        if not os.path.exists(self.click_log_file):
+            # Recordings made before the binary event log
+            self.click_log_file = output_file.replace(".mp4", "_clicks.json")
+        audio = output_file.replace(".mp4", "_audio.wav")
+        self.audio_file = audio if os.path.exists(audio) else ""
+        print(f"Resuming interrupted render: {output_file}")
+        self.post_process(audio_path=self.audio_file or None)
+
+    def post_process(self, audio_path=None):
+        """
+        Args:
+            audio_path: audio to mux; by default the current recording's audio (if any)
+        """
+        from post_processor import PostProcessor
+        
+        print("Starting post-processing...")
+        # Read by the GUI (snapshot polling) and used to cancel the render
+        self.render_progress = RenderProgress(callback=print_progress)
+        if audio_path is None and self.audio_mode != AudioRecorder.MODE_NONE and self.audio_file:
+            audio_path = self.audio_file
+
+        if self.incremental_renderer:
+            renderer = self.incremental_renderer
+            self.incremental_renderer = None
+            if renderer.finish(audio_path, self.render_progress):
+                renderer.remove_segments()
+                self._remove_intermediates()
+                return
+            # Rebuild the single raw file so the recording can still be (re-)rendered
+            if not renderer.join_segments(self.video_temp):
+                print(f"Could not join raw segments, intermediate files kept: {renderer.segment_list}")
+                if not self.render_progress.cancelled:
+                    self.render_progress.set_stage(STAGE_FAILED)
+                return
+            renderer.remove_segments()
+            if self.render_progress.cancelled:
+                print(f"Render cancelled, intermediate files kept: {self.video_temp}")
+                return
+            print("Incremental render failed, rendering the whole recording instead.")
+            self.render_progress = RenderProgress(callback=print_progress)
+
+        processor = PostProcessor()
+        config = self._render_config()
         
-        processor.process(
+        completed = processor.process(
             self.video_temp,
-            self.audio_file if self.audio_mode != AudioRecorder.MODE_NONE else None,
+            audio_path,
             self.click_log_file,
             self.output_file,
-            config
+            config,
+            progress=self.render_progress
         )
+        if not completed or not os.path.exists(self.output_file):
+            # Keep the raw recording, event log and audio so the render can be redone later
+            reason = "cancelled" if self.render_progress.cancelled else "failed"
+            print(f"Render {reason}, intermediate files kept: {self.video_temp}")
+            if not self.render_progress.cancelled:
+                self.render_progress.set_stage(STAGE_FAILED)
+            return
+        self._remove_intermediates()
 
+    def _remove_intermediates(self):
         # Cleanup intermediate files
         try:
             if os.path.exists(self.video_temp):
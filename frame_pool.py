@@ -0,0 +1,41 @@
+"""
+帧缓冲池
+复用固定尺寸的输出帧，使稳态渲染不再分配新的帧内存，并统计每帧分配次数
+"""
+from collections import deque
+import numpy as np
+
+
+class FramePool:
+    """
+    Free list of equally sized frame buffers. acquire() only allocates when
+    the free list is empty, so once the pipeline is full every frame reuses a
+    released buffer. deque append/pop are atomic, so transform and encoder
+    threads can share one pool.
+    """
+    def __init__(self, shape, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self._free = deque()
+        self.allocations = 0
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        try:
+            return self._free.pop()
+        except IndexError:
+            self.allocations += 1
+            return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, frame):
+        if frame is not None and frame.shape == self.shape:
+            self._free.append(frame)
+
+    @property
+    def allocations_per_frame(self):
+        return self.allocations / self.acquired if self.acquired else 0.0
+
+    def report(self):
+        return (f"Frame pool: {self.allocations} buffers allocated for {self.acquired} frames "
+                f"({self.allocations_per_frame:.4f} allocations/frame)")
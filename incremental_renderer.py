@@ -0,0 +1,302 @@
+"""
+录制中增量渲染
+录制时由 ffmpeg segment 复用器写出滚动的原始片段，每个片段关闭后即在后台渲染；停止录制后只需渲染最后一个片段并拼接
+"""
+import csv
+import glob
+import os
+import threading
+import cv2
+import numpy as np
+from event_log import EventLog, EVENT_MOVE, EVENT_CLICK
+from parallel_renderer import _render_chunk
+from render_progress import STAGE_RENDER, STAGE_MERGE, STAGE_DONE, STAGE_CANCELLED
+from render_pipeline import resolve_render_threads
+from utils.video_probe import probe_video_frames
+from video_audio_merger import VideoAudioMerger
+
+
+class IncrementalRenderer:
+    """
+    Renders the segments of a recording that is still in progress.
+
+    A background thread watches ffmpeg's segment list. A closed segment is
+    rendered once the recording clock is `lookahead` seconds past its end,
+    so the event journal holds every event its frames depend on (cursor
+    interpolation needs the next move sample). The camera path is carried
+    forward from the previous segment: only the new frames, plus `lookahead`
+    seconds of history for the smoothing window, are computed, starting from
+    the easing and click state the previous segment reached. This gives the
+    state a full render reaches there, at a cost per segment that does not
+    grow with the recording; only cursor_smoothing near the newest frame can
+    differ slightly, as the smoothing window is cut off at the end of what is
+    known. Only new journal records are read, and events older than the
+    carried state are dropped (pauses are kept).
+
+    Each segment becomes a silent part file. finish() renders whatever is
+    left after recording stopped (usually the last segment) and concatenates
+    the parts with the audio, so the final file is ready shortly after
+    stopping. If anything fails, join_segments() rebuilds the single raw
+    file for a regular post-process.
+    """
+    def __init__(self, segment_pattern, segment_list, event_log_path, output_path, config, clock,
+                 segment_seconds=30, lookahead=None, poll_interval=0.5):
+        self.segment_pattern = segment_pattern
+        self.segment_list = segment_list
+        self.segment_seconds = segment_seconds
+        self.event_log_path = event_log_path
+        self.output_path = output_path
+        self.config = config
+        self.clock = clock
+        if lookahead is None:
+            # Journal flush latency plus the reach of the cursor smoothing window
+            lookahead = 1.0 + 3.0 * config.get("cursor_smoothing", 0.0)
+        self.lookahead = lookahead
+        self.poll_interval = poll_interval
+        self.segments = []
+        self.frame_size = None
+        self.fps = None
+        self.failed = False
+        self._list_pos = 0
+        # Journal records read so far, and those the next segment can still need
+        self._events_read = 0
+        self._records = EventLog.empty().records
+        # Last computed trajectory: the next segment continues from its state
+        self._trajectory = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def ffmpeg_output_args(self):
+        """
+        Capture output options: numbered matroska segments that keep the
+        recording's timeline (-reset_timestamps 0), a keyframe forced at every
+        cut, and a CSV list to which ffmpeg appends "file,start,end" once a
+        segment is closed.
+        """
+        return [
+            '-force_key_frames', f"expr:gte(t,n_forced*{self.segment_seconds})",
+            '-f', 'segment',
+            '-segment_time', str(self.segment_seconds),
+            '-segment_format', 'matroska',
+            '-reset_timestamps', '0',
+            '-segment_list', self.segment_list,
+            '-segment_list_type', 'csv',
+            '-y', self.segment_pattern
+        ]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self._discover()
+                now = self.clock()
+                for segment in self.segments:
+                    if self._stop.is_set() or self.failed:
+                        return
+                    if segment["done"]:
+                        continue
+                    if segment["end"] + self.lookahead > now:
+                        break
+                    self._render(segment)
+            except Exception as e:
+                print(f"Incremental render error: {e}")
+                self.failed = True
+            if self.failed:
+                return
+
+    def _discover(self):
+        """Pick up segments that ffmpeg has closed since the last call."""
+        if not os.path.exists(self.segment_list):
+            return
+        with open(self.segment_list, "rb") as f:
+            f.seek(self._list_pos)
+            data = f.read()
+        # Only complete lines: ffmpeg may be in the middle of writing one
+        complete = data[:data.rfind(b"\n") + 1]
+        self._list_pos += len(complete)
+        base_dir = os.path.dirname(os.path.abspath(self.segment_list))
+        for row in csv.reader(complete.decode("utf-8").splitlines()):
+            if not row or not row[0]:
+                continue
+            name = row[0]
+            path = name if os.path.isabs(name) else os.path.join(base_dir, name)
+            self._add_segment(path)
+
+    def _add_segment(self, path):
+        timestamps, _ = probe_video_frames(path)
+        if not timestamps:
+            print(f"Could not probe segment {path}")
+            self.failed = True
+            return
+        if self.frame_size is None:
+            cap = cv2.VideoCapture(path)
+            self.frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or self.config.get("fps", 30.0)
+            cap.release()
+        n = len(self.segments)
+        self.segments.append({
+            "path": path,
+            "timestamps": np.asarray(timestamps, dtype=np.float64),
+            "start": timestamps[0],
+            "end": timestamps[-1],
+            "frames": len(timestamps),
+            "part_path": self.output_path.replace(".mp4", f"_inc{n:04d}.mp4"),
+            "written": 0,
+            "done": False
+        })
+
+    def _read_events(self):
+        """Append the journal records written since the last call to the retained ones."""
+        # Memory-mapped: only the new records are copied
+        records = EventLog.load(self.event_log_path).records
+        new = np.array(records[self._events_read:])
+        self._events_read += len(new)
+        if len(new):
+            self._records = np.concatenate((self._records, new))
+
+    def _prune_events(self, before):
+        """Drop clicks and moves the carried state covers (the last move before it is kept for interpolation)."""
+        records = self._records
+        keep = (records["time"] > before) | ((records["type"] != EVENT_MOVE) & (records["type"] != EVENT_CLICK))
+        moves = np.flatnonzero((records["type"] == EVENT_MOVE) & (records["time"] <= before))
+        if len(moves):
+            keep[moves[np.argmax(records["time"][moves])]] = True
+        self._records = records[keep]
+
+    def _window(self, segment):
+        """
+        Frame timestamps to compute for a segment, and the state to start from.
+
+        Returns:
+            tuple: (timestamps, state, state_time); state is None (and
+            state_time -inf) for the first segment
+        """
+        state = None
+        after = -np.inf
+        previous = self._trajectory
+        if previous is not None and len(previous):
+            # Continue from the frame before the smoothing history of this segment
+            i = max(0, int(np.searchsorted(previous.times, segment["start"] - self.lookahead)) - 1)
+            state = previous.state(i)
+            after = previous.times[i]
+        limit = segment["end"] + self.lookahead
+        parts = [s["timestamps"] for s in self.segments if s["end"] > after and s["start"] <= limit]
+        times = np.concatenate(parts)
+        return times[(times > after) & (times <= limit)], state, after
+
+    def _render(self, segment, progress=None):
+        from post_processor import PostProcessor
+
+        # Copy the journal as it is now; it keeps growing while we render
+        self._read_events()
+        timestamps, state, after = self._window(segment)
+        processor = PostProcessor()
+        records = self._records
+        if state is not None:
+            # Clicks up to the state frame are already part of the state
+            records = records[(records["type"] != EVENT_CLICK) | (records["time"] > after)]
+        processor.prepare(EventLog(records), self.config, *self.frame_size)
+        trajectory = processor.build_trajectory(timestamps, state=state)
+
+        t_start = int(np.searchsorted(trajectory.times, segment["start"]))
+        t_end = int(np.searchsorted(trajectory.times, segment["end"], side="right"))
+        if t_end <= t_start:
+            # Segment lies entirely inside a pause
+            segment["done"] = True
+            return True
+        self._trajectory = trajectory.slice(0, t_end)
+        self._prune_events(after)
+
+        job = {
+            "video_path": segment["path"],
+            "config": self.config,
+            "frame_size": self.frame_size,
+            "fps": self.fps,
+            "quality": self.config.get("quality", "medium"),
+            "start_time": segment["start"],
+            "end_time": None,
+            "input_offset": segment["start"],
+            "edit_list": processor.edit_list,
+            "trajectory": trajectory.slice(t_start, t_end),
+            "part_path": segment["part_path"],
+            # While recording, leave the other cores to the capture encoder
+            "render_threads": resolve_render_threads(self.config.get("render_threads")) if progress is not None else 0
+        }
+        _, written, ok, _ = _render_chunk(job, progress)
+        if not ok:
+            self.failed = True
+            return False
+        segment["written"] = written
+        segment["done"] = True
+        print(f"Incremental render: segment {os.path.basename(segment['path'])} done ({written} frames)")
+        return True
+
+    def finish(self, audio_path, progress):
+        """
+        Call after ffmpeg has exited and the event journal is closed: render
+        the remaining segments and concatenate all parts with the audio into
+        output_path.
+
+        Returns:
+            bool: True if output_path was written; otherwise the raw segments
+            are untouched and the caller falls back to a full render
+        """
+        self._stop.set()
+        if self._thread:
+            # Let a segment that is mid-render finish, its work is not wasted
+            self._thread.join()
+            self._thread = None
+        if self.failed:
+            return False
+
+        try:
+            self._discover()
+            remaining = [s for s in self.segments if not s["done"]]
+            if self.failed or not self.segments:
+                return False
+            print(f"Incremental render: {len(self.segments) - len(remaining)}/{len(self.segments)} "
+                  f"segments rendered while recording")
+            progress.set_stage(STAGE_RENDER, total_frames=sum(s["frames"] for s in remaining))
+            for segment in remaining:
+                progress.check()
+                if not self._render(segment, progress):
+                    break
+        except Exception as e:
+            print(f"Incremental render error: {e}")
+            self.failed = True
+
+        if progress.cancelled:
+            progress.set_stage(STAGE_CANCELLED)
+            self.remove_parts()
+            return False
+        if self.failed:
+            self.remove_parts()
+            return False
+
+        progress.set_stage(STAGE_MERGE)
+        parts = [s["part_path"] for s in self.segments if s["written"] > 0]
+        ok = bool(parts) and VideoAudioMerger.concat_files(parts, audio_path, self.output_path)
+        self.remove_parts()
+        if ok:
+            progress.set_stage(STAGE_DONE)
+        return ok
+
+    def segment_files(self):
+        return sorted(glob.glob(self.segment_pattern.replace("%04d", "[0-9][0-9][0-9][0-9]")))
+
+    def join_segments(self, video_path):
+        """Losslessly join the raw segments into one recording (the non-incremental layout)."""
+        files = self.segment_files()
+        if not files:
+            return False
+        return VideoAudioMerger.concat_files(files, None, video_path)
+
+    def remove_parts(self):
+        VideoAudioMerger.cleanup_temp_files(*[s["part_path"] for s in self.segments])
+
+    def remove_segments(self):
+        VideoAudioMerger.cleanup_temp_files(*self.segment_files(), self.segment_list)
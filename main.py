@@ -4,17 +4,21 @@
 # you may not use this file except in compliance with the License.
 
 import os
+import multiprocessing
 from threading import Thread
 from pynput import keyboard
 import customtkinter as ctk
-from tkinter import filedialog
+from tkinter import filedialog, messagebox
 from audio_recorder import AudioRecorder
 from region_selector import RegionSelector
 from utils.locale_manager import locale_manager
 from utils.config_manager import config_manager
 # from record_engine import RecordEngine # Deprecated
 from ffmpeg_record_engine import FFmpegRecordEngine
+from render_checkpoint import find_interrupted_renders
+from render_pipeline import resolve_render_threads
 from overlay_icon import OverlayIcon
+from render_progress import STAGE_PREPARE, STAGE_RENDER, STAGE_MERGE, STAGE_CLEANUP, STAGE_FAILED, format_eta
 
 # 解决 Windows DPI 缩放导致的界面模糊和报错
 try:
@@ -47,6 +51,7 @@ class App(ctk.CTk):
         self.geometry("700x850")
         self.engine = FFmpegRecordEngine()
         self.is_starting = False
+        self.record_thread = None
         
         # Apply config to engine
         self.engine.zoom_max = config_manager.get("zoom_max", 1.3)
@@ -58,6 +63,27 @@ class App(ctk.CTk):
         self.engine.record_region = config_manager.get("record_region", None)
         self.engine.save_path = config_manager.get("save_path", "")
         self.engine.video_quality = config_manager.get("video_quality", "medium")
+        self.engine.render_mode = config_manager.get("render_mode", "single_pass")
+        self.engine.decoder = config_manager.get("decoder", "ffmpeg")
+        self.engine.render_engine = config_manager.get("render_engine", "opencv")
+        self.engine.render_threads = resolve_render_threads(config_manager.get("render_threads"))
+        self.engine.cursor_style = config_manager.get("cursor_style", "arrow")
+        self.engine.cursor_interpolation = config_manager.get("cursor_interpolation", "linear")
+        self.engine.cursor_smoothing = config_manager.get("cursor_smoothing", 0.0)
+        self.engine.cursor_image = config_manager.get("cursor_image", None)
+        self.engine.parallel = config_manager.get("parallel", False)
+        self.engine.parallel_workers = config_manager.get("parallel_workers", None)
+        self.engine.move_tolerance_px = config_manager.get("move_tolerance_px", 1.0)
+        self.engine.render_report = config_manager.get("render_report", False)
+        self.engine.profiler = config_manager.get("profiler", None)
+        self.engine.render_stall_timeout = config_manager.get("render_stall_timeout", 120)
+        self.engine.resumable = config_manager.get("resumable", True)
+        self.engine.checkpoint_seconds = config_manager.get("checkpoint_seconds", 30)
+        self.engine.checkpoint_min_seconds = config_manager.get("checkpoint_min_seconds", 120)
+        self.engine.incremental_render = config_manager.get("incremental_render", False)
+        self.engine.segment_seconds = config_manager.get("segment_seconds", 30)
+        self.engine.capture_profile = config_manager.get("capture_profile", "x264_lossless")
+        self.engine.capture_backend = config_manager.get("capture_backend", "auto")
         
         # 音频模式映射
         self.audio_mode_map = {
@@ -281,6 +307,16 @@ class App(ctk.CTk):
         self.btn_pause.grid(row=0, column=1, padx=(5, 0), sticky="ew")
         self.btn_pause.grid_remove() # 初始隐藏
 
+        # 取消渲染按钮 (后期处理时显示)
+        self.btn_cancel_render = ctk.CTkButton(self.control_frame, text=locale_manager.get_text("btn_cancel_render"), fg_color="#7f8c8d", hover_color="#636e72",
+                                               height=50, font=ctk.CTkFont(size=15, weight="bold"),
+                                               command=self.cancel_render)
+        self.btn_cancel_render.grid(row=0, column=1, padx=(5, 0), sticky="ew")
+        self.btn_cancel_render.grid_remove() # 初始隐藏
+
+        # 启动后检查上次中断的渲染
+        self.after(500, self.check_interrupted_renders)
+
     def toggle_pause(self):
         """切换暂停/继续状态"""
         if not self.engine.is_running:
@@ -426,6 +462,7 @@ class App(ctk.CTk):
 
         self.save_path_label.configure(text=locale_manager.get_text("label_save_path"))
         self.path_btn.configure(text=locale_manager.get_text("btn_browse"))
+        self.btn_cancel_render.configure(text=locale_manager.get_text("btn_cancel_render"))
     
     def _show_region_selector(self):
         """显示区域选择器"""
@@ -452,7 +489,8 @@ class App(ctk.CTk):
 
     def toggle_action(self):
         if not self.engine.is_running:
-            if self.is_starting:
+            if self.is_starting or (self.record_thread is not None and self.record_thread.is_alive()):
+                # 正在启动，或仍在后期处理
                 return
             # 开始录制
             self.is_starting = True
@@ -471,6 +509,26 @@ class App(ctk.CTk):
             # 检查线程结束
             self.check_thread_done()
 
+    def check_interrupted_renders(self):
+        """启动时查找中断的渲染（检查点清单 + 原始录像仍在），询问是否从最后完成的片段继续"""
+        if self.engine.is_running or self.is_starting:
+            return
+        save_path = self.engine.save_path if self.engine.save_path and os.path.isdir(self.engine.save_path) else "."
+        renders = find_interrupted_renders(save_path)
+        if not renders:
+            return
+        # 最近的一个；其余的在下次启动时再询问
+        render = renders[0]
+        message = locale_manager.get_text("dialog_resume_render").format(
+            name=os.path.basename(render["video"]), parts=render["parts"])
+        if not messagebox.askyesno(locale_manager.get_text("dialog_resume_render_title"), message):
+            return
+        self.btn_main.configure(state="disabled")
+        self.status_label.configure(text=locale_manager.get_text("status_render_prepare"), text_color="#f1c40f")
+        self.record_thread = Thread(target=self.engine.resume_render, args=(render["output"],))
+        self.record_thread.start()
+        self.check_thread_done()
+
     def _really_start_recording(self):
         self.is_starting = False
         self.status_label.configure(text=locale_manager.get_text("status_recording"), text_color="#e74c3c")
@@ -485,12 +543,49 @@ class App(ctk.CTk):
 
     def check_thread_done(self):
         if self.record_thread.is_alive():
-             self.status_label.configure(text=locale_manager.get_text("log_processing"))
-             self.after(500, self.check_thread_done)
+            progress = self.engine.render_progress
+            if progress is None:
+                self.status_label.configure(text=locale_manager.get_text("log_processing"))
+            else:
+                if not self.btn_cancel_render.winfo_ismapped():
+                    self.btn_main.grid(row=0, column=0, columnspan=1, padx=(0, 5), sticky="ew")
+                    self.btn_cancel_render.grid()
+                self.status_label.configure(text=self._render_status_text(progress.snapshot()))
+            self.after(500, self.check_thread_done)
         else:
+            self.btn_cancel_render.grid_remove()
+            self.btn_cancel_render.configure(state="normal")
             self.btn_main.grid(row=0, column=0, columnspan=2, padx=0, sticky="ew")
             self.btn_main.configure(state="normal", text=locale_manager.get_text("btn_start"), fg_color="#27ae60", hover_color="#219150")
-            self.status_label.configure(text=locale_manager.get_text("status_saved").format(self.engine.output_file), text_color="#2ecc71")
+            progress = self.engine.render_progress
+            if progress is not None and progress.cancelled:
+                self.status_label.configure(text=locale_manager.get_text("status_render_cancelled").format(self.engine.video_temp), text_color="#e67e22")
+            elif progress is not None and progress.stage == STAGE_FAILED:
+                self.status_label.configure(text=locale_manager.get_text("status_render_failed").format(self.engine.video_temp), text_color="#e74c3c")
+            else:
+                self.status_label.configure(text=locale_manager.get_text("status_saved").format(self.engine.output_file), text_color="#2ecc71")
+
+    def _render_status_text(self, snapshot):
+        """后期处理进度快照 -> 状态栏文本"""
+        if snapshot["cancelled"]:
+            return locale_manager.get_text("status_render_cancelling")
+        stage = snapshot["stage"]
+        if stage == STAGE_RENDER and snapshot["total_frames"]:
+            return locale_manager.get_text("status_render_progress").format(
+                done=snapshot["frames_done"], total=snapshot["total_frames"],
+                fps=snapshot["fps"], eta=format_eta(snapshot["eta_s"]))
+        if stage == STAGE_MERGE:
+            return locale_manager.get_text("status_render_merge")
+        if stage == STAGE_CLEANUP:
+            return locale_manager.get_text("status_render_cleanup")
+        if stage == STAGE_PREPARE:
+            return locale_manager.get_text("status_render_prepare")
+        return locale_manager.get_text("log_processing")
+
+    def cancel_render(self):
+        """取消正在进行的后期处理渲染"""
+        self.btn_cancel_render.configure(state="disabled")
+        self.engine.cancel_render()
 
     def on_f1_shortcut(self):
         """Ctrl+F1: 开始/暂停/继续"""
@@ -543,5 +638,7 @@ class App(ctk.CTk):
 
 
 if __name__ == "__main__":
+    # Required for the parallel renderer's worker processes in frozen builds
+    multiprocessing.freeze_support()
     app = App()
     app.mainloop()
@@ -0,0 +1,263 @@
+"""
+并行分段后处理
+将原始录像按关键帧切分为多个片段，由多个进程并行渲染后再无损拼接
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
+import numpy as np
+from video_audio_merger import VideoAudioMerger
+from ffmpeg_frame_writer import FFmpegFrameWriter
+from event_log import EventLog
+from render_checkpoint import RenderCheckpoint, render_signature
+from render_progress import STAGE_MERGE
+from render_profiler import RenderProfiler
+from render_pipeline import resolve_render_threads
+
+
+def _render_chunk(job, progress=None):
+    """
+    Render one keyframe-aligned chunk into a silent part file. Runs in a
+    worker process, or in-process for sequential checkpointed renders (then
+    with a RenderProgress for per-frame progress and cancellation).
+
+    Returns:
+        tuple: (part_path, frames_written, success, stats); stats holds the
+        chunk's profiler timings and counters (RenderProfiler.export())
+    """
+    from post_processor import PostProcessor
+    from render_pipeline import RenderPipeline
+    from render_progress import RenderCancelled
+
+    processor = PostProcessor()
+    processor.profiler = RenderProfiler(job.get("profile", False))
+    processor.prepare(EventLog.empty(), job["config"], *job["frame_size"])
+    processor.edit_list = job["edit_list"]
+    processor.trajectory = job["trajectory"]
+
+    writer = FFmpegFrameWriter(job["part_path"], job["fps"], job["frame_size"], None, job["quality"])
+    if not writer.isOpened():
+        writer.release()
+        return job["part_path"], 0, False, processor.profiler.export()
+    if progress is not None:
+        progress.add_abort_hook(writer.abort)
+
+    expected = len(processor.trajectory)
+    # Worker processes already use every core: render inline there (render_threads 0)
+    pipeline = RenderPipeline(processor.render_frame, job.get("render_threads", 0))
+    frames = processor.iter_frames(job["video_path"], job["fps"], job["start_time"], job["end_time"],
+                                   pool_size=pipeline.max_in_flight + 2,
+                                   input_offset=job.get("input_offset", 0.0))
+    frames = processor.profiler.timed_iter("decode", frames)
+    if progress is not None:
+        frames = progress.iter(frames)
+
+    def write(processed, current_time):
+        with processor.profiler.stage("write"):
+            writer.write(processed)
+        processor.frame_pool.release(processed)
+        if progress is not None:
+            progress.advance()
+
+    try:
+        try:
+            pipeline.run(frames, write)
+        except (BrokenPipeError, OSError, RenderCancelled) as e:
+            print(f"Chunk render failed ({job['part_path']}): {e}")
+            frames.close()
+            writer.release()
+            return job["part_path"], writer.frames_written, False, processor.profiler.export()
+        finally:
+            if progress is not None:
+                progress.remove_abort_hook(writer.abort)
+
+        with processor.profiler.stage("encoder_flush"):
+            ok = writer.release()
+        if writer.frames_written < expected:
+            print(f"Chunk {job['part_path']} ended early: {writer.frames_written}/{expected} frames")
+            ok = False
+        return job["part_path"], writer.frames_written, ok, processor.profiler.export()
+    finally:
+        # Unexpected errors must not leave the decoder or encoder process running
+        frames.close()
+        if writer.process is not None:
+            writer.abort()
+            writer.release()
+
+
+class ParallelRenderer:
+    """
+    Splits the raw timeline at keyframes and renders each chunk in its own
+    worker process.
+
+    The camera path is precomputed for the whole recording (see
+    camera_trajectory), and each worker receives the slice for its chunk, so
+    every worker starts from exactly the state a sequential render would have
+    reached there. Frames rendered this way are identical to a sequential
+    render with the ffmpeg decoder.
+
+    With checkpoint=True the chunks double as durable segments: finished
+    parts are recorded in a RenderCheckpoint manifest and kept when the
+    render fails, is cancelled or the process dies, and a later render of
+    the same output with the same input and settings only renders the
+    missing parts. With one worker the chunks are rendered in-process, one
+    after another.
+    """
+    def __init__(self, workers=None, min_chunk_seconds=5.0, max_chunk_seconds=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_chunk_seconds = min_chunk_seconds
+        self.max_chunk_seconds = max_chunk_seconds
+
+    def plan_chunks(self, timestamps, keyframes, fps):
+        """
+        Group frames into keyframe-aligned chunks of roughly equal length.
+
+        Returns:
+            list: (start_idx, end_idx) pairs covering every frame
+        """
+        total = len(timestamps)
+        if total == 0:
+            return []
+        # A couple of chunks per worker keeps the pool busy when chunks differ in cost
+        target = max(total // (self.workers * 2), int(self.min_chunk_seconds * fps), 1)
+        if self.max_chunk_seconds:
+            # Checkpoint granularity: at most this much work is lost on a crash
+            target = max(1, min(target, int(self.max_chunk_seconds * fps)))
+
+        starts = [0]
+        for i in range(1, total):
+            if keyframes[i] and i - starts[-1] >= target:
+                starts.append(i)
+
+        ends = starts[1:] + [total]
+        return list(zip(starts, ends))
+
+    def render(self, video_path, audio_path, processor, timestamps, keyframes, output_path, config, fps,
+               progress=None, checkpoint=False):
+        """
+        Args:
+            processor: PostProcessor already prepared with a trajectory for timestamps
+            timestamps, keyframes: output of utils.video_probe.probe_video_frames
+            progress: optional RenderProgress, advanced per frame (in-process)
+                      or per finished chunk (worker processes); on cancel,
+                      chunks that have not started are dropped
+            checkpoint: keep finished parts in a manifest and resume from it
+
+        Returns:
+            bool: 渲染是否成功；False 时调用方应回退到顺序渲染
+        """
+        if (self.workers < 2 and not checkpoint) or not VideoAudioMerger.check_ffmpeg():
+            return False
+
+        chunks = self.plan_chunks(timestamps, keyframes, fps)
+        if len(chunks) < 2:
+            print("Recording too short to split, using sequential render.")
+            return False
+
+        frame_size = (processor.width, processor.height)
+        trajectory = processor.trajectory
+        quality = config.get("quality", "medium")
+        in_process = self.workers < 2
+        jobs = []
+        for n, (start, end) in enumerate(chunks):
+            end_time = timestamps[end] if end < len(timestamps) else None
+            t_start = int(np.searchsorted(trajectory.times, timestamps[start]))
+            t_end = len(trajectory) if end_time is None else int(np.searchsorted(trajectory.times, end_time))
+            if t_end <= t_start:
+                # Chunk lies entirely inside a pause
+                continue
+            jobs.append({
+                "video_path": video_path,
+                "config": config,
+                "frame_size": frame_size,
+                "fps": fps,
+                "quality": quality,
+                "start_time": timestamps[start],
+                "end_time": end_time,
+                "edit_list": processor.edit_list,
+                "trajectory": trajectory.slice(t_start, t_end),
+                "part_path": output_path.replace(".mp4", f"_part{n:04d}.mp4"),
+                "render_threads": resolve_render_threads(config.get("render_threads")) if in_process else 0,
+                "profile": processor.profiler.enabled
+            })
+        if not jobs:
+            return False
+
+        manifest = None
+        results = {}
+        if checkpoint:
+            signature = render_signature(video_path, trajectory, frame_size, fps, quality, config,
+                                         [(job["start_time"], job["end_time"]) for job in jobs])
+            manifest = RenderCheckpoint.load(RenderCheckpoint.for_output(output_path), signature)
+            for job in jobs:
+                if manifest.is_done(job["part_path"]):
+                    results[job["part_path"]] = (job["part_path"], manifest.parts[job["part_path"]], True)
+            if results:
+                resumed = sum(frames for _, frames, _ in results.values())
+                print(f"Resuming render: {len(results)}/{len(jobs)} segments ({resumed} frames) already done")
+                if progress is not None:
+                    progress.advance(resumed)
+            manifest.save()
+        todo = [job for job in jobs if job["part_path"] not in results]
+
+        def finished(result):
+            part_path, frames, ok, stats = result
+            results[part_path] = (part_path, frames, ok)
+            # Chunk timings and counters go into the parent's render report
+            processor.profiler.merge(stats)
+            if manifest is not None and ok and frames > 0:
+                manifest.mark_done(part_path, frames)
+
+        mode = "in-process" if in_process else f"on {self.workers} workers"
+        print(f"Segmented render: {len(trajectory)} frames in {len(jobs)} chunks {mode}")
+
+        try:
+            if in_process:
+                for job in todo:
+                    if progress is not None and progress.cancelled:
+                        break
+                    finished(_render_chunk(job, progress))
+            else:
+                # spawn: workers must not inherit the recorder's threads and input hooks
+                ctx = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+                    pending = {pool.submit(_render_chunk, job) for job in todo}
+                    while pending:
+                        done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            result = future.result()
+                            finished(result)
+                            if progress is not None:
+                                progress.advance(result[1])
+                        if progress is not None:
+                            progress.heartbeat()
+                            if progress.cancelled:
+                                for future in pending:
+                                    future.cancel()
+                                break
+        except Exception as e:
+            print(f"Segmented render error: {e}")
+
+        # A chunk without a result never finished: the render has failed
+        ordered = [results.get(job["part_path"], (job["part_path"], 0, False)) for job in jobs]
+        processor.frames_rendered = sum(frames for _, frames, ok in ordered if ok)
+        chunks_ok = not (progress is not None and progress.cancelled)
+        chunks_ok = chunks_ok and all(ok for _, _, ok in ordered)
+        parts = [path for path, frames, ok in ordered if ok and frames > 0]
+        success = False
+        if chunks_ok and parts:
+            if progress is not None:
+                # Out of the render stage: a long concat must not trip the stall watchdog
+                progress.set_stage(STAGE_MERGE)
+            success = VideoAudioMerger.concat_files(parts, audio_path, output_path)
+
+        if success or manifest is None:
+            VideoAudioMerger.cleanup_temp_files(*[job["part_path"] for job in jobs])
+            if manifest is not None:
+                manifest.remove()
+        else:
+            # Keep finished parts for the next attempt; drop the unfinished ones
+            VideoAudioMerger.cleanup_temp_files(*[job["part_path"] for job in jobs
+                                                  if not manifest.is_done(job["part_path"])])
+            print(f"Render checkpoint kept: {manifest.path} ({len(manifest.parts)}/{len(jobs)} segments done)")
+        return success
@@ -0,0 +1,49 @@
+"""
+鼠标轨迹压缩
+基于时间同步欧氏距离（SED）的 Douglas–Peucker 简化：只保留按时间线性插值还原时误差超过容差的点
+"""
+import numpy as np
+
+
+def simplify_path(times, x, y, tolerance):
+    """
+    Douglas–Peucker over a timed path using synchronized Euclidean distance.
+
+    A point is dropped only if its position is within `tolerance` pixels of
+    the position linearly interpolated *at its own timestamp* between the
+    kept neighbours, which is exactly how interpolate_cursor() rebuilds the
+    path (plain perpendicular distance would lose speed changes along a
+    straight line). The first and last points are always kept.
+
+    Returns:
+        np.ndarray: sorted indices of the points to keep
+    """
+    times = np.asarray(times, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(times)
+    if n <= 2 or tolerance <= 0:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    tol_sq = float(tolerance) ** 2
+    # Iterative rather than recursive: long flicks would hit the recursion limit
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        t = times[first + 1:last]
+        dt = times[last] - times[first]
+        frac = (t - times[first]) / dt if dt > 0 else np.zeros(len(t))
+        px = x[first] + frac * (x[last] - x[first])
+        py = y[first] + frac * (y[last] - y[first])
+        dist_sq = (x[first + 1:last] - px) ** 2 + (y[first + 1:last] - py) ** 2
+        i = int(np.argmax(dist_sq))
+        if dist_sq[i] > tol_sq:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
@@ -1,74 +1,234 @@
 
 import cv2
-import json
 import os
+import time
 import numpy as np
-import pyautogui
 from video_audio_merger import VideoAudioMerger
+from ffmpeg_frame_writer import FFmpegFrameWriter
+from ffmpeg_frame_reader import FFmpegFrameReader
+from camera_trajectory import CameraTrajectory, compute_trajectory
+from edit_list import EditList
+from event_log import EventLog
+from render_pipeline import RenderPipeline, resolve_render_threads
+from frame_pool import FramePool
+from render_profiler import RenderProfiler, attach_profiler
+from render_checkpoint import RenderCheckpoint
+from render_progress import (RenderProgress, RenderCancelled, print_progress,
+                             STAGE_PREPARE, STAGE_RENDER, STAGE_MERGE, STAGE_CLEANUP, STAGE_DONE, STAGE_CANCELLED,
+                             STAGE_FAILED, FINAL_STAGES)
+from cursor_sprites import sprite_cache, RIPPLE_DURATION
+from utils.video_probe import probe_video_frames
 from utils.locale_manager import locale_manager
 import subprocess
 from utils.path_utils import get_ffmpeg_path
 
 class PostProcessor:
     def __init__(self):
-        self.current_zoom = 1.0
-        self.curr_center = [0, 0]
-        self.last_click_time = -100 # Initialize far in past
-        self.click_coord = (0, 0)
-        self.is_active = False
+        self.trajectory = None
+        self.frame_pool = None
+        self.sprites = None
+        self.frames_rendered = 0
+        self.profiler = RenderProfiler(enabled=False)
+        self.progress = RenderProgress(callback=print_progress)
+        self._active_reader = None
+        self._active_writer = None
 
-    def process(self, video_path, audio_path, click_log_path, output_path, config):
+    def load_log(self, click_log_path):
+        """Load the event log written by the recording engine (binary or legacy JSON)."""
+        return EventLog.load(click_log_path)
+
+    def prepare(self, event_log, config, width, height):
         """
-        Process the raw video and apply zoom effects based on click logs.
+        Read the event log columns and effect parameters. Must be called before
+        build_trajectory()/render_frame().
         """
-        if not os.path.exists(video_path):
-            print(f"Error: Video file not found: {video_path}")
-            return
-            
-        with open(click_log_path, 'r') as f:
-            full_log = json.load(f)
-            
-        # Separate clicks and moves for easier processing
-        clicks = [e for e in full_log if e.get('type') == 'click' or 'button' in e] # Fallback for old logs
-        moves = [e for e in full_log if e.get('type') == 'move']
-        
-        # Sort just in case
-        clicks.sort(key=lambda x: x['time'])
-        clicks.sort(key=lambda x: x['time'])
-        moves.sort(key=lambda x: x['time'])
-
-        # Parse Pause Intervals
-        pause_events = [e for e in full_log if e.get('type', '').startswith('pause_')]
-        pause_events.sort(key=lambda x: x['time'])
-        
-        pause_intervals = []
-        current_pause_start = None
-        
-        for e in pause_events:
-            if e['type'] == 'pause_start':
-                current_pause_start = e['time']
-            elif e['type'] == 'pause_end' and current_pause_start is not None:
-                pause_intervals.append((current_pause_start, e['time']))
-                current_pause_start = None
-        
-        if current_pause_start is not None:
-             # Assume pause until end of video
-             pause_intervals.append((current_pause_start, 999999))
-             
-        if pause_intervals:
-            print(f"Detected {len(pause_intervals)} pause intervals: {pause_intervals}")
+        if not isinstance(event_log, EventLog):
+            event_log = EventLog.from_events(event_log)
+
+        # Sorted columnar arrays for the vectorized trajectory
+        self.click_times, self.click_x, self.click_y = event_log.clicks()
+        self.move_times, self.move_x, self.move_y = event_log.moves()
+
+        # Pause intervals as a sorted edit list (O(log n) lookups, drives seeking)
+        self.edit_list = EditList.from_event_log(event_log)
+        if len(self.edit_list):
+            print(f"Detected {len(self.edit_list)} pause intervals: {self.edit_list.intervals}")
+
+        self.width = width
+        self.height = height
+        self.frame_pool = FramePool((height, width, 3))
+        self.sprites = sprite_cache.get(width, height, config.get("cursor_style", "arrow"), config.get("cursor_image"))
             
         # Parse Config
-        zoom_max = config.get("zoom_max", 1.3)
-        smooth_speed = config.get("smooth_speed", 0.15)
-        zoom_duration = config.get("zoom_duration", 1.0)
-        
+        self.decoder = config.get("decoder", "ffmpeg")
+        self.zoom_max = config.get("zoom_max", 1.3)
+        self.smooth_speed = config.get("smooth_speed", 0.15)
+        self.zoom_duration = config.get("zoom_duration", 1.0)
+        self.cursor_interpolation = config.get("cursor_interpolation", "linear")
+        self.cursor_smoothing = config.get("cursor_smoothing", 0.0)
+
+    def build_trajectory(self, timestamps, cache_path=None, state=None):
+        """
+        Precompute the camera path for every non-paused frame timestamp.
+        A trajectory saved at cache_path is reused if it was computed for the
+        same frames and effect parameters. state continues an earlier path
+        (see compute_trajectory).
+        """
+        times = np.asarray(timestamps, dtype=np.float64)
+        times = times[self.edit_list.keep_mask(times)]
+        params = {
+            "width": self.width,
+            "height": self.height,
+            "zoom_max": self.zoom_max,
+            "smooth_speed": self.smooth_speed,
+            "zoom_duration": self.zoom_duration,
+            "cursor_interpolation": self.cursor_interpolation,
+            "cursor_smoothing": self.cursor_smoothing
+        }
+
+        if cache_path and os.path.exists(cache_path):
+            try:
+                cached = CameraTrajectory.load(cache_path)
+                if cached.params == params and np.array_equal(cached.times, times):
+                    print(f"Reusing camera trajectory: {cache_path}")
+                    self.trajectory = cached
+                    return self.trajectory
+            except Exception as e:
+                print(f"Ignoring unreadable trajectory cache: {e}")
+
+        self.trajectory = compute_trajectory(
+            times, self.click_times, self.click_x, self.click_y,
+            self.move_times, self.move_x, self.move_y,
+            self.width, self.height, self.zoom_max, self.smooth_speed, self.zoom_duration,
+            self.cursor_interpolation, self.cursor_smoothing, state
+        )
+        if cache_path:
+            try:
+                self.trajectory.save(cache_path)
+            except Exception as e:
+                print(f"Failed to save trajectory: {e}")
+        return self.trajectory
+
+    def is_paused_at(self, current_time):
+        return self.edit_list.is_paused(current_time)
+
+    def iter_frames(self, video_path, fps, start_time=None, end_time=None, pool_size=4,
+                    filters=None, skip_frame=None, input_offset=0.0):
+        """
+        Decode only the non-paused spans of [start_time, end_time).
+
+        Each kept span of the edit list is opened with its own input seek, so
+        paused sections are never decoded (apart from the GOP lead-in before
+        the first kept frame). filters / skip_frame are passed to the ffmpeg
+        decoder (frames come out at self.width x self.height); the OpenCV
+        fallback resizes instead.
+
+        input_offset is the timestamp of the file's first frame, for files
+        that keep the recording's timeline but do not start at 0 (segments of
+        an incremental recording); input seeks are relative to it.
+
+        Yields:
+            tuple: (frame, timestamp in seconds)
+        """
+        segments = self.edit_list.keep_segments(start_time, end_time)
+        half_frame = 0.5 / fps
+
+        use_ffmpeg = self.decoder == "ffmpeg" and VideoAudioMerger.check_ffmpeg()
+        cap = None
+        try:
+            for seg_start, seg_end in segments:
+                if use_ffmpeg:
+                    # Seek half a frame early so rounding never drops the first frame
+                    seek = max(input_offset, seg_start - half_frame)
+                    duration = None if seg_end is None else seg_end - seek
+                    seek -= input_offset
+                    reader = FFmpegFrameReader(video_path, (self.width, self.height), fps, pool_size,
+                                               start_time=seek if seek > 0 else None, duration=duration,
+                                               filters=filters, skip_frame=skip_frame)
+                    if not reader.isOpened():
+                        print("FFmpeg decoder unavailable, falling back to OpenCV.")
+                        use_ffmpeg = False
+                    else:
+                        cap = reader
+                        self._active_reader = reader
+                if not use_ffmpeg:
+                    if cap is None:
+                        cap = cv2.VideoCapture(video_path)
+                    if seg_start > input_offset:
+                        cap.set(cv2.CAP_PROP_POS_MSEC, (seg_start - input_offset) * 1000.0)
+
+                current_time = seg_start
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    # Use actual video timestamp if available, fallback to frame count
+                    if use_ffmpeg:
+                        current_time = cap.pts
+                    else:
+                        timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+                        current_time = (timestamp_ms / 1000.0 + input_offset if timestamp_ms > 0
+                                        else current_time + 1.0 / fps)
+                    if current_time < seg_start:
+                        continue
+                    if seg_end is not None and current_time >= seg_end:
+                        break
+                    if self.edit_list.is_paused(current_time):
+                        self.profiler.count("frames_skipped")
+                        continue
+                    if not use_ffmpeg and frame.shape[:2] != (self.height, self.width):
+                        frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+                    yield frame, current_time
+
+                if use_ffmpeg:
+                    self._active_reader = None
+                    cap.release()
+                    cap = None
+        finally:
+            self._active_reader = None
+            if cap is not None:
+                cap.release()
+
+    def render_frame(self, frame, current_time):
+        """
+        Render one frame from the precomputed trajectory.
+
+        Returns:
+            ndarray: processed frame, or None if the frame falls in a pause
+        """
+        if self.is_paused_at(current_time):
+            self.profiler.count("frames_skipped")
+            return None
+
+        profiler = self.profiler
+        tr = self.trajectory
+        with profiler.stage("trajectory_update"):
+            i = tr.frame_index(current_time)
+            center = (tr.center_x[i], tr.center_y[i])
+            zoom = tr.zoom[i]
+
+        # Apply effects into a pooled output buffer; the caller releases it after writing
+        with profiler.stage("apply_zoom"):
+            processed = self.apply_zoom(frame, center, zoom, (self.width, self.height), dst=self.frame_pool.acquire())
+        with profiler.stage("draw_effects"):
+            return self.draw_effects(processed, zoom, center, self.width, self.height, current_time,
+                                     (tr.cursor_x[i], tr.cursor_y[i]),
+                                     tr.click_time[i], (tr.click_x[i], tr.click_y[i]))
+
+    def open_video(self, video_path):
+        """
+        Open the raw video with OpenCV, repairing the container if needed.
+
+        Returns:
+            tuple: (cap, video_path, repaired_path); cap is None on failure
+        """
         try:
             cap = cv2.VideoCapture(video_path)
         except Exception as e:
             print(f"OpenCV open error: {e}")
             cap = None
         
+        repaired_path = None
         # Check if video opened successfully
         if cap is None or not cap.isOpened():
             print(f"Warning: Could not open video file {video_path}. Attempting repair...")
@@ -83,139 +243,345 @@ class PostProcessor:
                 cap = cv2.VideoCapture(video_path)
             else:
                  print("Repair failed.")
-                 return
+                 return None, video_path, None
+
+        if not cap.isOpened():
+            print(f"Error: Could not open video file {video_path}")
+            return None, video_path, repaired_path
+
+        return cap, video_path, repaired_path
+
+    def process(self, video_path, audio_path, click_log_path, output_path, config, progress=None):
+        """
+        Process the raw video and apply zoom effects based on click logs.
+
+        Args:
+            progress: RenderProgress to report to / cancel through; by default
+                      progress is printed to the console
+
+        Diagnostics (config keys):
+            render_report   per-stage timings (cumulative and percentiles),
+                            frame counts and peak memory, written to
+                            <output>_render_report.json
+            profiler        "cprofile" or "pyinstrument": profile the whole
+                            render (<output>_profile.prof / .html)
+            render_stall_timeout
+                            abort when no frame was rendered for this many
+                            seconds (default 120, 0 disables)
 
+        Returns:
+            bool: True only if the output was written; False if the render
+            failed, was cancelled or was aborted as stalled
+        """
+        self.profiler = RenderProfiler(config.get("render_report", False))
+        self.progress = progress or RenderProgress(callback=print_progress)
+        if self.progress.stall_timeout is None:
+            self.progress.stall_timeout = config.get("render_stall_timeout", 120)
+        self.progress.add_abort_hook(self._abort_io)
+        self.progress.start_watchdog()
+        ok = False
+        try:
+            with attach_profiler(config.get("profiler"), output_path.replace(".mp4", "")):
+                ok = self._process(video_path, audio_path, click_log_path, output_path, config)
+            if self.progress.cancelled:
+                self.progress.set_stage(STAGE_CANCELLED)
+            else:
+                self.progress.set_stage(STAGE_DONE if ok else STAGE_FAILED)
+        except RenderCancelled as e:
+            print(f"\nRender cancelled: {e}")
+            # Partial outputs are useless; the raw recording is left untouched. A preview
+            # only writes *_preview.mp4: output_path may then be an earlier full render
+            written = output_path.replace(".mp4", "_preview.mp4") if config.get("preview", False) else output_path
+            VideoAudioMerger.cleanup_temp_files(
+                written,
+                output_path.replace(".mp4", "_processed_video.mp4"),
+                video_path.replace(".mkv", "_fixed.mkv")
+            )
+            self.progress.set_stage(STAGE_CANCELLED)
+        finally:
+            self.progress.remove_abort_hook(self._abort_io)
+            if self.progress.stage not in FINAL_STAGES:
+                # An unexpected error escaped _process: a final stage also ends the stall watchdog
+                self.progress.set_stage(STAGE_FAILED)
+
+        if self.profiler.enabled:
+            self.profiler.count("frames_processed", self.frames_rendered)
+            print("Render stages (slowest first):")
+            print(self.profiler.summary())
+            self.profiler.write(output_path.replace(".mp4", "_render_report.json"))
+        return bool(ok) and not self.progress.cancelled
+
+    def _abort_io(self):
+        # Runs on cancel from another thread: wake up a render blocked on a pipe
+        for io in (self._active_reader, self._active_writer):
+            if io is not None:
+                io.abort()
+
+    def _process(self, video_path, audio_path, click_log_path, output_path, config):
+        """Returns: bool, whether the output file was written successfully"""
+        if not os.path.exists(video_path):
+            print(f"Error: Video file not found: {video_path}")
+            return False
+
+        self.progress.set_stage(STAGE_PREPARE)
+        event_log = self.load_log(click_log_path)
+
+        cap, video_path, repaired_path = self.open_video(video_path)
+        if cap is None:
+            return False
+
+        # OpenCV only probes size/fps here; decoding is done by iter_frames()
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        
+        quality = config.get("quality", "medium")
+        if audio_path and not os.path.exists(audio_path):
+            audio_path = None
+
+        self.prepare(event_log, config, width, height)
+        self.profiler.info.update({
+            "video": os.path.basename(video_path),
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "source_frames": total_frames,
+            "render_engine": config.get("render_engine", "opencv"),
+            "render_threads": config.get("render_threads"),
+            "decoder": self.decoder
+        })
+
+        # Frame timestamps up front (packet-level, no decode); nominal timing as fallback
+        timestamps, keyframes = probe_video_frames(video_path)
+        if not timestamps:
+            timestamps = [i / fps for i in range(total_frames)]
+            keyframes = None
+        with self.profiler.stage("trajectory"):
+            self.build_trajectory(timestamps, config.get("trajectory_path"))
+        self.progress.check()
+
+        # Proxy preview: low-resolution (optionally keyframe-only) render of a time range
+        if config.get("preview", False):
+            ok = self.render_preview(video_path, output_path.replace(".mp4", "_preview.mp4"), fps, config)
+            self._remove_repaired(repaired_path)
+            return ok
+
+        # Filtergraph engine: the whole render runs inside one native ffmpeg process
+        if config.get("render_engine", "opencv") == "ffmpeg_filter":
+            from ffmpeg_filter_renderer import FFmpegFilterRenderer
+            self.progress.set_stage(STAGE_RENDER, len(self.trajectory))
+            with self.profiler.stage("ffmpeg_filter_render"):
+                ok = FFmpegFilterRenderer(self, fps).render(video_path, audio_path, output_path, config, self.progress)
+            if ok:
+                self.profiler.info["render_engine"] = "ffmpeg_filter"
+                self._remove_repaired(repaired_path)
+                return True
+            self.progress.check()
+            print("FFmpeg filter render failed, falling back to OpenCV render.")
+
+        # Segmented: keyframe-aligned chunks rendered by worker processes (parallel) and/or
+        # checkpointed (resumable), so an interrupted render continues from the last finished segment.
+        # Checkpoints are only used for single-pass renders (segments are final H.264 parts, which
+        # two_pass would re-encode) of recordings long enough to be worth splitting.
+        parallel = config.get("parallel", False)
+        duration = float(self.trajectory.times[-1] - self.trajectory.times[0]) if len(self.trajectory) else 0.0
+        resumable = (config.get("resumable", True)
+                     and config.get("render_mode", "single_pass") == "single_pass"
+                     and duration >= config.get("checkpoint_min_seconds", 120))
+        if (parallel or resumable) and keyframes:
+            from parallel_renderer import ParallelRenderer
+            renderer = ParallelRenderer(config.get("parallel_workers") if parallel else 1,
+                                        max_chunk_seconds=config.get("checkpoint_seconds", 30) if resumable else None)
+            self.progress.set_stage(STAGE_RENDER, len(self.trajectory))
+            with self.profiler.stage("segmented_render"):
+                ok = renderer.render(video_path, audio_path, self, timestamps, keyframes, output_path, config, fps,
+                                     self.progress, checkpoint=resumable)
+            if ok:
+                self.profiler.info["render_engine"] = "parallel" if renderer.workers > 1 else "segmented"
+                self._remove_repaired(repaired_path)
+                return True
+            self.progress.check()
+            print("Segmented render failed, falling back to sequential render.")
         
         # Temp output for processed video (silent)
         temp_output = output_path.replace(".mp4", "_processed_video.mp4")
         
-        if not cap.isOpened():
-            print(f"Error: Could not open video file {video_path}")
-            return
-            
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(temp_output, fourcc, fps, (width, height))
-        
-        print(f"Processing video: {total_frames} frames, {width}x{height} @ {fps}fps")
+        # Single-pass: pipe frames into one ffmpeg H.264 encoder that also muxes the audio.
+        # Two-pass (legacy): mp4v temp file, then VideoAudioMerger re-encodes it.
+        out = None
+        single_pass = config.get("render_mode", "single_pass") == "single_pass"
+        if single_pass:
+            out = FFmpegFrameWriter(output_path, fps, (width, height), audio_path, quality)
+            if not out.isOpened():
+                print("Single-pass encoder unavailable, falling back to two-pass render.")
+                out = None
+                single_pass = False
+            else:
+                self._active_writer = out
+        if out is None:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(temp_output, fourcc, fps, (width, height))
         
-        self.curr_center = [width // 2, height // 2]
+        print(f"Processing video: {len(self.trajectory)}/{total_frames} frames (pauses skipped), {width}x{height} @ {fps}fps")
         
+        # Decode, transform and encode overlap on separate threads; frames stay in order
+        pipeline = RenderPipeline(self.render_frame, resolve_render_threads(config.get("render_threads")))
+        frames = self.iter_frames(video_path, fps, pool_size=pipeline.max_in_flight + 2)
+        frames = self.progress.iter(self.profiler.timed_iter("decode", frames))
         frame_idx = 0
-        click_idx = 0
-        move_idx = 0
+        pipe_error = False
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Use actual video timestamp if available, fallback to frame count
-            timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
-            if timestamp_ms > 0:
-                 current_time = timestamp_ms / 1000.0
-            else:
-                 current_time = frame_idx / fps
-
-            # Check if current_time is inside any pause interval
-            is_paused_frame = False
-            for start, end in pause_intervals:
-                if start <= current_time <= end:
-                    is_paused_frame = True
-                    break
-            
-            if is_paused_frame:
-                frame_idx += 1
-                continue
-            
-            # Check for clicks around this time
-            # We want to trigger the effect slightly before or exactly at the click?
-            # User said: "Check if current frame time has click event"
-            # We can look ahead simply by checking the sorted list
-            
-            # Allow multiple clicks in close succession
-            while click_idx < len(clicks):
-                click = clicks[click_idx]
-                # Trigger slightly if within a small window, or just ensure we catch it
-                # Since log is time-based, just check if we passed it
-                if click['time'] <= current_time:
-                    self.last_click_time = current_time # Sync effect start with video time
-                    self.click_coord = (click['x'], click['y'])
-                    self.is_active = True
-                    click_idx += 1
-                    print(f"Applied click effect at {current_time:.2f}s: {self.click_coord}")
-                else:
-                    break
-
-            # Logic from RecordEngine
-            if self.is_active and (current_time - self.last_click_time < zoom_duration):
-                target_f = zoom_max
-                target_c = self.click_coord
-            else:
-                target_f = 1.0
-                target_c = (width // 2, height // 2)
-                self.is_active = False
-
-            # Smooth interpolation
-            self.current_zoom += (target_f - self.current_zoom) * smooth_speed
-            self.curr_center[0] += (target_c[0] - self.curr_center[0]) * smooth_speed
-            self.curr_center[1] += (target_c[1] - self.curr_center[1]) * smooth_speed
-            
-            # Find current mouse position from moves log
-            # Simple approach: find the last move event before current_time
-            # For better smoothness, we could interpolate between two events
-            current_mouse_pos = (width // 2, height // 2) # Default center
-            
-            # We can maintain an index for moves too since they are time-sorted
-            # But scanning backward slightly is safer if we skip frames? No, we process sequentially.
-            # Let's use a simple cached index
-            while move_idx < len(moves) - 1:
-                if moves[move_idx+1]['time'] <= current_time:
-                    move_idx += 1
-                else:
-                    break
-            
-            if move_idx < len(moves):
-                current_mouse_pos = (moves[move_idx]['x'], moves[move_idx]['y'])
-
-            # Apply effects
-            processed = self.apply_zoom(frame, self.curr_center, self.current_zoom, (width, height))
-            processed = self.draw_effects(processed, self.current_zoom, self.curr_center, width, height, current_time, current_mouse_pos)
-            
-            out.write(processed)
+        def write(processed, current_time):
+            nonlocal frame_idx
+            with self.profiler.stage("write"):
+                out.write(processed)
+            self.frame_pool.release(processed)
             frame_idx += 1
-            
-            if frame_idx % 30 == 0:
-                print(f"Processed {frame_idx}/{total_frames} frames...", end='\r')
+            self.progress.advance()
+        
+        self.progress.set_stage(STAGE_RENDER, len(self.trajectory))
+        render_start = time.perf_counter()
+        try:
+            pipeline.run(frames, write)
+        except RenderCancelled:
+            pass  # re-raised by check() once the encoder is shut down
+        except (BrokenPipeError, OSError) as e:
+            pipe_error = True
+            if not self.progress.cancelled:
+                print(f"\nEncoder pipe closed unexpectedly: {e}")
 
-        cap.release()
-        out.release()
+        # Single-pass: closing the encoder finishes the audio mux
+        self.progress.set_stage(STAGE_MERGE)
+        with self.profiler.stage("encoder_flush"):
+            encoded = out.release()
+        self._active_writer = None
+        self.frames_rendered = frame_idx
+        self.progress.check()
+        elapsed = time.perf_counter() - render_start
         print("\nProcessing complete.")
+        print(f"Render throughput [opencv]: {frame_idx} frames in {elapsed:.2f}s "
+              f"({frame_idx / max(elapsed, 1e-6):.1f} fps)")
+        print(self.frame_pool.report())
         
-        # Merge Audio
-        quality = config.get("quality", "medium")
-        if audio_path and os.path.exists(audio_path):
-            VideoAudioMerger.merge_with_fallback(temp_output, audio_path, output_path, quality)
+        if single_pass:
+            success = encoded and not pipe_error and os.path.exists(output_path)
+            if not success:
+                print(f"Single-pass encode failed: {output_path}")
+            else:
+                # A complete render supersedes segments left by an earlier attempt
+                RenderCheckpoint.discard(output_path)
+        elif pipe_error:
+            success = False
         else:
-            VideoAudioMerger.merge_with_fallback(temp_output, None, output_path, quality)
+            # Merge Audio
+            with self.profiler.stage("audio_merge"):
+                # cleanup=False: the audio is a raw input; temp_output is removed below
+                success, _ = VideoAudioMerger.merge_with_fallback(temp_output, audio_path, output_path, quality,
+                                                                  cleanup=False)
+            success = success and os.path.exists(output_path)
             
-        # Clean up temp files if desired? 
-        # User said "Late flexibility", so maybe keep the raw inputs.
-        # But we should clean the intermediate temp_output
+        # Clean up the intermediate temp_output; the raw inputs are kept by the caller
+        self.progress.set_stage(STAGE_CLEANUP)
         if os.path.exists(temp_output):
             os.remove(temp_output)
             
+        self._remove_repaired(repaired_path)
+        return success
+
+    def render_preview(self, video_path, preview_path, fps, config):
+        """
+        Fast proxy render for tuning zoom parameters.
+
+        The trajectory is the full-resolution one (same easing, same frames),
+        scaled to the preview size; ffmpeg scales while decoding, so Python
+        only touches small frames. Options (config keys):
+
+            preview_scale       output size relative to the recording (0.25)
+            preview_start/_end  time range in seconds (whole recording if unset)
+            preview_keyframes   decode keyframes only (-skip_frame nokey); the
+                                result plays as a time-lapse
+
+        Returns:
+            bool: True if the preview was written
+        """
+        scale = min(1.0, max(0.05, float(config.get("preview_scale", 0.25))))
+        # yuv420p needs even dimensions
+        width = max(2, int(self.width * scale) // 2 * 2)
+        height = max(2, int(self.height * scale) // 2 * 2)
+        # Rounding to even sizes makes the two factors differ slightly
+        scale_x = width / self.width
+        scale_y = height / self.height
+        start_time = config.get("preview_start")
+        end_time = config.get("preview_end")
+        skip_frame = "nokey" if config.get("preview_keyframes", False) else None
+
+        self.trajectory = self.trajectory.scaled(scale_x, scale_y)
+        self.width, self.height = width, height
+        self.frame_pool = FramePool((height, width, 3))
+        # Cursor and ripples shrink with the frame, so the preview looks like the final render
+        self.sprites = sprite_cache.get(width, height, config.get("cursor_style", "arrow"), config.get("cursor_image"),
+                                        scale=round((scale_x + scale_y) / 2, 4))
+
+        out = FFmpegFrameWriter(preview_path, fps, (width, height), quality="low", preset="ultrafast")
+        if not out.isOpened():
+            print("Preview needs FFmpeg; encoder unavailable.")
+            return False
+        self._active_writer = out
+
+        print(f"Rendering preview {width}x{height}: {preview_path}")
+        pipeline = RenderPipeline(self.render_frame, resolve_render_threads(config.get("render_threads")))
+        frames = self.iter_frames(video_path, fps, start_time, end_time, pool_size=pipeline.max_in_flight + 2,
+                                  filters=f"scale={width}:{height}:flags=fast_bilinear", skip_frame=skip_frame)
+        frames = self.progress.iter(self.profiler.timed_iter("decode", frames))
+        frame_count = 0
+
+        def write(processed, current_time):
+            nonlocal frame_count
+            with self.profiler.stage("write"):
+                out.write(processed)
+            self.frame_pool.release(processed)
+            frame_count += 1
+            self.progress.advance()
+
+        # Frame count is only known up front for full-rate decoding
+        total = 0
+        if not skip_frame:
+            times = self.trajectory.times
+            in_range = np.ones(len(times), dtype=bool)
+            if start_time is not None:
+                in_range &= times >= start_time
+            if end_time is not None:
+                in_range &= times < end_time
+            total = int(np.count_nonzero(in_range))
+        self.progress.set_stage(STAGE_RENDER, total)
+        render_start = time.perf_counter()
+        try:
+            pipeline.run(frames, write)
+        except RenderCancelled:
+            pass
+        except (BrokenPipeError, OSError) as e:
+            if not self.progress.cancelled:
+                print(f"Encoder pipe closed unexpectedly: {e}")
+        ok = out.release()
+        self._active_writer = None
+        self.frames_rendered = frame_count
+        self.progress.check()
+        elapsed = time.perf_counter() - render_start
+        print(f"Render throughput [preview]: {frame_count} frames in {elapsed:.2f}s "
+              f"({frame_count / max(elapsed, 1e-6):.1f} fps)")
+        return ok
+
+    def _remove_repaired(self, repaired_path):
         # Clean up repaired file if it exists
-        if 'repaired_path' in locals() and repaired_path and os.path.exists(repaired_path):
+        if repaired_path and os.path.exists(repaired_path):
             try:
                 os.remove(repaired_path)
             except Exception as e:
                 print(f"Error cleaning up repaired file: {e}")
 
-    def apply_zoom(self, img, center, zoom_factor, target_size):
+    def apply_zoom(self, img, center, zoom_factor, target_size, dst=None):
         h, w = img.shape[:2]
         zoom_factor = max(1.0, zoom_factor)
         cw, ch = int(w / zoom_factor), int(h / zoom_factor)
@@ -229,9 +595,10 @@ class PostProcessor:
         y1 = int(max(0, min(y - ch // 2, h - ch)))
         
         crop = img[y1:y1+ch, x1:x1+cw]
-        return cv2.resize(crop, target_size, interpolation=cv2.INTER_LINEAR)
+        return cv2.resize(crop, target_size, dst=dst, interpolation=cv2.INTER_LINEAR)
 
-    def draw_effects(self, img, zoom_factor, center_orig, width, height, current_time, current_mouse_pos=None):
+    def draw_effects(self, img, zoom_factor, center_orig, width, height, current_time, current_mouse_pos=None,
+                     last_click_time=-100, click_coord=(0, 0)):
         zoom_factor = max(1.0, zoom_factor)
         
         # Calculate crop dimensions (must match apply_zoom exactly)
@@ -254,19 +621,15 @@ class PostProcessor:
         scale_y = height / ch
 
         # 1. Click Ripple Effect
-        if current_time - self.last_click_time < 0.5 and self.last_click_time > 0:
-            progress = (current_time - self.last_click_time) / 0.5
+        if current_time - last_click_time < RIPPLE_DURATION and last_click_time > 0:
+            progress = (current_time - last_click_time) / RIPPLE_DURATION
             
             # Project coords using effective scale
-            fx = int((self.click_coord[0] - x1) * scale_x)
-            fy = int((self.click_coord[1] - y1) * scale_y)
+            fx = int((click_coord[0] - x1) * scale_x)
+            fy = int((click_coord[1] - y1) * scale_y)
             
-            radius = int(progress * 50)
-            alpha_color = (0, 0, 255) # Red
-            try:
-                cv2.circle(img, (fx, fy), radius, alpha_color, 2)
-            except: 
-                pass
+            # Pre-rendered ring for this radius step, blended into its ROI only
+            self.sprites.ripple(progress).blend(img, fx, fy)
 
         # 2. Virtual Mouse Cursor
         if current_mouse_pos:
@@ -276,11 +639,8 @@ class PostProcessor:
             draw_x = int((mx - x1) * scale_x)
             draw_y = int((my - y1) * scale_y)
             
-            # Draw simple arrow cursor
-            # Green fill, White outline
-            pts = np.array([[draw_x, draw_y], [draw_x, draw_y + 15], [draw_x + 10, draw_y + 10]], np.int32)
-            cv2.fillPoly(img, [pts], (0, 255, 0)) 
-            cv2.polylines(img, [pts], True, (255, 255, 255), 1)
+            # Pre-rendered cursor sprite (green arrow with white outline by default)
+            self.sprites.cursor.blend(img, draw_x, draw_y)
         
         return img
 
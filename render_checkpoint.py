@@ -0,0 +1,139 @@
+"""
+渲染检查点
+记录分段渲染中已完成的片段，重启后从最后一个完成的片段继续，而不是从头重新渲染
+"""
+import glob
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def render_signature(video_path, trajectory, frame_size, fps, quality, config, chunks):
+    """
+    Fingerprint of everything that determines the rendered parts: the raw
+    video file, the per-frame camera path (which already reflects the event
+    log, pauses and zoom parameters), output format and the chunk plan.
+    Parts from a manifest with a different signature are never reused.
+    """
+    h = hashlib.sha1()
+    stat = os.stat(video_path)
+    meta = {
+        "video": os.path.abspath(video_path),
+        "video_size": stat.st_size,
+        "video_mtime": int(stat.st_mtime),
+        "frame_size": list(frame_size),
+        "fps": float(fps),
+        "quality": quality,
+        "cursor_style": config.get("cursor_style", "arrow"),
+        "cursor_image": config.get("cursor_image"),
+        "params": trajectory.params,
+        "chunks": [[float(s), None if e is None else float(e)] for s, e in chunks]
+    }
+    h.update(json.dumps(meta, sort_keys=True).encode("utf-8"))
+    for name in trajectory.FIELDS:
+        h.update(getattr(trajectory, name).tobytes())
+    return h.hexdigest()
+
+
+class RenderCheckpoint:
+    """
+    Small JSON manifest next to the output (<output>_render.json) listing
+    the finished part files and their frame counts.
+
+    The manifest is rewritten atomically (temp file + os.replace) after each
+    part, and a part is only recorded once its encoder has exited cleanly,
+    so after a crash every listed part is complete.
+    """
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.parts = {}
+
+    @classmethod
+    def for_output(cls, output_path):
+        return output_path.replace(".mp4", "_render.json")
+
+    @classmethod
+    def load(cls, path, signature):
+        """Resume state for `signature`; a missing, unreadable or stale manifest starts empty."""
+        checkpoint = cls(path, signature)
+        if not os.path.exists(path):
+            return checkpoint
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable render checkpoint: {e}")
+            return checkpoint
+        if data.get("version") != MANIFEST_VERSION or data.get("signature") != signature:
+            print("Render checkpoint is for different settings or input, starting over.")
+            return checkpoint
+        for part, frames in data.get("parts", {}).items():
+            if os.path.exists(part) and os.path.getsize(part) > 0:
+                checkpoint.parts[part] = frames
+        return checkpoint
+
+    @classmethod
+    def discard(cls, output_path):
+        """Delete a leftover manifest for output_path and the parts it lists."""
+        path = cls.for_output(output_path)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                parts = list(json.load(f).get("parts", {}))
+        except Exception:
+            parts = []
+        for part in parts + [path, path + ".tmp"]:
+            if os.path.exists(part):
+                os.remove(part)
+
+    def is_done(self, part_path):
+        return part_path in self.parts
+
+    def mark_done(self, part_path, frames):
+        self.parts[part_path] = frames
+        self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "signature": self.signature, "parts": self.parts}, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Failed to save render checkpoint: {e}")
+
+    def remove(self):
+        for path in (self.path, self.path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def find_interrupted_renders(directory):
+    """
+    Renders left unfinished in `directory`: a manifest whose raw recording
+    (<base>_raw.mkv) still exists. Newest first.
+
+    Returns:
+        list: dicts with output, video, manifest and parts (segments done)
+    """
+    found = []
+    for manifest in glob.glob(os.path.join(glob.escape(directory or "."), "*_render.json")):
+        output = manifest[:-len("_render.json")] + ".mp4"
+        video = output.replace(".mp4", "_raw.mkv")
+        if not os.path.exists(video):
+            continue
+        try:
+            with open(manifest, "r", encoding="utf-8") as f:
+                parts = [p for p in json.load(f).get("parts", {}) if os.path.exists(p)]
+        except Exception:
+            continue
+        found.append({"output": output, "video": video, "manifest": manifest, "parts": len(parts),
+                      "mtime": os.path.getmtime(manifest)})
+    found.sort(key=lambda r: r["mtime"], reverse=True)
+    return found
@@ -0,0 +1,134 @@
+"""
+多线程渲染流水线
+解码 → 变换（多个工作线程）→ 编码，各阶段通过有界队列连接，保持帧顺序并提供背压
+"""
+import os
+import queue
+import threading
+
+_DONE = object()
+
+
+def resolve_render_threads(render_threads):
+    """Transform thread count for a render_threads setting: None picks up to 4, 0 renders inline."""
+    if render_threads is None:
+        return min(4, os.cpu_count() or 1)
+    return render_threads
+
+
+class RenderPipeline:
+    """
+    Overlaps decode, transform and encode. OpenCV and the ffmpeg pipes release
+    the GIL for most of their work, so the stages run concurrently.
+
+    - decoder stage: a thread pulling (frame, time) pairs from an iterator
+    - transform stage: a pool of threads calling transform(frame, time)
+    - encoder stage: the calling thread, writing results in input order
+
+    At most max_in_flight frames exist between decode and write at any time,
+    which caps memory and applies backpressure to the decoder. Decoders that
+    recycle buffers must keep at least max_in_flight + 1 of them.
+    """
+    def __init__(self, transform, workers=None, queue_size=8):
+        self.transform = transform
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.queue_size = max(1, queue_size)
+
+    @property
+    def max_in_flight(self):
+        return self.queue_size + max(self.workers, 1)
+
+    def run(self, frames, write):
+        """
+        Args:
+            frames: iterator of (frame, current_time)
+            write: callable(result, current_time) for every non-None result,
+                   called in input order from the calling thread
+
+        Returns:
+            int: number of frames written
+        """
+        if self.workers < 1:
+            written = 0
+            for frame, current_time in frames:
+                result = self.transform(frame, current_time)
+                if result is not None:
+                    write(result, current_time)
+                    written += 1
+            return written
+
+        in_q = queue.Queue(maxsize=self.queue_size)
+        out_q = queue.Queue()  # bounded by the in-flight slots
+        slots = threading.Semaphore(self.max_in_flight)
+        stop = threading.Event()
+        errors = []
+
+        def decode():
+            try:
+                for seq, (frame, current_time) in enumerate(frames):
+                    while not slots.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    if stop.is_set():
+                        return
+                    in_q.put((seq, frame, current_time))
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                close = getattr(frames, 'close', None)
+                if close:
+                    close()
+                for _ in range(self.workers):
+                    in_q.put(_DONE)
+
+        def work():
+            while True:
+                item = in_q.get()
+                if item is _DONE:
+                    out_q.put(_DONE)
+                    return
+                seq, frame, current_time = item
+                result = None
+                if not stop.is_set():
+                    try:
+                        result = self.transform(frame, current_time)
+                    except Exception as e:
+                        errors.append(e)
+                        stop.set()
+                out_q.put((seq, result, current_time))
+
+        threads = [threading.Thread(target=decode, daemon=True)]
+        threads += [threading.Thread(target=work, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+
+        # Encoder stage: reorder by sequence number and write
+        pending = {}
+        next_seq = 0
+        done_workers = 0
+        written = 0
+        while done_workers < self.workers:
+            item = out_q.get()
+            if item is _DONE:
+                done_workers += 1
+                continue
+            seq, result, current_time = item
+            pending[seq] = (result, current_time)
+            while next_seq in pending:
+                result, current_time = pending.pop(next_seq)
+                if result is not None and not stop.is_set():
+                    try:
+                        write(result, current_time)
+                        written += 1
+                    except Exception as e:
+                        errors.append(e)
+                        stop.set()
+                slots.release()
+                next_seq += 1
+
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+        return written
@@ -0,0 +1,249 @@
+"""
+渲染性能剖析
+按阶段统计累计耗时与分位数、处理/跳过帧数和峰值内存，生成 JSON 报告；可选挂载 cProfile / pyinstrument
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+PROFILER_CPROFILE = "cprofile"
+PROFILER_PYINSTRUMENT = "pyinstrument"
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def _windows_peak_memory():
+    """PeakWorkingSetSize of this process via GetProcessMemoryInfo (no psutil needed)."""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    # K32GetProcessMemoryInfo is exported by kernel32 since Windows 7
+    get_info = kernel32.K32GetProcessMemoryInfo
+    get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    get_info.restype = wintypes.BOOL
+    if not get_info(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def peak_memory_mb():
+    """Peak RSS of this process in MB, or None if the platform offers no cheap way to get it."""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        # peak_wset on Windows; other platforms fall through to resource
+        peak = getattr(info, "peak_wset", None)
+        if peak:
+            return peak / (1024 * 1024)
+    except Exception:
+        pass
+    if sys.platform == "win32":
+        # psutil is optional; the Win32 API gives the same peak working set
+        try:
+            peak = _windows_peak_memory()
+            return peak / (1024 * 1024) if peak else None
+        except Exception:
+            return None
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, KB on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return None
+
+
+class _StageTimer:
+    __slots__ = ("durations", "start")
+
+    def __init__(self, durations):
+        self.durations = durations
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.durations.append(time.perf_counter() - self.start)
+        return False
+
+
+class RenderProfiler:
+    """
+    Collects per-call durations for named stages and simple counters.
+
+    Stages can be timed from any thread (list.append is atomic). A disabled
+    profiler hands out a shared no-op context, so the instrumented code
+    paths cost next to nothing when no report was requested.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.durations = {}
+        self.counters = {}
+        self.info = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def _list(self, name):
+        durations = self.durations.get(name)
+        if durations is None:
+            with self._lock:
+                durations = self.durations.setdefault(name, [])
+        return durations
+
+    def stage(self, name):
+        """Context manager timing one call of stage `name`."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self._list(name))
+
+    def add(self, name, seconds):
+        if self.enabled:
+            self._list(name).append(seconds)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def timed_iter(self, name, iterable):
+        """Wrap an iterator so the time spent producing each item is recorded as stage `name`."""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(self._list(name), iterable)
+
+    @staticmethod
+    def _timed_iter(durations, iterable):
+        iterator = iter(iterable)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                durations.append(time.perf_counter() - start)
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+    def export(self):
+        """Raw durations and counters, picklable, for merge() in another process."""
+        with self._lock:
+            return {"durations": {name: list(d) for name, d in self.durations.items()},
+                    "counters": dict(self.counters)}
+
+    def merge(self, data):
+        """Add the durations and counters exported by another profiler (e.g. a chunk worker)."""
+        if not self.enabled or not data:
+            return
+        for name, durations in data.get("durations", {}).items():
+            self._list(name).extend(durations)
+        for name, n in data.get("counters", {}).items():
+            self.count(name, n)
+
+    def report(self):
+        stages = {}
+        for name, durations in list(self.durations.items()):
+            if not durations:
+                continue
+            values = np.asarray(durations, dtype=np.float64) * 1000.0
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            stages[name] = {
+                "calls": len(values),
+                "total_s": round(float(values.sum()) / 1000.0, 4),
+                "mean_ms": round(float(values.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p90_ms": round(float(p90), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(values.max()), 3)
+            }
+        peak = peak_memory_mb()
+        return {
+            "wall_s": round(time.perf_counter() - self._start, 4),
+            "stages": stages,
+            "counters": dict(self.counters),
+            "peak_memory_mb": round(peak, 1) if peak is not None else None,
+            "info": dict(self.info)
+        }
+
+    def write(self, path):
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.report(), f, indent=2, ensure_ascii=False)
+            print(f"Render report saved: {path}")
+        except Exception as e:
+            print(f"Failed to write render report: {e}")
+
+    def summary(self):
+        """One line per stage, slowest first, for the console."""
+        stages = self.report()["stages"]
+        lines = []
+        for name, s in sorted(stages.items(), key=lambda kv: -kv[1]["total_s"]):
+            lines.append(f"  {name:<16} {s['total_s']:9.3f}s  {s['calls']:>7} calls  "
+                         f"p50 {s['p50_ms']:8.3f}ms  p99 {s['p99_ms']:8.3f}ms")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def attach_profiler(kind, output_base):
+    """
+    Run the enclosed block under cProfile (writes <base>_profile.prof) or
+    pyinstrument (writes <base>_profile.html, optional dependency). Both only
+    see the calling thread; use render_threads=0 to keep the per-frame work
+    on it.
+    """
+    if kind == PROFILER_CPROFILE:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            path = output_base + "_profile.prof"
+            profile.dump_stats(path)
+            print(f"cProfile stats saved: {path} (view with: python -m pstats {os.path.basename(path)})")
+    elif kind == PROFILER_PYINSTRUMENT:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed (pip install pyinstrument); profiling disabled.")
+            yield
+            return
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path = output_base + "_profile.html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            print(f"pyinstrument profile saved: {path}")
+    else:
+        if kind:
+            print(f"Unknown profiler '{kind}', expected '{PROFILER_CPROFILE}' or '{PROFILER_PYINSTRUMENT}'.")
+        yield
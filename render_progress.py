@@ -0,0 +1,199 @@
+"""
+渲染进度与取消
+报告已完成帧数、实时帧率、剩余时间和阶段变化，支持协作式取消和卡死检测
+"""
+import threading
+import time
+from collections import deque
+
+STAGE_PREPARE = "prepare"
+STAGE_RENDER = "render"
+STAGE_MERGE = "merge"
+STAGE_CLEANUP = "cleanup"
+STAGE_DONE = "done"
+STAGE_CANCELLED = "cancelled"
+STAGE_FAILED = "failed"
+
+FINAL_STAGES = (STAGE_DONE, STAGE_CANCELLED, STAGE_FAILED)
+
+
+class RenderCancelled(Exception):
+    """Raised by RenderProgress.check() once the render has been cancelled."""
+
+
+class RenderProgress:
+    """
+    Thread-safe progress state shared by a render and whoever watches it.
+
+    The render calls set_stage() / advance() / check(); observers either
+    pass a callback (called from the render threads with a snapshot dict,
+    at most every `interval` seconds and on every stage change) or poll
+    snapshot() themselves, which is what the Tk GUI does from its own thread.
+
+    cancel() is cooperative: the render notices it at the next check() and
+    raises RenderCancelled. Abort hooks registered by the render (e.g.
+    killing an ffmpeg process) are run on cancel so that a render blocked in
+    a pipe read or write is woken up too.
+
+    With stall_timeout set, a watchdog thread cancels the render when no
+    progress was reported for that many seconds while in the render stage.
+    """
+    def __init__(self, callback=None, interval=0.5, stall_timeout=None, fps_window=2.0):
+        self.callback = callback
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        self.fps_window = fps_window
+        self.stage = STAGE_PREPARE
+        self.frames_done = 0
+        self.total_frames = 0
+        self.reason = None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._abort_hooks = []
+        self._samples = deque()
+        self._start = time.perf_counter()
+        self._last_activity = self._start
+        self._last_emit = 0.0
+        self._watchdog = None
+
+    # --- render side ---
+
+    def set_stage(self, stage, total_frames=None):
+        with self._lock:
+            self.stage = stage
+            if total_frames is not None:
+                self.total_frames = total_frames
+            self._last_activity = time.perf_counter()
+            if stage in FINAL_STAGES:
+                self._finished.set()
+        self._emit(force=True)
+
+    def advance(self, frames=1):
+        now = time.perf_counter()
+        with self._lock:
+            self.frames_done += frames
+            self._last_activity = now
+            self._samples.append((now, self.frames_done))
+            while self._samples and now - self._samples[0][0] > self.fps_window:
+                self._samples.popleft()
+        self._emit()
+
+    def heartbeat(self):
+        """Report liveness without frame progress (e.g. while waiting on a subprocess)."""
+        with self._lock:
+            self._last_activity = time.perf_counter()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise RenderCancelled(self.reason or "cancelled")
+
+    def add_abort_hook(self, hook):
+        with self._lock:
+            self._abort_hooks.append(hook)
+
+    def remove_abort_hook(self, hook):
+        with self._lock:
+            if hook in self._abort_hooks:
+                self._abort_hooks.remove(hook)
+
+    def iter(self, frames):
+        """Pass frames through, checking for cancellation before each one."""
+        try:
+            for item in frames:
+                self.check()
+                yield item
+        finally:
+            close = getattr(frames, "close", None)
+            if close:
+                close()
+
+    # --- observer side ---
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self, reason="cancelled by user"):
+        if self._cancelled.is_set():
+            return
+        self.reason = reason
+        self._cancelled.set()
+        with self._lock:
+            hooks = list(self._abort_hooks)
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"Abort hook failed: {e}")
+
+    def fps(self):
+        with self._lock:
+            if len(self._samples) < 2:
+                return 0.0
+            (t0, f0), (t1, f1) = self._samples[0], self._samples[-1]
+        return (f1 - f0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def snapshot(self):
+        fps = self.fps()
+        with self._lock:
+            remaining = max(0, self.total_frames - self.frames_done)
+            return {
+                "stage": self.stage,
+                "frames_done": self.frames_done,
+                "total_frames": self.total_frames,
+                "fps": fps,
+                "eta_s": remaining / fps if fps > 0 and self.total_frames else None,
+                "elapsed_s": time.perf_counter() - self._start,
+                "cancelled": self._cancelled.is_set(),
+                "reason": self.reason
+            }
+
+    def _emit(self, force=False):
+        if self.callback is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_emit < self.interval:
+            return
+        self._last_emit = now
+        try:
+            self.callback(self.snapshot())
+        except Exception as e:
+            print(f"Progress callback failed: {e}")
+
+    # --- stall watchdog ---
+
+    def start_watchdog(self):
+        if not self.stall_timeout or self._watchdog is not None:
+            return
+        self._watchdog = threading.Thread(target=self._watch)
+        self._watchdog.daemon = True
+        self._watchdog.start()
+
+    def _watch(self):
+        while not self._finished.wait(1.0):
+            with self._lock:
+                idle = time.perf_counter() - self._last_activity
+                stage = self.stage
+            if stage == STAGE_RENDER and idle > self.stall_timeout:
+                print(f"\nRender stalled: no progress for {idle:.0f}s, aborting.")
+                self.cancel(f"stalled for {idle:.0f}s")
+                return
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def print_progress(snapshot, prefix=""):
+    """Console callback for CLI / batch renders."""
+    if snapshot["stage"] == STAGE_RENDER and snapshot["total_frames"]:
+        print(f"{prefix}Processed {snapshot['frames_done']}/{snapshot['total_frames']} frames "
+              f"({snapshot['fps']:.1f} fps, ETA {format_eta(snapshot['eta_s'])})", end='\r')
+    else:
+        print(f"{prefix}Stage: {snapshot['stage']}")
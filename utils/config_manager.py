@@ -19,7 +19,33 @@ class ConfigManager:
         "language": "zh_CN",
         "record_region": None,
         "save_path": "",
-        "video_quality": "medium"
+        "video_quality": "medium",
+        "render_mode": "single_pass",
+        "decoder": "ffmpeg",
+        "render_engine": "opencv",
+        "render_threads": None,
+        "cursor_style": "arrow",
+        "cursor_interpolation": "linear",
+        "cursor_smoothing": 0.0,
+        "cursor_image": None,
+        "parallel": False,
+        "parallel_workers": None,
+        "move_tolerance_px": 1.0,
+        "preview": False,
+        "preview_scale": 0.25,
+        "preview_start": None,
+        "preview_end": None,
+        "preview_keyframes": False,
+        "render_report": False,
+        "profiler": None,
+        "render_stall_timeout": 120,
+        "resumable": True,
+        "checkpoint_seconds": 30,
+        "checkpoint_min_seconds": 120,
+        "incremental_render": False,
+        "segment_seconds": 30,
+        "capture_profile": "x264_lossless",
+        "capture_backend": "auto"
     }
 
     def __new__(cls):
@@ -23,6 +23,12 @@ def get_ffmpeg_path():
     ffmpeg_exe = "ffmpeg.exe" if sys.platform == "win32" else "ffmpeg"
     return os.path.join(base_path, 'ffmpeg', 'bin', ffmpeg_exe)
 
+def get_ffprobe_path():
+    """ Get absolute path to the bundled ffprobe executable """
+    base_path = get_base_path()
+    ffprobe_exe = "ffprobe.exe" if sys.platform == "win32" else "ffprobe"
+    return os.path.join(base_path, 'ffmpeg', 'bin', ffprobe_exe)
+
 def get_config_path(filename):
     """ 
     Get absolute path to mutable config files.
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+from fractions import Fraction
+from utils.path_utils import get_ffprobe_path
+
+def pts_to_seconds(pts, time_base):
+    """ Convert an integer stream pts to seconds; shared by every decoder so timestamps match exactly """
+    return pts * time_base.numerator / time_base.denominator
+
+def probe_video_frames(video_path):
+    """
+    List every video packet of the first video stream without decoding it.
+
+    Returns:
+        tuple: (timestamps, keyframes) sorted by presentation time, where
+        timestamps are seconds and keyframes is a parallel list of bools;
+        (None, None) if ffprobe is unavailable or fails
+    """
+    cmd = [
+        get_ffprobe_path(),
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=time_base:packet=pts,flags',
+        '-of', 'json',
+        video_path
+    ]
+
+    # Hide console on Windows
+    creationflags = 0
+    if os.name == 'nt':
+        creationflags = subprocess.CREATE_NO_WINDOW
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, creationflags=creationflags)
+        if result.returncode != 0:
+            print(f"ffprobe failed: {result.stderr.decode('utf-8', errors='replace')}")
+            return None, None
+        data = json.loads(result.stdout)
+        time_base = Fraction(data['streams'][0]['time_base'])
+    except Exception as e:
+        print(f"ffprobe error: {e}")
+        return None, None
+
+    packets = []
+    for packet in data.get('packets', []):
+        pts = packet.get('pts')
+        if pts is None:
+            continue
+        packets.append((int(pts), 'K' in packet.get('flags', '')))
+    packets.sort(key=lambda p: p[0])
+
+    timestamps = [pts_to_seconds(pts, time_base) for pts, _ in packets]
+    keyframes = [key for _, key in packets]
+    return timestamps, keyframes
@@ -5,6 +5,9 @@
 import os
 import subprocess
 import shutil
+import threading
+import time
+from collections import deque
 from utils.locale_manager import locale_manager
 from utils.path_utils import get_ffmpeg_path
 
@@ -12,6 +15,76 @@ from utils.path_utils import get_ffmpeg_path
 class VideoAudioMerger:
     """音视频合并工具类"""
     
+    # 质量映射到 CRF (Constant Rate Factor)
+    # 18: 视觉无损, 23: 默认, 28: 较低质量
+    CRF_MAP = {
+        "low": "28",
+        "medium": "23",
+        "high": "18"
+    }
+    
+    # Audio starts ~0.3s after video due to FFmpeg startup delay
+    AUDIO_OFFSET = "0.5"
+    
+    # 无进度超时（秒）：只有 FFmpeg 停止输出进度时才终止，长视频合并不会被误杀
+    STALL_TIMEOUT = 120
+    
+    @staticmethod
+    def run_ffmpeg(command, stall_timeout=None):
+        """
+        运行 FFmpeg 命令，按进度而非总时长判断超时
+        
+        通过 -progress pipe:1 读取进度；超过 stall_timeout 秒没有任何进度输出时
+        终止进程并抛出 subprocess.TimeoutExpired
+        
+        Returns:
+            subprocess.CompletedProcess: returncode 与 stderr（最后 50 行）
+        """
+        stall_timeout = stall_timeout or VideoAudioMerger.STALL_TIMEOUT
+        # Global options go right after the executable
+        command = [command[0], '-progress', 'pipe:1', '-nostats'] + list(command[1:])
+        
+        creationflags = 0
+        if os.name == 'nt':
+            creationflags = subprocess.CREATE_NO_WINDOW
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            creationflags=creationflags
+        )
+        
+        last_progress = [time.monotonic()]
+        stderr_tail = deque(maxlen=50)
+        
+        def read_progress():
+            for _ in iter(process.stdout.readline, ''):
+                last_progress[0] = time.monotonic()
+        
+        def read_stderr():
+            for line in iter(process.stderr.readline, ''):
+                stderr_tail.append(line.rstrip())
+        
+        readers = [threading.Thread(target=read_progress, daemon=True),
+                   threading.Thread(target=read_stderr, daemon=True)]
+        for t in readers:
+            t.start()
+        
+        while True:
+            try:
+                process.wait(timeout=1.0)
+                break
+            except subprocess.TimeoutExpired:
+                if time.monotonic() - last_progress[0] > stall_timeout:
+                    process.kill()
+                    process.wait()
+                    raise subprocess.TimeoutExpired(command, stall_timeout)
+        for t in readers:
+            t.join(timeout=1.0)
+        return subprocess.CompletedProcess(command, process.returncode, None, "\n".join(stderr_tail))
+    
     @staticmethod
     def check_ffmpeg():
         """检查 FFmpeg 是否可用"""
@@ -52,14 +125,7 @@ class VideoAudioMerger:
             print(locale_manager.get_text("log_install_ffmpeg"))
             return False
         
-        # 质量映射到 CRF (Constant Rate Factor)
-        # 18: 视觉无损, 23: 默认, 28: 较低质量
-        crf_map = {
-            "low": "28",
-            "medium": "23",
-            "high": "18"
-        }
-        crf = crf_map.get(quality, "23")
+        crf = VideoAudioMerger.CRF_MAP.get(quality, "23")
         
         try:
             ffmpeg_path = get_ffmpeg_path()
@@ -71,7 +137,7 @@ class VideoAudioMerger:
                 command = [
                     ffmpeg_path,
                     '-i', video_file,
-                    '-itsoffset', '0.5',
+                    '-itsoffset', VideoAudioMerger.AUDIO_OFFSET,
                     '-i', audio_file,
                     '-map', '0:v:0',
                     '-map', '1:a:0',
@@ -99,13 +165,8 @@ class VideoAudioMerger:
             print(locale_manager.get_text("log_audio_file").format(audio_file))
             print(locale_manager.get_text("log_output_file").format(output_file))
             
-            # 执行 FFmpeg 命令
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5分钟超时
-            )
+            # 执行 FFmpeg 命令（无进度超时，不限制总时长）
+            result = VideoAudioMerger.run_ffmpeg(command)
             
             if result.returncode == 0:
                 print(locale_manager.get_text("log_merge_success"))
@@ -126,6 +187,61 @@ class VideoAudioMerger:
             print(locale_manager.get_text("log_merge_error").format(e))
             return False
     
+    @staticmethod
+    def concat_files(part_files, audio_file, output_file):
+        """
+        无损拼接多个已编码的视频片段，并合并音频（视频流直接复制，不重新编码）
+        
+        Args:
+            part_files: 按顺序排列的片段文件路径列表（编码参数必须一致）
+            audio_file: 输入音频文件路径，可为 None
+            output_file: 输出文件路径
+            
+        Returns:
+            bool: 拼接是否成功
+        """
+        list_file = os.path.splitext(output_file)[0] + "_concat.txt"
+        try:
+            with open(list_file, 'w', encoding='utf-8') as f:
+                for part in part_files:
+                    escaped = os.path.abspath(part).replace("\\", "/").replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            
+            ffmpeg_path = get_ffmpeg_path()
+            command = [
+                ffmpeg_path,
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', list_file
+            ]
+            if audio_file and os.path.exists(audio_file):
+                command.extend([
+                    '-itsoffset', VideoAudioMerger.AUDIO_OFFSET,
+                    '-i', audio_file,
+                    '-map', '0:v:0',
+                    '-map', '1:a:0',
+                    '-c:a', 'aac'
+                ])
+            command.extend(['-c:v', 'copy', '-y', output_file])
+            
+            print(locale_manager.get_text("log_merging"))
+            result = VideoAudioMerger.run_ffmpeg(command)
+            
+            if result.returncode == 0:
+                print(locale_manager.get_text("log_merge_success"))
+                return True
+            print(locale_manager.get_text("log_ffmpeg_error").format(result.stderr))
+            return False
+        except subprocess.TimeoutExpired:
+            print(locale_manager.get_text("log_ffmpeg_timeout"))
+            return False
+        except Exception as e:
+            print(locale_manager.get_text("log_merge_error").format(e))
+            return False
+        finally:
+            if os.path.exists(list_file):
+                os.remove(list_file)
+    
     @staticmethod
     def cleanup_temp_files(*files):
         """
@@ -143,7 +259,7 @@ class VideoAudioMerger:
                 print(locale_manager.get_text("log_delete_temp_fail").format(file_path, e))
     
     @staticmethod
-    def merge_with_fallback(video_file, audio_file, output_file, quality="medium"):
+    def merge_with_fallback(video_file, audio_file, output_file, quality="medium", cleanup=True):
         """
         带降级策略的合并方法
         如果 FFmpeg 不可用，则只保留视频文件
@@ -153,12 +269,13 @@ class VideoAudioMerger:
             audio_file: 输入音频文件路径
             output_file: 输出文件路径
             quality: 视频质量
+            cleanup: 是否清理输入文件（False 时保留音频文件，视频文件仅在降级时被移动为输出）
             
         Returns:
             tuple: (success, final_file)
         """
         # 尝试使用 FFmpeg 合并/压缩
-        if VideoAudioMerger.merge_files(video_file, audio_file, output_file, cleanup=True, quality=quality):
+        if VideoAudioMerger.merge_files(video_file, audio_file, output_file, cleanup=cleanup, quality=quality):
             return True, output_file
         
         # 如果合并失败，使用视频文件作为输出
@@ -169,7 +286,7 @@ class VideoAudioMerger:
             shutil.move(video_file, output_file)
             
             # 清理音频文件
-            if os.path.exists(audio_file):
+            if cleanup and audio_file and os.path.exists(audio_file):
                 os.remove(audio_file)
             
             return True, output_file